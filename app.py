@@ -4,8 +4,34 @@ from dateutil.relativedelta import relativedelta
 from calculations import (
     calculate_severance_pay, 
     calculate_lump_sum_payment, 
-    calculate_annual_leave_accrual
+    calculate_annual_leave_accrual,
+    calculate_drp_comparison,
+    calculate_tsp_growth,
+    calculate_tsp_loan,
+    calculate_tsp_frontload,
+    parse_tsp_loan_inputs,
+    TSP_LOAN_PAY_PERIOD_RANGES
 )
+from charts import downsample
+
+# Results are cached across reruns and sessions, keyed by the calculator's
+# arguments, like the Flask app's result cache. The cheap calculators
+# (lump sum, accrual, DRP) cost less than a cache lookup and run directly.
+CACHE_TTL = 3600
+CACHE_MAX_ENTRIES = 5000
+CHART_MAX_POINTS = 120
+
+def cached(func):
+    return st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)(func)
+
+calculate_severance_pay = cached(calculate_severance_pay)
+calculate_tsp_growth = cached(calculate_tsp_growth)
+calculate_tsp_loan = cached(calculate_tsp_loan)
+calculate_tsp_frontload = cached(calculate_tsp_frontload)
+downsample = cached(downsample)
+
+# Each calculator is a fragment: changing one of its widgets reruns only that
+# calculator, not the whole script (st.fragment needs Streamlit 1.37+).
 
 # Title
 st.title("Fed Benefits Calculators")
@@ -35,9 +61,11 @@ def add_general_disclaimer():
     """, unsafe_allow_html=True)
 
 # Tab-like behavior with selectbox
-tab = st.selectbox("Select a Calculator", ["💼 Severance Pay Estimation","⚖️ Severance vs. DRP Comparison","🏖️ Annual Leave Lump Sum", "📅 Annual Leave Accrual"])
+tab = st.selectbox("Select a Calculator", ["💼 Severance Pay Estimation","⚖️ Severance vs. DRP Comparison","🏖️ Annual Leave Lump Sum", "📅 Annual Leave Accrual",
+                                           "📈 TSP Growth", "🏦 TSP Loan", "⏩ TSP Front-Loading"])
 
 # Functions for calculators
+@st.fragment
 def annual_leave_lump_sum():
     st.header("Annual Leave Lump Sum Calculator 📝", help="Learn more about lump sum payments: https://www.opm.gov/policy-data-oversight/pay-leave/leave-administration/fact-sheets/lump-sum-payments-for-annual-leave/")
     hourly_rate = st.number_input("Hourly Pay Rate ($)", min_value=0.0, step=0.01, key="hourly_rate")
@@ -53,6 +81,7 @@ def annual_leave_lump_sum():
     add_general_disclaimer()
     st.markdown("[Source: OPM Annual Leave Lump Sum Payment](https://www.opm.gov/policy-data-oversight/pay-leave/leave-administration/fact-sheets/lump-sum-payments-for-annual-leave/)")
 
+@st.fragment
 def annual_leave_accrual():
     st.header("Annual Leave Accrual Calculator 📅")
     employee_type = st.selectbox("Select Employee Type", [
@@ -95,6 +124,7 @@ def annual_leave_accrual():
     add_general_disclaimer()
     st.markdown("[Source: OPM Annual Leave Fact Sheet](https://www.opm.gov/policy-data-oversight/pay-leave/leave-administration/fact-sheets/annual-leave/)")
 
+@st.fragment
 def severance_pay_estimation():
     st.header("Severance Pay Estimator 💼", help="Learn more about severance pay: https://www.opm.gov/policy-data-oversight/pay-leave/pay-administration/fact-sheets/severance-pay-estimation-worksheet/")
     
@@ -128,6 +158,7 @@ def severance_pay_estimation():
     st.markdown("[Source: OPM Severance Pay Estimation Worksheet](https://www.opm.gov/policy-data-oversight/pay-leave/pay-administration/fact-sheets/severance-pay-estimation-worksheet/)")
 
 # DRP vs Severance Comparison Function
+@st.fragment
 def compare_severance_vs_drp():
     st.header("Severance Pay vs. DRP ⚖️")
 
@@ -160,9 +191,10 @@ def compare_severance_vs_drp():
     rif_pay_periods = st.number_input("Enter Pay Periods From DRP Start to Actual RIF", min_value=0, step=1, key="rif_pay_periods")
     
     if severance_estimate > 0 and biweekly_salary > 0:
-        total_drp_earnings = biweekly_salary * pay_periods_remaining
-        total_rif_earnings = biweekly_salary * rif_pay_periods
-        adjusted_severance = severance_estimate + total_rif_earnings
+        comparison = calculate_drp_comparison(biweekly_salary, severance_estimate, pay_periods_remaining, rif_pay_periods)
+        total_drp_earnings = comparison["total_drp"]
+        total_rif_earnings = comparison["total_rif"]
+        adjusted_severance = comparison["adjusted_severance"]
         
         # Display Results
         st.subheader("Comparison Results")
@@ -185,6 +217,106 @@ def compare_severance_vs_drp():
     # General disclaimer
     add_general_disclaimer()
 
+@st.fragment
+def tsp_growth():
+    st.header("TSP Growth Calculator 📈")
+    current_balance = st.number_input("Current TSP Balance ($)", min_value=0.0, step=1000.0, key="tsp_current_balance")
+    annual_salary = st.number_input("Annual Salary ($)", min_value=0.0, step=1000.0, key="tsp_annual_salary")
+    employee_percent = st.number_input("Employee Contribution (% of salary)", min_value=0.0, max_value=100.0, value=5.0, step=0.5, key="tsp_employee_percent")
+    employer_percent = st.number_input("Agency Contribution (% of salary)", min_value=0.0, max_value=100.0, value=5.0, step=0.5, key="tsp_employer_percent")
+    years = st.number_input("Years of Growth", min_value=0, max_value=80, value=30, step=1, key="tsp_years")
+    annual_rate = st.number_input("Expected Annual Return (%)", value=6.5, step=0.25, key="tsp_annual_rate")
+    inflation_rate = st.number_input("Expected Inflation (%)", value=2.5, step=0.25, key="tsp_inflation_rate")
+
+    if years > 0 and (current_balance > 0 or annual_salary > 0):
+        result = calculate_tsp_growth(current_balance, annual_salary, employee_percent, employer_percent,
+                                      years, annual_rate, inflation_rate)
+        st.subheader("Projected Balance")
+        st.info(f"### 💰 Balance After {years} Years: **${result['future_value_nominal']:,.2f}**")
+        st.write(f"**In Today's Dollars:** ${result['future_value_real']:,.2f}")
+        st.write(f"**Total Contributions:** ${result['total_contributions']:,.2f}")
+        st.write(f"**Investment Growth:** ${result['growth']:,.2f}")
+
+        yearly_data = list(result["yearly_data"])
+        labels, series = downsample(
+            [row["year"] for row in yearly_data],
+            {
+                "Contributions": [row["contributions"] for row in yearly_data],
+                "Growth": [row["growth"] for row in yearly_data],
+            },
+            CHART_MAX_POINTS,
+        )
+        st.line_chart({"Year": labels, **series}, x="Year")
+    else:
+        st.write("Please enter a balance or salary and the number of years.")
+    add_general_disclaimer()
+
+@st.fragment
+def tsp_loan():
+    st.header("TSP Loan Calculator 🏦")
+    loan_type = st.selectbox("Loan Type", ["general", "residential"], format_func=str.capitalize, key="tsp_loan_type")
+    min_pp, max_pp = TSP_LOAN_PAY_PERIOD_RANGES[loan_type]
+    values = {
+        "loan_type": loan_type,
+        "tsp_balance": st.number_input("TSP Balance ($)", min_value=0.0, value=50000.0, step=1000.0, key="tsp_loan_balance"),
+        "loan_amount": st.number_input("Loan Amount ($)", min_value=0.0, max_value=50000.0, value=10000.0, step=500.0, key="tsp_loan_amount"),
+        "loan_interest_rate": st.number_input("Loan Interest Rate (%)", min_value=0.0, value=4.375, step=0.125, key="tsp_loan_rate"),
+        "expected_annual_growth": st.number_input("Expected Market Growth (%)", value=6.5, step=0.25, key="tsp_loan_growth"),
+        "num_pay_periods": st.number_input("Number of Payments (Pay Periods)", min_value=min_pp, max_value=max_pp, value=min_pp, step=1, key=f"tsp_loan_periods_{loan_type}"),
+        "biweekly_contribution_no_loan": st.number_input("Biweekly Contribution If No Loan Taken ($)", min_value=0.0, value=200.0, step=10.0, key="tsp_loan_contribution"),
+        "biweekly_contribution_during_loan": st.number_input("Biweekly Contribution With a TSP Loan ($)", min_value=0.0, value=200.0, step=10.0, key="tsp_loan_contribution_during"),
+    }
+
+    inputs, error = parse_tsp_loan_inputs(values)
+    if error:
+        st.error(error)
+    else:
+        result = calculate_tsp_loan(**inputs)
+        st.subheader("Loan Impact")
+        st.write(f"**Payment per Pay Period:** ${result['loan_payment']:,.2f}")
+        st.write(f"**Total Repaid:** ${result['total_repaid']:,.2f} (plus a ${result['processing_fee']} processing fee)")
+        st.write(f"**Balance Without Loan:** ${result['balance_no_loan']:,.2f}")
+        st.write(f"**Balance With Loan:** ${result['balance_with_loan']:,.2f}")
+        st.info(f"### 📉 Cost of the Loan at Payoff: **${result['delta']:,.2f}**")
+
+        yearly_data = result["yearly_data"]
+        labels, series = downsample(
+            list(yearly_data["labels"]),
+            {"No Loan": list(yearly_data["no_loan"]), "With Loan": list(yearly_data["with_loan"])},
+            CHART_MAX_POINTS,
+        )
+        st.line_chart({"Pay Period": labels, **series}, x="Pay Period")
+        with st.expander("Pay period schedule"):
+            st.dataframe(list(result["payperiod_data"]), hide_index=True)
+    add_general_disclaimer()
+
+@st.fragment
+def tsp_frontload():
+    st.header("TSP Front-Loading Calculator ⏩")
+    annual_salary = st.number_input("Annual Salary ($)", min_value=0.0, value=80000.0, step=1000.0, key="frontload_salary")
+    target_investment = st.number_input("Employee Contributions for the Year ($)", min_value=0.0, value=23500.0, step=500.0, key="frontload_target")
+    max_biweekly = st.number_input("Most You Can Contribute per Pay Period ($)", min_value=0.0, value=2000.0, step=100.0, key="frontload_max_biweekly")
+    match_percent = st.number_input("Contribution Needed for Full Match (% of salary)", min_value=0.0, max_value=100.0, value=5.0, step=0.5, key="frontload_match")
+    growth_rate = st.number_input("Expected Annual Growth (%)", value=7.0, step=0.25, key="frontload_growth")
+    include_match_in_growth = st.checkbox("Include agency match in growth", key="frontload_include_match")
+
+    try:
+        result, table, chart_data = calculate_tsp_frontload(annual_salary, target_investment, max_biweekly,
+                                                            match_percent, growth_rate, include_match_in_growth)
+    except ValueError as e:
+        st.error(str(e))
+    else:
+        st.subheader("Front-Loading Plan")
+        for line in result["summary_lines"]:
+            st.write(line)
+        st.write(f"**Front-Loaded Ending Balance:** ${result['front_ending_balance']:,.2f}")
+        st.write(f"**Evenly Spread Ending Balance:** ${result['even_ending_balance']:,.2f}")
+        st.info(f"### 💰 Front-Loading Advantage: **${result['advantage']:,.2f}**")
+        st.line_chart({"Pay Period": chart_data["labels"], "Front-Loaded": chart_data["front"], "Even": chart_data["even"]}, x="Pay Period")
+        with st.expander("Pay period schedule"):
+            st.dataframe(table, hide_index=True)
+    add_general_disclaimer()
+
 # Display the selected tab's content
 if tab == "🏖️ Annual Leave Lump Sum":
     annual_leave_lump_sum()
@@ -198,6 +330,15 @@ elif tab == "📅 Annual Leave Accrual":
 elif tab == "💼 Severance Pay Estimation":
     severance_pay_estimation()
 
+elif tab == "📈 TSP Growth":
+    tsp_growth()
+
+elif tab == "🏦 TSP Loan":
+    tsp_loan()
+
+elif tab == "⏩ TSP Front-Loading":
+    tsp_frontload()
+
 # Add spacing after the content
 st.markdown("<br>", unsafe_allow_html=True)
 
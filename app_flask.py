@@ -1,18 +1,118 @@
-from flask import Flask, render_template, request, redirect, url_for, session
+from flask import Flask, Response, render_template, request, redirect, url_for, session, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from collections.abc import Sequence
 from datetime import date, datetime, timedelta
+import csv
+import io
+import itertools
+import json
+import os
+import tempfile
+import numpy as np
+# Imported before calculations: it wraps every public calculator there with its timer
+from metrics import RequestTimer
 from calculations import (
     calculate_severance_pay,
     calculate_lump_sum_payment,
+    calculate_drp_comparison,
     calculate_annual_leave_accrual,
     calculate_scd,
     calculate_tsp_growth,
+    simulate_tsp_growth,
     calculate_tsp_loan,
-    calculate_tsp_frontload
+    calculate_tsp_loan_comparison,
+    calculate_tsp_frontload,
+    calculate_tsp_frontload_batch,
+    optimize_tsp_frontload,
+    calculate_tsp_loan_sweep,
+    project_annual_leave,
+    parse_tsp_loan_inputs
 )
+from money import round_cents
+from result_cache import ResultCache
+from roster import ROSTER_INPUT_FIELDS, ROSTER_OUTPUT_FIELDS, process_roster
+from charts import build_chart_payload
+from http_cache import HTTPCache
+from templating import configure_templates
+from profiling import RequestProfiler
+from session_store import MemorySessionStore, ServerSideSessionInterface, SQLiteSessionStore
+
+class CalculatorJSONProvider(DefaultJSONProvider):
+    """JSON provider that also serializes the lazy sequences returned by calculations.py."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Sequence) and not isinstance(o, (str, bytes)):
+            return list(o)
+        return DefaultJSONProvider.default(o)
 
 app = Flask(__name__)
+app.json = CalculatorJSONProvider(app)
 app.secret_key = 'replace_this_with_a_secure_key'
 
+# Sessions live server-side; the cookie only carries a short random id.
+# "sqlite" is shared by every worker on the host, "memory" is per process.
+# A changed session gets a new id; the old one stays readable for
+# FEDBENEFITS_SESSION_ROTATION_GRACE seconds so overlapping requests keep it.
+app.permanent_session_lifetime = timedelta(seconds=int(os.environ.get("FEDBENEFITS_SESSION_TTL", 7 * 86400)))
+if os.environ.get("FEDBENEFITS_SESSION_BACKEND", "sqlite") == "memory":
+    session_store = MemorySessionStore()
+else:
+    session_store = SQLiteSessionStore(os.environ.get(
+        "FEDBENEFITS_SESSION_PATH", os.path.join(tempfile.gettempdir(), "fedbenefits_sessions.sqlite3")
+    ))
+app.session_interface = ServerSideSessionInterface(
+    session_store, rotation_grace=int(os.environ.get("FEDBENEFITS_SESSION_ROTATION_GRACE", 60))
+)
+
+# Compiled templates persist across worker restarts
+configure_templates(app, os.environ.get(
+    "FEDBENEFITS_TEMPLATE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "fedbenefits_jinja")
+))
+# Phase timings (parse/calc/render) for Server-Timing, /metrics and /render-stats
+request_timer = RequestTimer(app, directory=os.environ.get(
+    "FEDBENEFITS_METRICS_DIR", os.path.join(tempfile.gettempdir(), "fedbenefits_metrics")
+))
+
+# Shared across gunicorn workers on this host; the calculators are pure, so
+# repeated submissions (mostly the form defaults) are served from here.
+# Without FEDBENEFITS_CACHE_PATH it lives in the user's private cache directory.
+result_cache = ResultCache(
+    os.environ.get("FEDBENEFITS_CACHE_PATH"),
+    max_entries=int(os.environ.get("FEDBENEFITS_CACHE_MAX_ENTRIES", 5000)),
+    ttl=int(os.environ.get("FEDBENEFITS_CACHE_TTL", 3600))
+)
+# metrics.py already times every calculator; cache hits skip the calculation and its timing
+calculate_severance_pay = result_cache.memoize(calculate_severance_pay)
+calculate_tsp_growth = result_cache.memoize(calculate_tsp_growth)
+simulate_tsp_growth = result_cache.memoize(simulate_tsp_growth)
+calculate_tsp_loan = result_cache.memoize(calculate_tsp_loan)
+calculate_tsp_loan_comparison = result_cache.memoize(calculate_tsp_loan_comparison)
+calculate_tsp_frontload = result_cache.memoize(calculate_tsp_frontload)
+optimize_tsp_frontload = result_cache.memoize(optimize_tsp_frontload)
+
+# Charts are downsampled to this many points; "float32" ships series as
+# base64-packed Float32 arrays instead of JSON number lists.
+app.config["CHART_MAX_POINTS"] = int(os.environ.get("FEDBENEFITS_CHART_MAX_POINTS", 120))
+app.config["CHART_ENCODING"] = os.environ.get("FEDBENEFITS_CHART_ENCODING", "json")
+
+# ETags, 304s for unchanged pages and gzip/brotli above 1 KB
+http_cache = HTTPCache(app, exempt=("static", "cache_stats", "render_stats", "metrics"))
+
+# Requests presenting this token (X-Profile header or ?_profile=) are profiled
+# to FEDBENEFITS_PROFILE_DIR; without a token the middleware is not installed.
+if os.environ.get("FEDBENEFITS_PROFILE_TOKEN"):
+    app.wsgi_app = RequestProfiler(
+        app.wsgi_app,
+        os.environ["FEDBENEFITS_PROFILE_TOKEN"],
+        os.environ.get("FEDBENEFITS_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "fedbenefits_profiles")),
+    )
+
+def chart_payload(labels, series):
+    return build_chart_payload(
+        labels, series, max_points=app.config["CHART_MAX_POINTS"], encoding=app.config["CHART_ENCODING"]
+    )
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -43,7 +143,10 @@ def show_leave_accrual_form():
         'years': 0,
         'pay_periods': 1,
         'hours_in_pay_status': '',
-        'avg_hours_per_period': ''
+        'avg_hours_per_period': '',
+        'starting_balance': '',
+        'leave_years': '',
+        'planned_usage': ''
     })
     return render_template('leave_accrual.html', values=values)
 
@@ -73,6 +176,10 @@ def show_drp_comparison_form():
         current_date=today.isoformat()
     )
 
+# Monte Carlo paths behind the percentile bands when a volatility is entered
+TSP_GROWTH_SIMULATION_PATHS = 10000
+API_MAX_SIMULATION_PATHS = 200000
+
 @app.route("/tsp-growth", methods=["GET", "POST"])
 def tsp_growth():
     if request.method == "POST":
@@ -83,6 +190,7 @@ def tsp_growth():
         years           = int(f.get("years", 0) or 0)
         annual_rate     = float(f.get("annual_rate", 0) or 0)
         inflation_rate  = float(f.get("inflation_rate", 0) or 0)
+        volatility      = float(f.get("volatility", 0) or 0)
         mode            = f.get("contribution_type", "percent")
 
         # defaults for template
@@ -158,6 +266,21 @@ def tsp_growth():
             annual_rate=annual_rate,
             inflation_rate=inflation_rate
         )
+        simulation = None
+        if volatility > 0 and years >= 1:
+            # Fixed seed: the same inputs always show the same bands, and hit the result cache
+            simulation = simulate_tsp_growth(
+                current_balance=current_balance,
+                annual_salary=annual_salary,
+                employee_percent=employee_percent,
+                employer_percent=employer_percent,
+                years=years,
+                annual_rate=annual_rate,
+                inflation_rate=inflation_rate,
+                volatility=volatility,
+                num_paths=TSP_GROWTH_SIMULATION_PATHS,
+                seed=0
+            )
 
         # Persist for GET prefill
         session["tsp_inputs"] = {
@@ -166,22 +289,41 @@ def tsp_growth():
             "annual_salary": annual_salary,
             "employee_percent": employee_percent,
             "employer_percent": employer_percent,
-            "contribution_dollar": round(contribution_dollar, 2),
-            "employer_amount": round(employer_amount, 2),
+            "contribution_dollar": round_cents(contribution_dollar),
+            "employer_amount": round_cents(employer_amount),
             "years": years,
             "annual_rate": annual_rate,
-            "inflation_rate": inflation_rate
+            "inflation_rate": inflation_rate,
+            "volatility": volatility
         }
 
+        yearly_data = list(result["yearly_data"])
+        chart = chart_payload(
+            [row["year"] for row in yearly_data],
+            {
+                "contributions": [row["contributions"] for row in yearly_data],
+                "growth": [row["growth"] for row in yearly_data],
+            },
+        )
+        band_chart = None
+        if simulation is not None:
+            band_chart = chart_payload(
+                [row["year"] for row in simulation["yearly_data"]], simulation["percentiles"]
+            )
+
         return render_template(
             "tsp_growth.html",
             result=result,
+            chart=chart,
+            simulation=simulation,
+            band_chart=band_chart,
+            volatility=volatility,
             current_balance=current_balance,
             annual_salary=annual_salary,
             employee_percent=employee_percent,
             employer_percent=employer_percent,
-            contribution_dollar=round(contribution_dollar, 2),
-            employer_amount=round(employer_amount, 2),
+            contribution_dollar=round_cents(contribution_dollar),
+            employer_amount=round_cents(employer_amount),
             years=years,
             annual_rate=annual_rate,
             inflation_rate=inflation_rate,
@@ -197,56 +339,94 @@ def tsp_loan():
     if request.method == "POST":
         form = request.form
 
-        try:
-            loan_type = form["loan_type"]
-            tsp_balance = float(form["tsp_balance"])
-            loan_amount = float(form["loan_amount"])
-            loan_interest_rate = float(form["loan_interest_rate"])
-            expected_annual_growth = float(form["expected_annual_growth"])
-            num_pay_periods = int(form["num_pay_periods"])
-            biweekly_contribution_no_loan = float(form["biweekly_contribution_no_loan"])
-            biweekly_contribution_during_loan = float(form["biweekly_contribution_during_loan"])
-        except (ValueError, KeyError):
-            return render_template("tsp_loan.html", error="Please enter valid numeric values.", values=form)
-
-        # Validations
-        if loan_amount < 1000:
-            return render_template("tsp_loan.html", error="Loan must be at least $1,000.", values=form)
-        if loan_amount > tsp_balance:
-            return render_template("tsp_loan.html", error="Loan cannot exceed current TSP balance.", values=form)
-        if num_pay_periods < 26 or num_pay_periods > 390:
-            return render_template("tsp_loan.html", error="Loan length must be between 26 and 390 pay periods.", values=form)
-        if loan_amount > 50000:
-            return render_template("tsp_loan.html", error="Loan cannot exceed $50,000.", values=form)
-        
-        # Loan-type-specific validation
-        loan_range = {
-            "general": (26, 130),
-            "residential": (131, 390)
-        }
-        min_pp, max_pp = loan_range[loan_type]
-        if not (min_pp <= num_pay_periods <= max_pp):
-            return render_template("tsp_loan.html", error=f"{loan_type.capitalize()} loans must be between {min_pp} and {max_pp} payments (pay periods).", values=form)
+        inputs, error = parse_tsp_loan_inputs(form)
+        if error:
+            return render_template("tsp_loan.html", error=error, values=form)
 
         session["tsp_loan_inputs"] = dict(form)
 
-        result = calculate_tsp_loan(
-            loan_type,
-            tsp_balance,
-            loan_amount,
-            loan_interest_rate,
-            expected_annual_growth,
-            num_pay_periods,
-            biweekly_contribution_no_loan,
-            biweekly_contribution_during_loan
+        result = calculate_tsp_loan(**inputs)
+        yearly_data = result["yearly_data"]
+        chart = chart_payload(
+            yearly_data["labels"], {"no_loan": yearly_data["no_loan"], "with_loan": yearly_data["with_loan"]}
         )
 
-        return render_template("tsp_loan.html", result=result, values=form)
+        return render_template("tsp_loan.html", result=result, values=form, chart=chart)
 
     # GET request
     saved_values = session.get("tsp_loan_inputs", {})
     return render_template("tsp_loan.html", result=None, values=saved_values)
 
+TSP_LOAN_SHARED_FIELDS = ("tsp_balance", "expected_annual_growth", "biweekly_contribution_no_loan")
+TSP_LOAN_OPTION_FIELDS = (
+    "loan_type", "loan_amount", "loan_interest_rate", "num_pay_periods", "biweekly_contribution_during_loan"
+)
+TSP_LOAN_MAX_OPTIONS = 4
+
+def parse_tsp_loan_options(shared, options):
+    """
+    Validate a loan comparison: the member's shared fields plus one mapping per option.
+
+    Every option goes through parse_tsp_loan_inputs, so the /tsp-loan limits
+    apply to each. Returns (inputs, error): inputs are
+    calculate_tsp_loan_comparison keyword arguments.
+    """
+    if not options:
+        return None, "Enter at least one loan option."
+    if len(options) > TSP_LOAN_MAX_OPTIONS:
+        return None, f"Compare at most {TSP_LOAN_MAX_OPTIONS} loan options."
+
+    parsed = []
+    for number, option in enumerate(options, start=1):
+        fields = {name: shared.get(name) for name in TSP_LOAN_SHARED_FIELDS}
+        fields.update({name: option.get(name) for name in TSP_LOAN_OPTION_FIELDS})
+        inputs, error = parse_tsp_loan_inputs(fields)
+        if error:
+            return None, f"Option {number}: {error}"
+        parsed.append(inputs)
+
+    inputs = {name: parsed[0][name] for name in TSP_LOAN_SHARED_FIELDS}
+    inputs["options"] = [{name: option[name] for name in TSP_LOAN_OPTION_FIELDS} for option in parsed]
+    return inputs, None
+
+def tsp_loan_option_rows(form):
+    """Option rows from the comparison form's repeated fields, skipping rows left blank."""
+    columns = [form.getlist(name) for name in TSP_LOAN_OPTION_FIELDS]
+    rows = [dict(zip(TSP_LOAN_OPTION_FIELDS, values)) for values in itertools.zip_longest(*columns, fillvalue="")]
+    return [row for row in rows if row["loan_amount"].strip() or row["num_pay_periods"].strip()]
+
+@app.route("/tsp-loan/compare", methods=["GET", "POST"])
+def tsp_loan_compare():
+    if request.method == "POST":
+        values = {name: request.form.get(name, "") for name in TSP_LOAN_SHARED_FIELDS}
+        values["options"] = tsp_loan_option_rows(request.form)
+
+        inputs, error = parse_tsp_loan_options(values, values["options"])
+        if error:
+            return render_template(
+                "tsp_loan_compare.html", result=None, values=values, error=error, max_options=TSP_LOAN_MAX_OPTIONS
+            )
+
+        session["tsp_loan_compare_inputs"] = values
+
+        result = calculate_tsp_loan_comparison(**inputs)
+        series = {"no_loan": result["no_loan"]}
+        for number, path in enumerate(result["with_loan"], start=1):
+            series[f"option_{number}"] = path
+        chart = chart_payload(result["labels"], series)
+
+        return render_template(
+            "tsp_loan_compare.html", result=result, values=values, chart=chart, max_options=TSP_LOAN_MAX_OPTIONS
+        )
+
+    # GET request: start from the saved comparison, or the last single loan
+    values = session.get("tsp_loan_compare_inputs")
+    if values is None:
+        saved = session.get("tsp_loan_inputs", {})
+        values = {name: saved.get(name, "") for name in TSP_LOAN_SHARED_FIELDS}
+        values["options"] = [{name: saved[name] for name in TSP_LOAN_OPTION_FIELDS if name in saved}] if saved else []
+    return render_template("tsp_loan_compare.html", result=None, values=values, max_options=TSP_LOAN_MAX_OPTIONS)
+
 @app.route('/severance', methods=['POST'])
 def process_severance():
     annual_salary = float(request.form['annual_salary'])
@@ -309,20 +489,60 @@ def process_leave_accrual():
     avg_hrs = request.form.get('avg_hours_per_period')
     avg_hrs = int(avg_hrs) if avg_hrs else None
 
+    # Optional multi-year projection: balance, ceiling and usage included
+    starting_balance = request.form.get('starting_balance')
+    starting_balance = float(starting_balance) if starting_balance else 0.0
+    leave_years = request.form.get('leave_years')
+    leave_years = int(leave_years) if leave_years else None
+    planned_usage = request.form.get('planned_usage')
+    planned_usage = float(planned_usage) if planned_usage else 0.0
+
     session['leave_accrual_inputs'] = {
         'employee_type': emp_type,
         'years': years,
         'pay_periods': periods,
         'hours_in_pay_status': hrs_status if hrs_status is not None else '',
-        'avg_hours_per_period': avg_hrs if avg_hrs is not None else ''
+        'avg_hours_per_period': avg_hrs if avg_hrs is not None else '',
+        'starting_balance': starting_balance,
+        'leave_years': leave_years if leave_years is not None else '',
+        'planned_usage': planned_usage
     }
 
     try:
         leave = calculate_annual_leave_accrual(emp_type, years, periods, hrs_status, avg_hrs)
-        return render_template('result_leave_accrual.html', result=round(leave, 2))
+        projection = None
+        if leave_years is not None:
+            projection = leave_projection_rows(
+                emp_type, years, starting_balance, leave_years, planned_usage, hrs_status, avg_hrs
+            )
+        return render_template('result_leave_accrual.html', result=round(leave, 2), projection=projection)
     except ValueError as e:
         return render_template('result_leave_accrual.html', error=str(e))
 
+LEAVE_PROJECTION_MAX_YEARS = 40
+
+def leave_projection_rows(employee_type, years, starting_balance, leave_years, planned_usage,
+                          hours_in_pay_status=None, avg_hours_per_period=None):
+    """Year-by-year rows of project_annual_leave for one employee, as the result page lists them."""
+    if not 1 <= leave_years <= LEAVE_PROJECTION_MAX_YEARS:
+        raise ValueError(f"Please enter between 1 and {LEAVE_PROJECTION_MAX_YEARS} leave years to project.")
+    if starting_balance < 0 or planned_usage < 0:
+        raise ValueError("Starting balance and planned usage cannot be negative.")
+    projection = project_annual_leave(
+        employee_type, years, starting_balance, leave_years, planned_usage,
+        hours_in_pay_status, avg_hours_per_period
+    )
+    return [
+        {
+            "year": year + 1,
+            "accrued": round(float(projection["accrued"][0, year]), 2),
+            "used": round(float(projection["used"][0, year]), 2),
+            "forfeited": round(float(projection["forfeited"][0, year]), 2),
+            "year_end_balance": round(float(projection["year_end_balance"][0, year]), 2),
+        }
+        for year in range(leave_years)
+    ]
+
 @app.route('/drp_comparison', methods=['POST'])
 def process_drp_comparison():
     biweekly_salary = float(request.form['biweekly_salary'])
@@ -341,17 +561,11 @@ def process_drp_comparison():
     today = date.today()
     sep_30 = date(today.year, 9, 30)
     remaining_periods = max(0, (sep_30 - drp_start).days // 14)
-    total_drp = biweekly_salary * remaining_periods
-    total_rif = biweekly_salary * rif_periods
-    adjusted_severance = severance_est + total_rif
+    comparison = calculate_drp_comparison(biweekly_salary, severance_est, remaining_periods, rif_periods)
 
     return render_template('result_drp_comparison.html', result={
-        "total_drp": round(total_drp, 2),
-        "severance_est": round(severance_est, 2),
-        "total_rif": round(total_rif, 2),
-        "adjusted_severance": round(adjusted_severance, 2),
+        **comparison,
         "remaining_periods": remaining_periods,
-        "better": "DRP" if total_drp > adjusted_severance else "Severance" if adjusted_severance > total_drp else "Equal"
     })
 
 @app.route('/scd', methods=['GET', 'POST'])
@@ -380,7 +594,8 @@ def scd_calculator():
                 total_days = current_days
                 period_breakdown = [current_period]
             else:
-                # Calculate SCD using prior periods
+                # Calculate SCD using prior periods. calculate_scd counts overlapping periods twice,
+                # unlike calculate_scd_batch (roster uploads), so the two can disagree on such histories
                 scd, total_days, period_breakdown = calculate_scd(current_start, prior_periods)
 
                 total_service_days = total_days + current_days
@@ -404,56 +619,470 @@ def scd_calculator():
 
     return render_template("scd.html", scd=scd, error=error)
 
-@app.route("/tsp-frontload", methods=["GET", "POST"])
-def tsp_frontload():
-    if request.method == "POST":
-        form = request.form
-        try:
-            annual_salary = float(form["annual_salary"])
-            target_investment = float(form["target_investment"])
-            max_biweekly = float(form["max_biweekly"])
-            match_percent = float(form["match_percent"])
-            growth_rate = float(form["growth_rate"])
-            include_match = "include_match_in_growth" in form  
-        except (ValueError, KeyError):
-            values = {
-                "annual_salary": form.get("annual_salary", ""),
-                "target_investment": form.get("target_investment", ""),
-                "max_biweekly": form.get("max_biweekly", ""),
-                "match_percent": form.get("match_percent", ""),
-                "growth_rate": form.get("growth_rate", ""),
-                "include_match_in_growth": "include_match_in_growth" in form  
-            }
-            return render_template("tsp_frontload.html", result=None, values=values, error="Invalid input")
+def parse_tsp_frontload_inputs(form):
+    """
+    Parse TSP front-load inputs from a form (or any mapping).
 
+    Returns (values, error): on success values holds the typed inputs and
+    error is None; otherwise values echoes the raw fields for the form.
+    """
+    try:
         values = {
-            "annual_salary": annual_salary,
-            "target_investment": target_investment,
-            "max_biweekly": max_biweekly,
-            "match_percent": match_percent,
-            "growth_rate": growth_rate,
-            "include_match_in_growth": include_match  
+            "annual_salary": float(form["annual_salary"]),
+            "target_investment": float(form["target_investment"]),
+            "max_biweekly": float(form["max_biweekly"]),
+            "match_percent": float(form["match_percent"]),
+            "growth_rate": float(form["growth_rate"]),
+            "include_match_in_growth": "include_match_in_growth" in form,
+            "optimize_max_biweekly": "optimize_max_biweekly" in form
+        }
+    except (ValueError, KeyError, TypeError):
+        values = {
+            "annual_salary": form.get("annual_salary", ""),
+            "target_investment": form.get("target_investment", ""),
+            "max_biweekly": form.get("max_biweekly", ""),
+            "match_percent": form.get("match_percent", ""),
+            "growth_rate": form.get("growth_rate", ""),
+            "include_match_in_growth": "include_match_in_growth" in form,
+            "optimize_max_biweekly": "optimize_max_biweekly" in form
         }
+        return values, "Invalid input"
+    return values, None
+
+def optimize_tsp_frontload_max(values):
+    """The best max_biweekly up to the entered one; the whole target is invested."""
+    return optimize_tsp_frontload(
+        annual_salary=values["annual_salary"],
+        match_percent=values["match_percent"],
+        annual_growth_percent=values["growth_rate"],
+        annual_limit=values["target_investment"],
+        max_biweekly_cap=values["max_biweekly"],
+        include_match_in_growth=values["include_match_in_growth"]
+    )
+
+def run_tsp_frontload(values):
+    return calculate_tsp_frontload(
+        annual_salary=values["annual_salary"],
+        target_investment=values["target_investment"],
+        max_biweekly=values["max_biweekly"],
+        match_percent=values["match_percent"],
+        annual_growth_percent=values["growth_rate"],
+        include_match_in_growth=values["include_match_in_growth"]
+    )
+
+@app.route("/tsp-frontload", methods=["GET", "POST"])
+def tsp_frontload():
+    if request.method == "POST":
+        values, error = parse_tsp_frontload_inputs(request.form)
+        if error:
+            return render_template("tsp_frontload.html", result=None, values=values, error=error)
 
         try:
-            result, table, chart_data = calculate_tsp_frontload(
-                annual_salary=annual_salary,
-                target_investment=target_investment,
-                max_biweekly=max_biweekly,
-                match_percent=match_percent,
-                annual_growth_percent=growth_rate,
-                include_match_in_growth=include_match
-            )
+            optimized = None
+            if values["optimize_max_biweekly"]:
+                optimized = optimize_tsp_frontload_max(values)
+                if optimized["front_load"]:
+                    # Show (and export) the schedule for the best maximum found
+                    values["max_biweekly"] = optimized["max_biweekly"]
+            result, table, chart_data = run_tsp_frontload(values)
         except Exception as e:
             import traceback
             traceback.print_exc()
             return render_template("tsp_frontload.html", result=None, values=values, error=str(e))
 
-        return render_template("tsp_frontload.html", result=result, values=values, table=table, chart_data=chart_data)
+        session["tsp_frontload_inputs"] = values
+
+        chart = chart_payload(chart_data["labels"], {"front": chart_data["front"], "even": chart_data["even"]})
+
+        return render_template("tsp_frontload.html", result=result, values=values, table=table, chart=chart,
+                               optimized=optimized)
 
     # GET request
     return render_template("tsp_frontload.html", result=None, values={})
 
+TSP_LOAN_EXPORT_FIELDS = [
+    "period", "no_loan", "with_loan", "diff", "loan_balance", "remaining_loan_payments",
+    "interest", "principal", "contribution_with_loan", "contribution_no_loan"
+]
+TSP_FRONTLOAD_EXPORT_FIELDS = [
+    "PP", "Front Contribution", "Even Contribution", "Type", "Cumulative Front", "Cumulative Even",
+    "Front Begin", "Front End", "Even Begin", "Even End"
+]
+
+class _LineBuffer:
+    """File-like object whose write() hands the formatted line back to the csv writer's caller."""
+
+    def write(self, line):
+        return line
+
+def stream_rows(rows, fieldnames, filename, fmt):
+    """
+    Stream rows as a CSV or NDJSON download, one line per row.
+
+    Rows are pulled from the iterable as the response is sent, so the whole
+    document is never built in memory.
+    """
+    if fmt == "ndjson":
+        body = (json.dumps(row) + "\n" for row in rows)
+        mimetype = "application/x-ndjson"
+    elif fmt == "csv":
+        writer = csv.DictWriter(_LineBuffer(), fieldnames=fieldnames, extrasaction="ignore")
+        body = itertools.chain([writer.writeheader()], (writer.writerow(row) for row in rows))
+        mimetype = "text/csv"
+    else:
+        return jsonify(error="Unsupported export format; use csv or ndjson."), 400
+
+    return Response(body, mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename={filename}.{fmt}"
+    })
+
+@app.route("/tsp-loan/export", methods=["GET", "POST"])
+def export_tsp_loan():
+    # Explicit inputs win; otherwise export the last calculation from this session
+    source = request.values if "loan_amount" in request.values else session.get("tsp_loan_inputs", {})
+    inputs, error = parse_tsp_loan_inputs(source)
+    if error:
+        return jsonify(error=error), 400
+
+    result = calculate_tsp_loan(**inputs)
+    return stream_rows(result["payperiod_data"], TSP_LOAN_EXPORT_FIELDS, "tsp_loan_schedule",
+                       request.args.get("format", "csv"))
+
+@app.route("/tsp-frontload/export", methods=["GET", "POST"])
+def export_tsp_frontload():
+    if "annual_salary" in request.values:
+        values, error = parse_tsp_frontload_inputs(request.values)
+    else:
+        values = session.get("tsp_frontload_inputs")
+        error = None if values else "No front-load calculation to export."
+    if error:
+        return jsonify(error=error), 400
+
+    try:
+        _result, table, _chart_data = run_tsp_frontload(values)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return stream_rows(table, TSP_FRONTLOAD_EXPORT_FIELDS, "tsp_frontload_schedule",
+                       request.args.get("format", "csv"))
+
+# Roster uploads share one pool of this many processes, by default one per
+# core. Each gunicorn worker has its own pool, so with several set
+# FEDBENEFITS_ROSTER_WORKERS to the cores divided by the gunicorn workers.
+app.config["ROSTER_WORKERS"] = int(os.environ.get("FEDBENEFITS_ROSTER_WORKERS", 0)) or None
+
+@app.route("/roster", methods=["GET", "POST"])
+def roster():
+    if request.method == "POST":
+        upload = request.files.get("roster")
+        if upload is None or not upload.filename:
+            return render_template("roster.html", fields=ROSTER_INPUT_FIELDS, error="Choose a CSV file to upload.")
+
+        # Werkzeug spools large uploads to disk; rows are decoded and parsed as the response streams
+        lines = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+        try:
+            rows = process_roster(lines, workers=app.config["ROSTER_WORKERS"])
+        except (ValueError, csv.Error) as e:
+            return render_template("roster.html", fields=ROSTER_INPUT_FIELDS, error=str(e))
+
+        return stream_rows(stream_with_context(rows), ROSTER_OUTPUT_FIELDS, "roster_results",
+                           request.form.get("format", "csv"))
+
+    return render_template("roster.html", fields=ROSTER_INPUT_FIELDS)
+
+@app.route("/roster/template.csv")
+def roster_template():
+    return Response(",".join(ROSTER_INPUT_FIELDS) + "\r\n", mimetype="text/csv", headers={
+        "Content-Disposition": "attachment; filename=roster_template.csv"
+    })
+
+# --- JSON API -------------------------------------------------------------
+# /api/v1/<calculator> accepts one JSON object, or a list of them for
+# batching, calls calculations.py directly and returns compact JSON. It
+# never renders templates or writes to the session.
+
+API_MAX_BATCH = 1000
+
+def _api_severance(payload):
+    annual_salary = float(payload["annual_salary"])
+    years = int(payload["years"])
+    months = int(payload.get("months", 0))
+    age_years = int(payload["age_years"])
+    age_months = int(payload.get("age_months", 0))
+    if annual_salary == 0 or (years == 0 and months == 0) or age_years == 0:
+        raise ValueError("Please enter valid input values greater than zero for calculation.")
+
+    total, basic, age_adj, biweekly, weeks = calculate_severance_pay(
+        annual_salary, years, months, age_years, age_months
+    )
+    return {
+        "basic": round(basic, 2),
+        "age_adj": round(age_adj, 2),
+        "total": round(total, 2),
+        "biweekly": round(biweekly, 2),
+        "weeks": round(weeks, 2)
+    }
+
+def _api_lump_sum(payload):
+    lump_sum = calculate_lump_sum_payment(float(payload["hourly_rate"]), float(payload["leave_hours"]))
+    return {"lump_sum": round(lump_sum, 2)}
+
+def _api_leave_accrual(payload):
+    hrs_status = payload.get("hours_in_pay_status")
+    avg_hrs = payload.get("avg_hours_per_period")
+    leave = calculate_annual_leave_accrual(
+        payload["employee_type"],
+        int(payload["years"]),
+        int(payload["pay_periods"]),
+        float(hrs_status) if hrs_status not in (None, "") else None,
+        float(avg_hrs) if avg_hrs not in (None, "") else None
+    )
+    return {"accrued_hours": round(leave, 2)}
+
+def _api_leave_projection(payload):
+    hrs_status = payload.get("hours_in_pay_status")
+    avg_hrs = payload.get("avg_hours_per_period")
+    leave_years = int(payload.get("leave_years", 1))
+    if not 1 <= leave_years <= LEAVE_PROJECTION_MAX_YEARS:
+        raise ValueError(f"leave_years must be between 1 and {LEAVE_PROJECTION_MAX_YEARS}.")
+    # Every per-employee field may be a list, so a whole workforce projects in one call
+    projection = project_annual_leave(
+        payload["employee_type"],
+        payload["years"],
+        payload.get("starting_balance", 0),
+        leave_years,
+        payload.get("planned_usage", 0),
+        hrs_status if hrs_status not in (None, "") else None,
+        avg_hrs if avg_hrs not in (None, "") else None
+    )
+    return {key: np.round(values, 2).tolist() for key, values in projection.items()}
+
+def _api_scd(payload):
+    prior_periods = [(start, end) for start, end in payload.get("prior_periods", [])]
+    scd, total_days, period_breakdown = calculate_scd(payload["current_start"], prior_periods)
+    return {"scd": scd.isoformat(), "total_days": total_days, "periods": period_breakdown}
+
+def _api_tsp_growth(payload):
+    return calculate_tsp_growth(
+        current_balance=float(payload.get("current_balance", 0)),
+        annual_salary=float(payload["annual_salary"]),
+        employee_percent=float(payload["employee_percent"]),
+        employer_percent=float(payload.get("employer_percent", 0)),
+        years=int(payload["years"]),
+        annual_rate=float(payload["annual_rate"]),
+        inflation_rate=float(payload.get("inflation_rate", 0))
+    )
+
+def _api_tsp_growth_simulate(payload):
+    num_paths = int(payload.get("num_paths", TSP_GROWTH_SIMULATION_PATHS))
+    if not 1 <= num_paths <= API_MAX_SIMULATION_PATHS:
+        raise ValueError(f"num_paths must be between 1 and {API_MAX_SIMULATION_PATHS}.")
+    percentiles = tuple(float(q) for q in payload.get("percentiles", (10, 50, 90)))
+    if not all(0 <= q <= 100 for q in percentiles):
+        raise ValueError("percentiles must be between 0 and 100.")
+    return simulate_tsp_growth(
+        current_balance=float(payload.get("current_balance", 0)),
+        annual_salary=float(payload["annual_salary"]),
+        employee_percent=float(payload["employee_percent"]),
+        employer_percent=float(payload.get("employer_percent", 0)),
+        years=int(payload["years"]),
+        annual_rate=float(payload["annual_rate"]),
+        inflation_rate=float(payload.get("inflation_rate", 0)),
+        volatility=float(payload.get("volatility", 15.0)),
+        num_paths=num_paths,
+        percentiles=percentiles,
+        seed=int(payload.get("seed", 0))
+    )
+
+def _api_tsp_loan(payload):
+    inputs, error = parse_tsp_loan_inputs(payload)
+    if error:
+        raise ValueError(error)
+    return calculate_tsp_loan(**inputs)
+
+def _api_tsp_loan_compare(payload):
+    options = payload["options"]
+    if not isinstance(options, list) or not all(isinstance(option, dict) for option in options):
+        raise ValueError("options must be a list of JSON objects.")
+    inputs, error = parse_tsp_loan_options(payload, options)
+    if error:
+        raise ValueError(error)
+    return calculate_tsp_loan_comparison(**inputs)
+
+def _api_tsp_frontload(payload):
+    # The form treats the checkbox's presence as "on"; JSON sends a boolean
+    form = {k: v for k, v in payload.items() if k != "include_match_in_growth" or v}
+    values, error = parse_tsp_frontload_inputs(form)
+    if error:
+        raise ValueError(error)
+    result, table, chart_data = run_tsp_frontload(values)
+    return {"result": result, "table": table, "chart_data": chart_data}
+
+def _api_tsp_frontload_optimize(payload):
+    # max_biweekly is the cap for the search; without it the search runs up to gross biweekly pay
+    form = {k: v for k, v in payload.items() if k != "include_match_in_growth" or v}
+    form.setdefault("max_biweekly", float(payload["annual_salary"]) / 26)
+    values, error = parse_tsp_frontload_inputs(form)
+    if error:
+        raise ValueError(error)
+    return optimize_tsp_frontload_max(values)
+
+API_CALCULATORS = {
+    "severance": _api_severance,
+    "lump-sum": _api_lump_sum,
+    "leave-accrual": _api_leave_accrual,
+    "leave-projection": _api_leave_projection,
+    "scd": _api_scd,
+    "tsp-growth": _api_tsp_growth,
+    "tsp-growth-simulate": _api_tsp_growth_simulate,
+    "tsp-loan": _api_tsp_loan,
+    "tsp-loan-compare": _api_tsp_loan_compare,
+    "tsp-frontload": _api_tsp_frontload,
+    "tsp-frontload-optimize": _api_tsp_frontload_optimize
+}
+
+def _api_call(handler, payload):
+    if not isinstance(payload, dict):
+        return {"error": "Each input must be a JSON object."}
+    try:
+        return {"result": handler(payload)}
+    except KeyError as e:
+        return {"error": f"Missing field: {e.args[0]}"}
+    except (ValueError, TypeError) as e:
+        return {"error": str(e)}
+
+def _api_response(data, status=200):
+    return Response(app.json.dumps(data, separators=(",", ":")), status=status, mimetype="application/json")
+
+@app.route("/api/v1/<calculator>", methods=["POST"])
+def api_v1(calculator):
+    handler = API_CALCULATORS.get(calculator)
+    if handler is None:
+        return _api_response({"error": f"Unknown calculator: {calculator}"}, 404)
+
+    payload = request.get_json(silent=True)
+    if payload is None:
+        return _api_response({"error": "Request body must be JSON."}, 400)
+
+    if isinstance(payload, list):
+        if len(payload) > API_MAX_BATCH:
+            return _api_response({"error": f"Batches are limited to {API_MAX_BATCH} inputs."}, 413)
+        return _api_response({"results": [_api_call(handler, item) for item in payload]})
+
+    outcome = _api_call(handler, payload)
+    return _api_response(outcome, 400 if "error" in outcome else 200)
+
+API_MAX_SWEEP_POINTS = 100000
+
+def _sweep_values(spec, name, cast=float):
+    """A sweep axis: either an explicit list or {"start", "stop", "num"} (inclusive, evenly spaced)."""
+    if isinstance(spec, dict):
+        num = int(spec.get("num", 10))
+        if not 1 <= num <= 1000:
+            raise ValueError(f"{name}.num must be between 1 and 1000.")
+        values = np.linspace(float(spec["start"]), float(spec["stop"]), num)
+    elif isinstance(spec, list) and spec:
+        values = np.asarray([float(v) for v in spec])
+    else:
+        raise ValueError(f"{name} must be a non-empty list or a {{start, stop, num}} range.")
+    if not np.isfinite(values).all():
+        raise ValueError(f"{name} values must be finite numbers.")
+    if cast is int:
+        values = np.unique(np.rint(values).astype(np.int64))
+    return values
+
+@app.route("/api/v1/tsp-loan/sweep", methods=["POST"])
+def api_v1_tsp_loan_sweep():
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return _api_response({"error": "Request body must be a JSON object."}, 400)
+
+    try:
+        tsp_balance = float(payload["tsp_balance"])
+        loan_interest_rate = float(payload["loan_interest_rate"])
+        contribution_no_loan = float(payload["biweekly_contribution_no_loan"])
+        contribution_during_loan = float(payload["biweekly_contribution_during_loan"])
+        loan_amounts = _sweep_values(payload["loan_amount"], "loan_amount")
+        pay_periods = _sweep_values(payload["num_pay_periods"], "num_pay_periods", cast=int)
+        growth_rates = _sweep_values(payload["expected_annual_growth"], "expected_annual_growth")
+    except KeyError as e:
+        return _api_response({"error": f"Missing field: {e.args[0]}"}, 400)
+    except (ValueError, TypeError) as e:
+        return _api_response({"error": str(e)}, 400)
+
+    # Same limits as the /tsp-loan form, applied to every point in the grid
+    if loan_amounts.min() < 1000:
+        return _api_response({"error": "Loan must be at least $1,000."}, 400)
+    if loan_amounts.max() > tsp_balance:
+        return _api_response({"error": "Loan cannot exceed current TSP balance."}, 400)
+    if loan_amounts.max() > 50000:
+        return _api_response({"error": "Loan cannot exceed $50,000."}, 400)
+    if pay_periods.min() < 26 or pay_periods.max() > 390:
+        return _api_response({"error": "Loan length must be between 26 and 390 pay periods."}, 400)
+    if loan_amounts.size * pay_periods.size * growth_rates.size > API_MAX_SWEEP_POINTS:
+        return _api_response({"error": f"Sweeps are limited to {API_MAX_SWEEP_POINTS} grid points."}, 413)
+
+    grid = calculate_tsp_loan_sweep(
+        tsp_balance, loan_amounts, loan_interest_rate, growth_rates, pay_periods,
+        contribution_no_loan, contribution_during_loan
+    )
+    return _api_response({
+        "loan_amount": loan_amounts.tolist(),
+        "num_pay_periods": pay_periods.tolist(),
+        "expected_annual_growth": growth_rates.tolist(),
+        "loan_type": ["residential" if n > 130 else "general" for n in pay_periods.tolist()],
+        **{key: values.tolist() for key, values in grid.items()}
+    })
+
+TSP_FRONTLOAD_BATCH_FIELDS = ("annual_salary", "target_investment", "max_biweekly", "match_percent", "growth_rate")
+
+@app.route("/api/v1/tsp-frontload/batch", methods=["POST"])
+def api_v1_tsp_frontload_batch():
+    """Front-load summaries for many employees: each field is a number or a list, broadcast together."""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return _api_response({"error": "Request body must be a JSON object."}, 400)
+
+    try:
+        columns = [np.atleast_1d(np.asarray(payload[name], dtype=float)) for name in TSP_FRONTLOAD_BATCH_FIELDS]
+        include_match = np.atleast_1d(np.asarray(payload.get("include_match_in_growth", False), dtype=bool))
+        size = np.broadcast(*columns, include_match).size
+    except KeyError as e:
+        return _api_response({"error": f"Missing field: {e.args[0]}"}, 400)
+    except (ValueError, TypeError) as e:
+        return _api_response({"error": str(e)}, 400)
+    if any(column.ndim != 1 for column in columns):
+        return _api_response({"error": "Fields must be numbers or flat lists."}, 400)
+    if size > API_MAX_SWEEP_POINTS:
+        return _api_response({"error": f"Batches are limited to {API_MAX_SWEEP_POINTS} employees."}, 413)
+
+    batch = calculate_tsp_frontload_batch(*columns, include_match)
+    # Rows below the yearly minimum for the full match come back with valid false and null figures
+    return _api_response({
+        key: [None if isinstance(v, float) and np.isnan(v) else v for v in values.tolist()]
+        for key, values in batch.items()
+    })
+
+@app.route("/cache-stats")
+def cache_stats():
+    return jsonify(result_cache.stats())
+
+@app.route("/render-stats")
+def render_stats():
+    return jsonify(request_timer.stats())
+
+@request_timer.add_collector
+def result_cache_metrics():
+    stats = result_cache.stats()
+    return [
+        ("fedbenefits_result_cache_hits_total", "counter", "Result cache lookups served from the cache.", stats["hits"]),
+        ("fedbenefits_result_cache_misses_total", "counter", "Result cache lookups that ran the calculation.", stats["misses"]),
+        ("fedbenefits_result_cache_hit_ratio", "gauge", "Share of result cache lookups that hit.", stats["hit_rate"]),
+        ("fedbenefits_result_cache_entries", "gauge", "Entries currently in the result cache.", stats["entries"]),
+    ]
+
+@app.route("/metrics")
+def metrics():
+    return Response(request_timer.prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.errorhandler(404)
 def not_found(e):
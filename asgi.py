@@ -0,0 +1,154 @@
+"""
+ASGI entry point serving the Flask app under an async server.
+
+    uvicorn asgi:app --workers 4
+
+Each request's WSGI call (form parsing, calculations.py, template rendering)
+runs on a thread pool, so the event loop stays free to accept connections
+and move bytes. Bodies are produced in the pool and written from the loop:
+a worker thread is released as soon as a page is rendered, and a slow client
+only holds a pending write, not a thread. Streamed exports are pulled from
+the pool in batches. Request bodies are spooled to disk past 1 MB.
+"""
+import asyncio
+import contextvars
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from app_flask import app as flask_app
+
+# Bytes of a response body gathered per trip to the pool
+BATCH_BYTES = 64 * 1024
+SPOOL_BYTES = 1024 * 1024
+
+
+class ASGIAdapter:
+    """
+    Serve a WSGI application over ASGI, running it on a thread pool.
+
+    Parameters:
+     - wsgi_app: the WSGI callable (the Flask app)
+     - max_threads: size of the pool the WSGI app runs on
+    """
+
+    def __init__(self, wsgi_app, max_threads=None):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="asgi")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        else:
+            raise NotImplementedError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                # Waiting for in-flight requests blocks, so do it off the event loop
+                await asyncio.to_thread(self.executor.shutdown, wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _read_body(self, receive):
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            body.write(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body.seek(0)
+        return body
+
+    def _environ(self, scope, body):
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope["query_string"].decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+            "REMOTE_ADDR": client[0],
+            "REMOTE_PORT": str(client[1]),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope["headers"]:
+            name = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                name = f"HTTP_{name}"
+            environ[name] = f"{environ[name]},{value}" if name in environ else value
+        return environ
+
+    def _start(self, environ):
+        """Call the WSGI app and gather the first batch of its body (runs on the pool)."""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get("sent"):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+
+        iterable = self.wsgi_app(environ, start_response)
+        iterator = iter(iterable)
+        chunks, done = self._next_batch(iterator)
+        return response, iterable, iterator, chunks, done
+
+    @staticmethod
+    def _next_batch(iterator):
+        chunks = []
+        size = 0
+        for chunk in iterator:
+            if chunk:
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= BATCH_BYTES:
+                    return chunks, False
+        return chunks, True
+
+    async def _http(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        body = await self._read_body(receive)
+        environ = self._environ(scope, body)
+        # Every hop runs in one context, so generators that push a Flask
+        # context keep seeing it whichever pool thread resumes them
+        context = contextvars.copy_context()
+        response, iterable, iterator, chunks, done = await loop.run_in_executor(
+            self.executor, context.run, self._start, environ
+        )
+        try:
+            response["sent"] = True
+            await send({"type": "http.response.start", "status": response["status"], "headers": response["headers"]})
+            while True:
+                for chunk in chunks:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                if done:
+                    break
+                chunks, done = await loop.run_in_executor(self.executor, context.run, self._next_batch, iterator)
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                await loop.run_in_executor(self.executor, context.run, close)
+            body.close()
+
+
+app = ASGIAdapter(flask_app, max_threads=int(os.environ.get("FEDBENEFITS_ASGI_THREADS", 8)))
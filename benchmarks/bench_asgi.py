@@ -0,0 +1,180 @@
+"""
+Benchmark the ASGI entry point (uvicorn asgi:app) against the gunicorn sync setup.
+
+Starts each server with the same number of worker processes, then drives it
+with fast clients looping over a request mix while a set of slow clients
+download the 390-period TSP loan page a few KB at a time. Reports fast-client
+throughput and latency percentiles, which is where slow clients holding sync
+workers show up.
+
+Run from the repository root (needs gunicorn and uvicorn installed):
+    python benchmarks/bench_asgi.py [--workers 2] [--clients 16] [--slow-clients 8] [--duration 10]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import tempfile
+import time
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOAN_FORM = {
+    "loan_type": "residential",
+    "tsp_balance": 150000,
+    "loan_amount": 25000,
+    "loan_interest_rate": 4.375,
+    "expected_annual_growth": 6.5,
+    "num_pay_periods": 390,
+    "biweekly_contribution_no_loan": 450,
+    "biweekly_contribution_during_loan": 300,
+}
+REQUEST_MIX = (
+    ("GET", "/", None),
+    ("POST", "/severance", {"annual_salary": 98000, "years": 17, "months": 5, "age_years": 52, "age_months": 4}),
+    ("POST", "/tsp-loan", {**LOAN_FORM, "num_pay_periods": 60, "loan_type": "general"}),
+    ("POST", "/tsp-loan", LOAN_FORM),
+)
+
+
+def server_commands(workers, port):
+    bind = f"127.0.0.1:{port}"
+    return {
+        "gunicorn (sync)": ["gunicorn", "app_flask:app", "-w", str(workers), "-b", bind, "--log-level", "warning"],
+        "uvicorn (asgi)": ["uvicorn", "asgi:app", "--workers", str(workers), "--host", "127.0.0.1",
+                           "--port", str(port), "--log-level", "warning"],
+    }
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+async def fetch(port, method, path, form=None, read_size=65536, read_delay=0.0, rcvbuf=None):
+    """One request over a fresh connection; returns (status, bytes read)."""
+    sock = socket.socket()
+    if rcvbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", port))
+    reader, writer = await asyncio.open_connection(sock=sock)
+    body = urlencode(form).encode() if form else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n"
+    if form:
+        head += f"Content-Type: application/x-www-form-urlencoded\r\nContent-Length: {len(body)}\r\n"
+    writer.write(head.encode() + b"\r\n" + body)
+    await writer.drain()
+
+    received = b""
+    total = 0
+    while True:
+        chunk = await reader.read(read_size)
+        if not chunk:
+            break
+        if total < 16:
+            received += chunk[:16]
+        total += len(chunk)
+        if read_delay:
+            await asyncio.sleep(read_delay)
+    writer.close()
+    return int(received.split(b" ", 2)[1]), total
+
+
+async def run_load(port, clients, slow_clients, duration):
+    latencies = []
+    errors = 0
+    stop = time.perf_counter() + duration
+
+    async def fast_client(offset):
+        nonlocal errors
+        i = offset
+        while time.perf_counter() < stop:
+            method, path, form = REQUEST_MIX[i % len(REQUEST_MIX)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                status, _ = await fetch(port, method, path, form)
+            except OSError:
+                status = 0
+            if status != 200:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    async def slow_client():
+        while time.perf_counter() < stop:
+            try:
+                await fetch(port, "POST", "/tsp-loan", LOAN_FORM, read_size=4096, read_delay=0.05, rcvbuf=4096)
+            except OSError:
+                pass
+
+    await asyncio.gather(*(fast_client(i) for i in range(clients)), *(slow_client() for _ in range(slow_clients)))
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(int(len(latencies) * p / 100), len(latencies) - 1)] * 1e3
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(pct(50), 2),
+        "p95_ms": round(pct(95), 2),
+        "p99_ms": round(pct(99), 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1e3, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2, help="worker processes per server")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent fast clients")
+    parser.add_argument("--slow-clients", type=int, default=8, help="concurrent slow-reading clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per server")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    bench_dir = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        FEDBENEFITS_CACHE_PATH=os.path.join(bench_dir, "bench_cache.sqlite3"),
+        FEDBENEFITS_SESSION_PATH=os.path.join(bench_dir, "bench_sessions.sqlite3"),
+    )
+    results = {}
+    for name in server_commands(args.workers, 0):
+        port = free_port()
+        process = subprocess.Popen(server_commands(args.workers, port)[name], cwd=ROOT, env=env)
+        try:
+            wait_for_port(port)
+            asyncio.run(run_load(port, args.clients, 0, 1.0))  # warm up workers and the result cache
+            results[name] = asyncio.run(run_load(port, args.clients, args.slow_clients, args.duration))
+        finally:
+            process.terminate()
+            process.wait()
+
+    print(f"{'server':<18} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}")
+    for name, r in results.items():
+        print(f"{name:<18} {r['throughput_rps']:>8} {r['p50_ms']:>7}ms {r['p95_ms']:>7}ms {r['p99_ms']:>7}ms {r['errors']:>7}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark the integer-cents calculators against the float versions they
+replaced (frozen in tests/reference.py) and against Decimal.
+
+tests/test_money.py checks that the two agree except at exact half-cent
+ties; this script only times them.
+
+Run from the repository root:
+    python benchmarks/bench_money.py [cases]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculations import (
+    calculate_drp_comparison,
+    calculate_lump_sum_payment,
+    calculate_severance_pay,
+    calculate_tsp_frontload,
+)
+from tests.reference import decimal_severance, float_drp, float_frontload, float_lump_sum, float_severance
+
+
+def build_cases(size, seed=0):
+    rng = np.random.default_rng(seed)
+    salary = rng.uniform(30000, 190000, size).round(2).tolist()
+    frontload = []
+    for s, pct, growth in zip(salary, rng.choice([1, 3, 4, 5], size).tolist(), rng.uniform(-5, 12, size).round(2).tolist()):
+        base = round(s * pct / 100 / 26, 2)
+        target = round(base * 26 + float(rng.uniform(0, 23500 - base * 26 if base * 26 < 23500 else 1)), 2)
+        frontload.append((s, target, round(base + float(rng.uniform(0, 3000)), 2), pct, growth, bool(rng.integers(2))))
+    return {
+        "lump_sum": list(zip(rng.uniform(15, 95, size).round(2).tolist(),
+                             (rng.integers(0, 960, size) / 4).tolist())),
+        "severance": list(zip(salary, rng.integers(0, 45, size).tolist(), rng.integers(0, 12, size).tolist(),
+                              rng.integers(22, 75, size).tolist(), rng.integers(0, 12, size).tolist())),
+        "drp": list(zip(rng.uniform(1000, 8000, size).round(2).tolist(), rng.uniform(0, 150000, size).round(2).tolist(),
+                        rng.integers(0, 26, size).tolist(), rng.integers(0, 26, size).tolist())),
+        "frontload": frontload,
+    }
+
+
+def timed(func, cases, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for case in cases:
+            func(*case)
+        best = min(best, time.perf_counter() - start)
+    return best / len(cases) * 1e6
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    cases = build_cases(size)
+
+    print(f"{'calculator':<10} {'float':>10} {'cents':>10} {'speedup':>8}")
+    for name, old, new in (
+        ("lump_sum", float_lump_sum, calculate_lump_sum_payment),
+        ("severance", float_severance, calculate_severance_pay),
+        ("drp", float_drp, calculate_drp_comparison),
+        ("frontload", float_frontload, calculate_tsp_frontload),
+    ):
+        old_us = timed(old, cases[name][:5000])
+        new_us = timed(new, cases[name][:5000])
+        print(f"{name:<10} {old_us:>8.2f}us {new_us:>8.2f}us {old_us / new_us:>7.2f}x")
+    decimal_us = timed(decimal_severance, cases["severance"][:5000])
+    cents_us = timed(calculate_severance_pay, cases["severance"][:5000])
+    print(f"severance in Decimal: {decimal_us:.2f}us ({decimal_us / cents_us:.1f}x the integer-cents time)")
+
+
+if __name__ == "__main__":
+    main()
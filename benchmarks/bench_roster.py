@@ -0,0 +1,72 @@
+"""
+Benchmark process_roster on a synthetic roster file.
+
+Writes a roster CSV to a temporary file, then streams it through
+process_roster computing in this process and in a pool, reporting rows per
+second and the peak memory this process allocated while streaming (which
+should not grow with the roster size).
+
+Run from the repository root:
+    python benchmarks/bench_roster.py [roster_size] [workers]
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from roster import ROSTER_INPUT_FIELDS, process_roster
+
+EMPLOYEE_TYPES = ("Full-time Employee", "Part-time Employee", "Uncommon Tours of Duty")
+
+
+def write_roster(path, size, seed=0):
+    rng = np.random.default_rng(seed)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(ROSTER_INPUT_FIELDS)
+        for i in range(size):
+            writer.writerow([
+                f"E{i:06d}", f"{rng.uniform(30000, 190000):.2f}", rng.integers(0, 45), rng.integers(0, 12),
+                rng.integers(22, 75), rng.integers(0, 12), f"{rng.uniform(15, 95):.2f}",
+                f"{rng.uniform(0, 720):.1f}", EMPLOYEE_TYPES[i % 3], rng.integers(1, 27), 40, 72,
+                "2015-03-02", "2001-06-04:2006-09-29;2008-01-07:2012-12-31",
+            ])
+
+
+def stream(path, workers):
+    with open(path, newline="") as f:
+        return sum(1 for _ in process_roster(f, workers=workers))
+
+
+def run(path, workers):
+    """(rows, seconds, peak bytes); memory is traced in a second pass so tracing does not skew the timing."""
+    start = time.perf_counter()
+    count = stream(path, workers)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    stream(path, workers)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "roster.csv")
+        write_roster(path, size)
+        print(f"{size} rows, {os.path.getsize(path) / 1e6:.1f} MB")
+        for label, pool_size in (("in process", 1), (f"{workers} workers", workers)):
+            count, elapsed, peak = run(path, pool_size)
+            print(f"{label:<12} {elapsed:7.2f}s {count / elapsed:9.0f} rows/s  peak {peak / 1e6:5.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark calculate_severance_pay_bulk against a loop over calculate_severance_pay.
+
+Run from the repository root:
+    python benchmarks/bench_severance_bulk.py [roster_size]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculations import calculate_severance_pay, calculate_severance_pay_bulk
+
+OUTPUTS = (
+    "total_severance",
+    "total_severance_before_age_factor",
+    "age_adjustment",
+    "biweekly_severance",
+    "weeks_of_severance",
+)
+
+
+def build_roster(size, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "annual_salary": rng.uniform(30000, 190000, size).round(2),
+        "years_of_service": rng.integers(0, 45, size),
+        "months_of_service": rng.integers(0, 12, size),
+        "age_years": rng.integers(22, 75, size),
+        "age_months": rng.integers(0, 12, size),
+    }
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    roster = build_roster(size)
+    rows = list(zip(*(roster[k].tolist() for k in roster)))
+
+    start = time.perf_counter()
+    scalar_results = [calculate_severance_pay(*row) for row in rows]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bulk = calculate_severance_pay_bulk(**roster)
+    bulk_time = time.perf_counter() - start
+
+    # Both use the same integer-cents arithmetic, so rows match to the cent
+    for position, key in enumerate(OUTPUTS):
+        expected = np.array([res[position] for res in scalar_results])
+        assert np.array_equal(expected, bulk[key]), key
+
+    print(f"{size} employees")
+    print(f"scalar loop: {scalar_time:.3f}s")
+    print(f"bulk:        {bulk_time:.3f}s ({scalar_time / bulk_time:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark calculate_tsp_loan_batch against a loop over calculate_tsp_loan.
+
+Run from the repository root:
+    python benchmarks/bench_tsp_loan_batch.py [num_employees]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculations import calculate_tsp_loan, calculate_tsp_loan_batch
+
+TERMS = (26, 52, 78, 130, 260, 390)
+
+
+def build_scenarios(num_employees, seed=0):
+    rng = np.random.default_rng(seed)
+    balances = rng.uniform(20000, 500000, num_employees).round(2)
+    scenarios = {
+        "loan_type": [],
+        "tsp_balance": [],
+        "loan_amount": [],
+        "loan_interest_rate": [],
+        "expected_annual_growth": [],
+        "num_pay_periods": [],
+        "biweekly_contribution_no_loan": [],
+        "biweekly_contribution_during_loan": [],
+    }
+    for balance in balances:
+        amount = round(float(rng.uniform(1000, min(50000, balance))), 2)
+        rate = float(rng.choice([0.0, 3.875, 4.25, 4.5]))
+        growth = round(float(rng.uniform(0, 10)), 2)
+        contrib = round(float(rng.uniform(100, 900)), 2)
+        for term in TERMS:
+            scenarios["loan_type"].append("general" if term <= 130 else "residential")
+            scenarios["tsp_balance"].append(float(balance))
+            scenarios["loan_amount"].append(amount)
+            scenarios["loan_interest_rate"].append(rate)
+            scenarios["expected_annual_growth"].append(growth)
+            scenarios["num_pay_periods"].append(term)
+            scenarios["biweekly_contribution_no_loan"].append(contrib)
+            scenarios["biweekly_contribution_during_loan"].append(round(contrib * 0.5, 2))
+    return scenarios
+
+
+def run_scalar(scenarios):
+    keys = list(scenarios)
+    return [calculate_tsp_loan(*args) for args in zip(*(scenarios[k] for k in keys))]
+
+
+def check_agreement(scalar_results, batch):
+    for i, res in enumerate(scalar_results):
+        for key in ("balance_no_loan", "balance_with_loan", "delta", "loan_payment", "total_repaid", "processing_fee"):
+            assert res[key] == batch[key][i], (i, key, res[key], batch[key][i])
+        n = len(res["yearly_data"]["labels"])
+        assert list(res["yearly_data"]["no_loan"]) == batch["no_loan"][i, :n].tolist(), (i, "no_loan")
+        assert list(res["yearly_data"]["with_loan"]) == batch["with_loan"][i, :n].tolist(), (i, "with_loan")
+
+
+def main():
+    num_employees = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    scenarios = build_scenarios(num_employees)
+    count = len(scenarios["tsp_balance"])
+
+    start = time.perf_counter()
+    scalar_results = run_scalar(scenarios)
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = calculate_tsp_loan_batch(**scenarios)
+    batch_time = time.perf_counter() - start
+
+    check_agreement(scalar_results, batch)
+
+    print(f"{count} scenarios ({num_employees} employees x {len(TERMS)} terms)")
+    print(f"scalar loop: {scalar_time:.3f}s")
+    print(f"batch:       {batch_time:.3f}s ({scalar_time / batch_time:.1f}x faster)")
+    print("all scenarios match calculate_tsp_loan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark calculate_tsp_loan's staged caching on a live-updating form.
+
+Replays form edits on a 390-period residential loan, changing one field at
+a time as a user nudging the inputs would, and times each recalculation
+with warm stage caches and with the caches cleared before every call.
+
+Run from the repository root:
+    python benchmarks/bench_tsp_loan_stages.py [edits_per_field]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculations import TSP_LOAN_STAGES, calculate_tsp_loan
+
+BASE_INPUTS = {
+    "loan_type": "residential",
+    "tsp_balance": 150000.0,
+    "loan_amount": 25000.0,
+    "loan_interest_rate": 4.375,
+    "expected_annual_growth": 6.5,
+    "num_pay_periods": 390,
+    "biweekly_contribution_no_loan": 450.0,
+    "biweekly_contribution_during_loan": 300.0,
+}
+STEPS = {
+    "tsp_balance": 500.0,
+    "loan_amount": 250.0,
+    "loan_interest_rate": 0.125,
+    "expected_annual_growth": 0.25,
+    "num_pay_periods": -1,
+    "biweekly_contribution_no_loan": 10.0,
+    "biweekly_contribution_during_loan": 10.0,
+}
+
+
+def edits(count):
+    """(field, inputs) after each of `count` successive nudges to every field in turn."""
+    for field, step in STEPS.items():
+        inputs = dict(BASE_INPUTS)
+        for i in range(1, count + 1):
+            yield field, dict(inputs, **{field: BASE_INPUTS[field] + step * i})
+
+
+def replay(sequence, cold):
+    timings = {field: [] for field in STEPS}
+    for field, inputs in sequence:
+        if cold:
+            TSP_LOAN_STAGES.clear()
+        start = time.perf_counter()
+        calculate_tsp_loan(**inputs)
+        timings[field].append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    sequence = list(edits(count))
+
+    cold = replay(sequence, cold=True)
+    TSP_LOAN_STAGES.clear()
+    calculate_tsp_loan(**BASE_INPUTS)
+    warm = replay(sequence, cold=False)
+
+    print(f"{'field changed':<36} {'cold':>9} {'staged':>9} {'speedup':>8}")
+    for field in STEPS:
+        cold_ms = np.median(cold[field]) * 1e3
+        warm_ms = np.median(warm[field]) * 1e3
+        print(f"{field:<36} {cold_ms:>7.3f}ms {warm_ms:>7.3f}ms {cold_ms / warm_ms:>7.2f}x")
+    total_cold = sum(map(sum, cold.values()))
+    total_warm = sum(map(sum, warm.values()))
+    print(f"{len(sequence)} edits: {total_cold * 1e3:.1f}ms cold, {total_warm * 1e3:.1f}ms staged "
+          f"({total_cold / total_warm:.2f}x)")
+    for stage, counts in TSP_LOAN_STAGES.stats().items():
+        print(f"  {stage}: {counts['hits']} hits, {counts['misses']} misses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Benchmark suite for calculations.py and the Flask routes in app_flask.py.
+
+Times every calculation function across representative input sizes and every
+route through the Flask test client, with route time split into calculation
+and template rendering. Results are written as JSON so two runs (e.g. two
+commits) can be compared.
+
+Run from the repository root:
+    python benchmarks/run_benchmarks.py [--output bench_results.json]
+    python benchmarks/run_benchmarks.py --compare old.json [--threshold 0.10]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCH_DIR = tempfile.mkdtemp()
+os.environ.setdefault("FEDBENEFITS_CACHE_PATH", os.path.join(BENCH_DIR, "bench_cache.sqlite3"))
+os.environ.setdefault("FEDBENEFITS_SESSION_PATH", os.path.join(BENCH_DIR, "bench_sessions.sqlite3"))
+
+import calculations
+
+LOAN_TERMS = (26, 130, 260, 390)
+GROWTH_YEARS = (1, 10, 30, 60)
+SCD_HISTORY_LENGTHS = (1, 10, 50, 200)
+
+
+def measure(func, min_time=0.2, max_repeat=2000):
+    """Median seconds per call, repeating until min_time has elapsed (at least 5 calls)."""
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < 5 or (time.perf_counter() < deadline and len(samples) < max_repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "calls": len(samples)}
+
+
+def scd_history(num_periods):
+    start = date(1990, 1, 1)
+    periods = []
+    for _ in range(num_periods):
+        end = start + timedelta(days=60)
+        periods.append((start.isoformat(), end.isoformat()))
+        start = end + timedelta(days=30)
+    return periods
+
+
+def loan_inputs(num_pay_periods):
+    return {
+        "loan_type": "general" if num_pay_periods <= 130 else "residential",
+        "tsp_balance": 150000.0,
+        "loan_amount": 25000.0,
+        "loan_interest_rate": 4.375,
+        "expected_annual_growth": 6.5,
+        "num_pay_periods": num_pay_periods,
+        "biweekly_contribution_no_loan": 450.0,
+        "biweekly_contribution_during_loan": 300.0,
+    }
+
+
+def function_benchmarks():
+    results = {}
+    results["calculate_lump_sum_payment"] = measure(lambda: calculations.calculate_lump_sum_payment(52.75, 240))
+    results["calculate_annual_leave_accrual"] = measure(
+        lambda: calculations.calculate_annual_leave_accrual("Part-time Employee", 7, 26, 40)
+    )
+    results["calculate_severance_pay"] = measure(lambda: calculations.calculate_severance_pay(98000, 17, 5, 52, 4))
+
+    for n in SCD_HISTORY_LENGTHS:
+        history = scd_history(n)
+        results[f"calculate_scd[periods={n}]"] = measure(lambda: calculations.calculate_scd("2015-06-01", history))
+        results[f"calculate_scd_batch[periods={n}]"] = measure(
+            lambda: calculations.calculate_scd_batch([("2015-06-01", history)])
+        )
+
+    for years in GROWTH_YEARS:
+        args = (25000, 85000, 5, 5, years, 6.5, 2.5)
+        results[f"calculate_tsp_growth[years={years}]"] = measure(lambda: calculations.calculate_tsp_growth(*args))
+        results[f"calculate_tsp_growth+yearly_data[years={years}]"] = measure(
+            lambda: list(calculations.calculate_tsp_growth(*args)["yearly_data"])
+        )
+    results["simulate_tsp_growth[years=30,paths=10000]"] = measure(
+        lambda: calculations.simulate_tsp_growth(25000, 85000, 5, 5, 30, 6.5, 2.5, num_paths=10000, seed=1),
+        min_time=1.0,
+    )
+
+    for n in LOAN_TERMS:
+        inputs = loan_inputs(n)
+        results[f"calculate_tsp_loan[periods={n}]"] = measure(lambda: calculations.calculate_tsp_loan(**inputs))
+        results[f"calculate_tsp_loan+rows[periods={n}]"] = measure(
+            lambda: list(calculations.calculate_tsp_loan(**inputs)["payperiod_data"])
+        )
+    batch = {k: [v] * 1000 for k, v in loan_inputs(390).items()}
+    results["calculate_tsp_loan_batch[scenarios=1000,periods=390]"] = measure(
+        lambda: calculations.calculate_tsp_loan_batch(**batch), min_time=1.0
+    )
+
+    results["calculate_tsp_frontload"] = measure(
+        lambda: calculations.calculate_tsp_frontload(95000, 23500, 4000, 5, 7)
+    )
+    return results
+
+
+class RouteTimer:
+    """Splits each request into calculation time (wrapped calculators) and render time (Flask template signals)."""
+
+    def __init__(self, app_module):
+        self.calc = 0.0
+        self.render = 0.0
+        self._render_start = None
+        # Call the raw functions so the result cache never turns a sample into a lookup
+        for name in dir(calculations):
+            if name.startswith("calculate_") and hasattr(app_module, name):
+                setattr(app_module, name, self._timed(getattr(calculations, name)))
+
+        from flask import before_render_template, template_rendered
+        before_render_template.connect(self._before_render, app_module.app)
+        template_rendered.connect(self._after_render, app_module.app)
+
+    def _timed(self, func):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.calc += time.perf_counter() - start
+        return wrapper
+
+    def _before_render(self, sender, template, context, **extra):
+        self._render_start = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        self.render += time.perf_counter() - self._render_start
+
+    def measure(self, client, method, url, min_time=0.3, **kwargs):
+        totals, calcs, renders = [], [], []
+        deadline = time.perf_counter() + min_time
+        while len(totals) < 5 or (time.perf_counter() < deadline and len(totals) < 1000):
+            self.calc = self.render = 0.0
+            start = time.perf_counter()
+            response = client.open(url, method=method, **kwargs)
+            body = response.get_data()  # drains streamed bodies too
+            totals.append(time.perf_counter() - start)
+            calcs.append(self.calc)
+            renders.append(self.render)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method} {url} returned {response.status_code}")
+        total = statistics.median(totals)
+        calc = statistics.median(calcs)
+        render = statistics.median(renders)
+        return {
+            "median_s": total,
+            "calc_s": calc,
+            "render_s": render,
+            "other_s": max(total - calc - render, 0.0),
+            "calls": len(totals),
+            "response_bytes": len(body),
+        }
+
+
+def route_benchmarks():
+    import app_flask
+
+    timer = RouteTimer(app_flask)
+    client = app_flask.app.test_client()
+    results = {}
+
+    for url in ("/", "/severance", "/lump_sum", "/leave_accrual", "/drp_comparison",
+                "/tsp-growth", "/tsp-loan", "/scd", "/tsp-frontload"):
+        results[f"GET {url}"] = timer.measure(client, "GET", url)
+
+    results["POST /severance"] = timer.measure(client, "POST", "/severance", data={
+        "annual_salary": 98000, "years": 17, "months": 5, "age_years": 52, "age_months": 4})
+    results["POST /lump_sum"] = timer.measure(client, "POST", "/lump_sum", data={
+        "hourly_rate": 52.75, "leave_hours": 240})
+    results["POST /leave_accrual"] = timer.measure(client, "POST", "/leave_accrual", data={
+        "employee_type": "Full-time Employee", "years": 7, "pay_periods": 26})
+    results["POST /drp_comparison"] = timer.measure(client, "POST", "/drp_comparison", data={
+        "biweekly_salary": 3500, "severance_estimate": 40000, "rif_pay_periods": 4,
+        "drp_start_date": date.today().isoformat()})
+    for n in SCD_HISTORY_LENGTHS:
+        history = scd_history(n)
+        results[f"POST /scd[periods={n}]"] = timer.measure(client, "POST", "/scd", data={
+            "current_start": "2015-06-01",
+            "prior_start[]": [s for s, _ in history],
+            "prior_end[]": [e for _, e in history]})
+    for years in GROWTH_YEARS:
+        results[f"POST /tsp-growth[years={years}]"] = timer.measure(client, "POST", "/tsp-growth", data={
+            "current_balance": 25000, "annual_salary": 85000, "years": years, "annual_rate": 6.5,
+            "inflation_rate": 2.5, "contribution_type": "percent", "contribution_percent": 5,
+            "employer_percent": 5})
+    for n in LOAN_TERMS:
+        results[f"POST /tsp-loan[periods={n}]"] = timer.measure(client, "POST", "/tsp-loan", data=loan_inputs(n))
+        results[f"GET /tsp-loan/export[periods={n}]"] = timer.measure(
+            client, "GET", "/tsp-loan/export", query_string=loan_inputs(n))
+    results["POST /tsp-frontload"] = timer.measure(client, "POST", "/tsp-frontload", data={
+        "annual_salary": 95000, "target_investment": 23500, "max_biweekly": 4000,
+        "match_percent": 5, "growth_rate": 7})
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline_path, current, threshold):
+    """Print per-benchmark ratios against a baseline file; return the names that regressed past threshold."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = []
+    print(f"{'benchmark':<58} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for section in ("functions", "routes"):
+        for name, result in current[section].items():
+            old = baseline.get(section, {}).get(name)
+            if old is None:
+                continue
+            ratio = result["median_s"] / old["median_s"]
+            flag = "  REGRESSION" if ratio > 1 + threshold else ""
+            print(f"{name:<58} {old['median_s'] * 1e3:>8.3f}ms {result['median_s'] * 1e3:>8.3f}ms {ratio:>6.2f}x{flag}")
+            if flag:
+                regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="bench_results.json", help="where to write this run's results")
+    parser.add_argument("--compare", help="baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown ratio counted as a regression")
+    parser.add_argument("--skip-routes", action="store_true", help="only time calculations.py")
+    args = parser.parse_args()
+
+    current = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "functions": function_benchmarks(),
+        "routes": {} if args.skip_routes else route_benchmarks(),
+    }
+    with open(args.output, "w") as f:
+        json.dump(current, f, indent=2, sort_keys=True)
+    print(f"wrote {args.output}")
+
+    if args.compare:
+        regressions = compare(args.compare, current, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) slower than {args.threshold:.0%} over baseline")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
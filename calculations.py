@@ -1,5 +1,15 @@
-from datetime import datetime, timedelta
-from decimal import Decimal, ROUND_DOWN
+from array import array
+from collections import OrderedDict
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+import threading
+import numpy as np
+
+from money import (
+    div_round, div_round_array, from_cents, round_cents, round_cents_array, scale_cents, to_cents, to_cents_array
+)
 
 def calculate_lump_sum_payment(hourly_rate: float, leave_balance_hours: float) -> float:
     """Calculate lump sum payment for unused annual leave."""
@@ -99,6 +109,9 @@ def calculate_scd(current_start_str, prior_periods):
     - adjusted_scd (date)
     - total_creditable_days (int)
     - period_breakdown (list of (start, end, days))
+
+    Each period is counted on its own, so days covered by two overlapping
+    periods are credited twice; calculate_scd_batch merges them first.
     """
     current_start = datetime.strptime(current_start_str, "%Y-%m-%d")
     total_days = 0
@@ -248,11 +261,10 @@ def calculate_tsp_loan(
     }
 
 from datetime import datetime, timedelta
-from decimal import Decimal, ROUND_DOWN
 
 def calculate_lump_sum_payment(hourly_rate: float, leave_balance_hours: float) -> float:
-    """Calculate lump sum payment for unused annual leave."""
-    return hourly_rate * leave_balance_hours  # Use leave hours directly
+    """Calculate lump sum payment for unused annual leave, rounded once to the cent."""
+    return from_cents(scale_cents(to_cents(hourly_rate), leave_balance_hours))  # Use leave hours directly
 
 def calculate_annual_leave_accrual(employee_type, years_of_service, pay_periods, hours_in_pay_status=None, avg_hours_per_pay_period=None):
     """Calculate annual leave accrual based on employee type, years of service, and pay periods."""
@@ -287,6 +299,143 @@ def calculate_annual_leave_accrual(employee_type, years_of_service, pay_periods,
     total_accrued_leave = accrual_rate * pay_periods
     return total_accrued_leave
 
+# Leave-year use-or-lose ceilings (hours); SES and equivalent positions may carry over 720
+DEFAULT_LEAVE_CEILING = 240
+SES_LEAVE_CEILING = 720
+
+def _leave_accrual_rates(employee_type, hours_in_pay_status, avg_hours_per_pay_period):
+    """
+    Per-employee accrual hours for each service tier (<3, 3-15, 15+ years).
+
+    Returns (regular, final_period) arrays of shape (N, 3); they differ only
+    for full-time employees in the 3-15 year tier, who earn 10 hours instead
+    of 6 in the last pay period of the leave year.
+    """
+    n = employee_type.shape[0]
+    regular = np.empty((n, 3))
+    final_period = np.empty((n, 3))
+
+    full_time = employee_type == "Full-time Employee"
+    part_time = employee_type == "Part-time Employee"
+    uncommon = employee_type == "Uncommon Tours of Duty"
+    ses = employee_type == "SES, Senior Level, Scientific/Professional Positions"
+    unknown = ~(full_time | part_time | uncommon | ses)
+    if unknown.any():
+        raise ValueError(f"Unknown employee type: {employee_type[unknown][0]}")
+    if part_time.any() and (hours_in_pay_status is None or np.isnan(hours_in_pay_status[part_time]).any()):
+        raise ValueError("Please enter the number of hours in pay status for part-time employees.")
+    if uncommon.any() and (avg_hours_per_pay_period is None or np.isnan(avg_hours_per_pay_period[uncommon]).any()):
+        raise ValueError("Please enter the average number of hours per biweekly pay period for uncommon tours of duty.")
+
+    regular[full_time] = (4, 6, 8)
+    final_period[full_time] = (4, 10, 8)
+    if part_time.any():
+        regular[part_time] = hours_in_pay_status[part_time, None] / np.array([20, 13, 10])
+        final_period[part_time] = regular[part_time]
+    if uncommon.any():
+        regular[uncommon] = np.array([4, 6, 8]) * (avg_hours_per_pay_period[uncommon, None] / 80)
+        final_period[uncommon] = regular[uncommon]
+    regular[ses] = 8
+    final_period[ses] = 8
+    return regular, final_period
+
+def project_annual_leave(
+    employee_type,
+    years_of_service,
+    starting_balance=0,
+    num_leave_years=1,
+    planned_usage=0,
+    hours_in_pay_status=None,
+    avg_hours_per_pay_period=None,
+    ceiling=None
+):
+    """
+    Project annual leave balances for a whole workforce over several leave years.
+
+    Steps pay period by pay period (26 per leave year, starting at the first
+    pay period of a leave year) with every employee as one array element:
+    - accrual follows calculate_annual_leave_accrual's tiers, re-evaluated each
+      period as service grows, so tier changes mid-projection are honored
+    - full-time employees in the 3-15 year tier get 10 hours in the final
+      pay period of each leave year
+    - planned usage is taken each period, limited to the hours available
+    - hours above the use-or-lose ceiling are forfeited at each year end
+
+    Parameters:
+    - employee_type, years_of_service, starting_balance: scalars or (N,) arrays
+    - planned_usage: hours per pay period; scalar, (N,) or (N, 26 * num_leave_years)
+    - ceiling: carryover ceiling in hours; defaults to 240 (720 for SES)
+
+    Returns dict of (N, num_leave_years) arrays: accrued, used, forfeited,
+    year_end_balance; plus ending_balance (N,)
+    """
+    periods_per_year = 26
+    employee_type = np.atleast_1d(np.asarray(employee_type))
+    years_of_service = np.atleast_1d(np.asarray(years_of_service, dtype=float))
+    starting_balance = np.atleast_1d(np.asarray(starting_balance, dtype=float))
+    if hours_in_pay_status is not None:
+        hours_in_pay_status = np.atleast_1d(np.asarray(hours_in_pay_status, dtype=float))
+    if avg_hours_per_pay_period is not None:
+        avg_hours_per_pay_period = np.atleast_1d(np.asarray(avg_hours_per_pay_period, dtype=float))
+
+    # The workforce size comes from every per-employee input, whichever of them are arrays
+    per_employee = [employee_type, years_of_service, starting_balance]
+    per_employee += [a for a in (hours_in_pay_status, avg_hours_per_pay_period) if a is not None]
+    n = np.broadcast(*per_employee).shape[0]
+    employee_type = np.broadcast_to(employee_type, (n,))
+    years_of_service = np.broadcast_to(years_of_service, (n,))
+    starting_balance = np.broadcast_to(starting_balance, (n,))
+    if hours_in_pay_status is not None:
+        hours_in_pay_status = np.broadcast_to(hours_in_pay_status, (n,))
+    if avg_hours_per_pay_period is not None:
+        avg_hours_per_pay_period = np.broadcast_to(avg_hours_per_pay_period, (n,))
+
+    regular, final_period = _leave_accrual_rates(employee_type, hours_in_pay_status, avg_hours_per_pay_period)
+
+    if ceiling is None:
+        ses = employee_type == "SES, Senior Level, Scientific/Professional Positions"
+        ceiling = np.where(ses, SES_LEAVE_CEILING, DEFAULT_LEAVE_CEILING)
+    ceiling = np.broadcast_to(np.asarray(ceiling, dtype=float), (n,))
+
+    total_periods = periods_per_year * num_leave_years
+    usage = np.asarray(planned_usage, dtype=float)
+    if usage.ndim == 1:
+        usage = usage[:, None]
+    usage = np.broadcast_to(usage, (n, total_periods))
+
+    rows = np.arange(n)
+    balance = starting_balance.copy()
+    accrued = np.zeros((n, num_leave_years))
+    used = np.zeros((n, num_leave_years))
+    forfeited = np.zeros((n, num_leave_years))
+    year_end_balance = np.zeros((n, num_leave_years))
+
+    for year in range(num_leave_years):
+        for k in range(periods_per_year):
+            p = year * periods_per_year + k
+            service = years_of_service + p / periods_per_year
+            tier = (service >= 3).astype(np.int64) + (service >= 15)
+            rates = final_period if k == periods_per_year - 1 else regular
+            accrual = rates[rows, tier]
+
+            available = balance + accrual
+            use = np.minimum(usage[:, p], available)
+            balance = available - use
+            accrued[:, year] += accrual
+            used[:, year] += use
+
+        forfeited[:, year] = np.maximum(balance - ceiling, 0)
+        balance = np.minimum(balance, np.maximum(ceiling, 0))
+        year_end_balance[:, year] = balance
+
+    return {
+        "accrued": accrued,
+        "used": used,
+        "forfeited": forfeited,
+        "year_end_balance": year_end_balance,
+        "ending_balance": balance
+    }
+
 def calculate_severance_pay(annual_salary, years_of_service, months_of_service, age_years, age_months):
     """
     Calculate Severance Pay considering additional months of service.
@@ -296,10 +445,13 @@ def calculate_severance_pay(annual_salary, years_of_service, months_of_service,
     - Age Adjustment: 2.5% of total severance for each full 3 months of age over 40.
     - Biweekly Severance: 2 * weekly pay.
     - Caps: Max severance is 1 year's salary; max weeks is 52.
+
+    Every dollar figure is an exact fraction of the salary in cents, rounded
+    once to the cent.
     """
 
-    # Step 1: Calculate weekly pay
-    weekly_pay = annual_salary / 52.175  
+    # Step 1: Weekly pay is annual_salary / 52.175, i.e. salary cents * 1000 / 52175
+    salary_cents = to_cents(annual_salary)
 
     # Step 2: Determine years of service adjustment (full years only)
     if years_of_service < 10:
@@ -307,34 +459,129 @@ def calculate_severance_pay(annual_salary, years_of_service, months_of_service,
     else:
         adj_years_of_service = ((years_of_service - 10) * 2 ) + 10
 
-    # Step 3: Calculate basic severance (full years)
-    basic_severance = weekly_pay * adj_years_of_service    
-
-    # Step 4: Calculate partial severance for months (before applying age factor)
+    # Steps 3-5: Basic severance is a week per adjusted year and each full 3 months
+    # adds a quarter of two weeks, so the total before the age factor is in half weeks
     full_periods_of_3_months = months_of_service // 3
-    partial_severance = (weekly_pay * 2) * full_periods_of_3_months * 0.25
-
-    # Step 5: Compute total severance BEFORE age factor
-    total_severance_before_age_factor = basic_severance + partial_severance
+    half_weeks = 2 * adj_years_of_service + full_periods_of_3_months
+    total_severance_before_age_factor = div_round(salary_cents * 500 * half_weeks, 52175)
 
     # Step 6: Calculate age factor (only for full 3-month increments over 40)
-    age = age_years + age_months / 12.0
-    full_3_months_over_40 = max(0, int((age - 40) * 12 // 3))
+    full_3_months_over_40 = max(0, int((age_years * 12 + age_months - 480) // 3))
 
-    # Step 7: Apply age factor to total severance before cap
-    age_adjustment = total_severance_before_age_factor * (0.025 * full_3_months_over_40)
-    total_severance = total_severance_before_age_factor + age_adjustment
+    # Step 7: Apply age factor (2.5% = 1/40 per quarter) to total severance before cap
+    age_adjustment = div_round(salary_cents * 500 * half_weeks * full_3_months_over_40, 52175 * 40)
 
-    # Step 8: Apply salary cap (max severance = 1 year of salary)
-    total_severance = min(total_severance, weekly_pay * 52)
+    # Step 8: Apply salary cap (max severance = 1 year of salary = 52 weeks = 4160 fortieths of a half week)
+    fortieth_half_weeks = min(half_weeks * (40 + full_3_months_over_40), 4160)
+    total_severance = div_round(salary_cents * 500 * fortieth_half_weeks, 52175 * 40)
 
     # Step 9: Calculate biweekly severance
-    biweekly_severance = 2 * weekly_pay
+    biweekly_severance = div_round(salary_cents * 2000, 52175)
 
-    # Step 10: Calculate weeks of severance (max 52)
-    weeks_of_severance = min(52, (total_severance / biweekly_severance) * 2)
+    # Step 10: Calculate weeks of severance (max 52), to the hundredth of a week
+    weeks_of_severance = min(52, div_round(fortieth_half_weeks * 5, 4) / 100)
 
-    return total_severance, total_severance_before_age_factor, age_adjustment, biweekly_severance, weeks_of_severance
+    return (from_cents(total_severance), from_cents(total_severance_before_age_factor), from_cents(age_adjustment),
+            from_cents(biweekly_severance), weeks_of_severance)
+
+@lru_cache(maxsize=8)
+def _severance_multipliers(max_years, max_quarters, max_age_quarters):
+    """
+    Salary-normalized severance table over (full years, months // 3, quarters of age over 40).
+
+    calculate_severance_pay's dollar figures are all salary cents * 500 * m /
+    (52175 * 40) for an integer multiplier m counted in fortieths of a half
+    week, and m depends only on these three indices. Weeks of severance does
+    not depend on salary at all, so it is tabulated directly in hundredths.
+
+    Returns (total, before_age_factor, age_adjustment, weeks) int64 arrays of
+    shape (max_years + 1, max_quarters + 1, max_age_quarters + 1).
+    """
+    years = np.arange(max_years + 1, dtype=np.int64)[:, None, None]
+    quarters = np.arange(max_quarters + 1, dtype=np.int64)[None, :, None]
+    age_quarters = np.arange(max_age_quarters + 1, dtype=np.int64)[None, None, :]
+
+    half_weeks = 2 * np.where(years < 10, years, (years - 10) * 2 + 10) + quarters
+    total = np.minimum(half_weeks * (40 + age_quarters), 4160)
+    before_age_factor = half_weeks * 40
+    age_adjustment = half_weeks * age_quarters
+    weeks = div_round_array(total * 5, 4)
+
+    shape = (max_years + 1, max_quarters + 1, max_age_quarters + 1)
+    return tuple(np.broadcast_to(table, shape) for table in (total, before_age_factor, age_adjustment, weeks))
+
+def calculate_severance_pay_bulk(annual_salary, years_of_service, months_of_service, age_years, age_months):
+    """
+    Severance pay for a whole roster, one row per employee.
+
+    Looks each row's multiplier up in the integer _severance_multipliers
+    table and scales salary cents by it with money's rounding, so every row
+    matches calculate_severance_pay to the cent without a Python loop over
+    employees.
+
+    Returns:
+    - dict of arrays: total_severance, total_severance_before_age_factor,
+      age_adjustment, biweekly_severance, weeks_of_severance
+    """
+    annual_salary, years, months, age_years, age_months = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(annual_salary, dtype=float)),
+        np.atleast_1d(np.asarray(years_of_service, dtype=np.int64)),
+        np.atleast_1d(np.asarray(months_of_service, dtype=np.int64)),
+        np.atleast_1d(np.asarray(age_years, dtype=float)),
+        np.atleast_1d(np.asarray(age_months, dtype=float)),
+    )
+    if years.size and (years.min() < 0 or months.min() < 0):
+        raise ValueError("Years and months of service cannot be negative.")
+
+    salary_cents = to_cents_array(annual_salary)
+    quarters = months // 3
+    age_quarters = np.maximum(0, (age_years * 12 + age_months - 480) // 3).astype(np.int64)
+
+    # Grow the table in fixed steps so rosters of similar shape share one cached table
+    total, before_age_factor, age_adjustment, weeks = _severance_multipliers(
+        max(60, -(-int(years.max(initial=0)) // 10) * 10),
+        max(3, int(quarters.max(initial=0))),
+        max(240, -(-int(age_quarters.max(initial=0)) // 40) * 40),
+    )
+    index = (years, quarters, age_quarters)
+
+    def dollars(multiplier):
+        return div_round_array(salary_cents * 500 * multiplier[index], 52175 * 40) / 100
+
+    return {
+        "total_severance": dollars(total),
+        "total_severance_before_age_factor": dollars(before_age_factor),
+        "age_adjustment": dollars(age_adjustment),
+        "biweekly_severance": div_round_array(salary_cents * 2000, 52175) / 100,
+        "weeks_of_severance": weeks[index] / 100
+    }
+
+def calculate_drp_comparison(biweekly_salary, severance_estimate, drp_pay_periods, rif_pay_periods):
+    """
+    Compare pay under the Deferred Resignation Program with severance plus pay until the RIF.
+
+    Parameters:
+    - biweekly_salary: gross pay per pay period
+    - severance_estimate: estimated total severance pay
+    - drp_pay_periods: pay periods from the DRP start until September 30
+    - rif_pay_periods: pay periods from the DRP start until the actual RIF
+
+    Returns:
+    - dict with total_drp, severance_est, total_rif, adjusted_severance (dollars,
+      exact to the cent) and better ("DRP", "Severance" or "Equal")
+    """
+    salary_cents = to_cents(biweekly_salary)
+    total_drp = salary_cents * drp_pay_periods
+    total_rif = salary_cents * rif_pay_periods
+    severance_cents = to_cents(severance_estimate)
+    adjusted_severance = severance_cents + total_rif
+    return {
+        "total_drp": from_cents(total_drp),
+        "severance_est": from_cents(severance_cents),
+        "total_rif": from_cents(total_rif),
+        "adjusted_severance": from_cents(adjusted_severance),
+        "better": "DRP" if total_drp > adjusted_severance else "Severance" if adjusted_severance > total_drp else "Equal"
+    }
 
 def calculate_scd(current_start_str, prior_periods):
     """
@@ -348,6 +595,9 @@ def calculate_scd(current_start_str, prior_periods):
     - adjusted_scd (date)
     - total_creditable_days (int)
     - period_breakdown (list of (start, end, days))
+
+    Each period is counted on its own, so days covered by two overlapping
+    periods are credited twice; calculate_scd_batch merges them first.
     """
     current_start = datetime.strptime(current_start_str, "%Y-%m-%d")
     total_days = 0
@@ -364,155 +614,836 @@ def calculate_scd(current_start_str, prior_periods):
     adjusted_scd = (current_start - timedelta(days=total_days)).date()
     return adjusted_scd, total_days, period_breakdown
 
+@lru_cache(maxsize=65536)
+def _parse_iso_date(value):
+    """Parse a YYYY-MM-DD string; memoized because HR histories repeat the same dates heavily."""
+    return date.fromisoformat(value)
+
+def _merge_service_periods(periods):
+    """
+    Merge overlapping or adjacent (start, end) date intervals in one sorted sweep.
+
+    Intervals whose end falls before their start contribute no days and are
+    dropped, matching calculate_scd's max(delta, 0).
+    """
+    merged = []
+    for start, end in sorted(p for p in periods if p[1] >= p[0]):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+def calculate_scd_batch(service_histories):
+    """
+    Calculates adjusted SCDs for many employees at once.
+
+    Unlike calculate_scd, overlapping or adjacent prior periods are merged
+    before counting, so no day of service is credited twice. The /scd page
+    and the "scd" API still use calculate_scd, so for histories with
+    overlapping periods they credit more days (an earlier SCD) than the
+    roster upload, which uses this function.
+
+    A malformed date raises ValueError, as in calculate_scd.
+
+    Parameters:
+    - service_histories: iterable of (current_start_str, prior_periods), where
+      prior_periods is a list of (start_str, end_str) tuples
+
+    Returns:
+    - list with one (adjusted_scd, total_creditable_days, period_breakdown)
+      tuple per employee; period_breakdown lists the merged periods as
+      (start, end, days)
+    """
+    results = []
+    for current_start_str, prior_periods in service_histories:
+        current_start = _parse_iso_date(current_start_str)
+        merged = _merge_service_periods(
+            (_parse_iso_date(start_str), _parse_iso_date(end_str))
+            for start_str, end_str in prior_periods
+        )
+
+        total_days = 0
+        period_breakdown = []
+        for start, end in merged:
+            days = (end - start).days + 1
+            total_days += days
+            period_breakdown.append((start.isoformat(), end.isoformat(), days))
+
+        results.append((current_start - timedelta(days=total_days), total_days, period_breakdown))
+    return results
+
+def _tsp_growth_balance(current_balance, annual_contribution, annual_rate, year):
+    """Closed-form balance after `year` years of contribute-then-grow compounding."""
+    r = annual_rate / 100
+    if r == 0:
+        return current_balance + annual_contribution * year
+    # expm1/log1p keep (1 + r) ** year - 1 accurate when r is tiny; the plain
+    # difference cancels to noise as r approaches 0, where the factor tends to `year`
+    growth = np.expm1(year * np.log1p(r))
+    return float(current_balance * (growth + 1) + annual_contribution * (1 + r) * growth / r)
+
+class TSPGrowthYearlyData(Sequence):
+    """
+    Per-year breakdown for calculate_tsp_growth.
+
+    Rows are built from the closed-form balance only when indexed or
+    iterated, so callers that just read the summary figures never pay for
+    the table.
+    """
+
+    def __init__(self, current_balance, annual_contribution, years, annual_rate):
+        self.current_balance = current_balance
+        self.annual_contribution = annual_contribution
+        self.years = years
+        self.annual_rate = annual_rate
+
+    def __len__(self):
+        return self.years
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.years))]
+        if index < 0:
+            index += self.years
+        if not 0 <= index < self.years:
+            raise IndexError("yearly_data index out of range")
+
+        year = index + 1
+        balance = _tsp_growth_balance(self.current_balance, self.annual_contribution, self.annual_rate, year)
+        contributions = self.annual_contribution * year
+        return {
+            "year": year,
+            "contributions": round_cents(contributions),
+            "growth": round_cents(balance - contributions - self.current_balance)
+        }
+
+    def __repr__(self):
+        return f"TSPGrowthYearlyData(years={self.years})"
+
 def calculate_tsp_growth(current_balance, annual_salary, employee_percent,
                          employer_percent, years, annual_rate, inflation_rate):
     """
     Calculates TSP growth with separate salary, employee %, employer %, 
     and inflation adjustment.
 
+    Contributions are added at the start of each year and then grown, which
+    is an annuity due, so the summary figures come from its closed form
+    instead of a year-by-year loop.
+
     Returns:
         dict with:
         - future_value_nominal
         - future_value_real
         - total_contributions
         - growth
-        - yearly_data (list of dicts)
+        - yearly_data (lazy sequence of dicts, see TSPGrowthYearlyData)
     """
 
     # Calculate annual contribution from employee + employer
     annual_contribution = annual_salary * (employee_percent + employer_percent) / 100
+    years = max(years, 0)
 
-    balance = current_balance
-    yearly_data = []
-    total_contributions = 0
+    future_value_nominal = _tsp_growth_balance(current_balance, annual_contribution, annual_rate, years)
+    future_value_real = future_value_nominal / ((1 + inflation_rate / 100) ** years)
+    total_contributions = annual_contribution * years
 
-    for year in range(1, years + 1):
-        # Add contributions for the year
-        balance += annual_contribution
-        total_contributions += annual_contribution
+    return {
+        "future_value_nominal": round_cents(future_value_nominal),
+        "future_value_real": round_cents(future_value_real),
+        "total_contributions": round_cents(total_contributions),
+        "growth": round_cents(future_value_nominal - current_balance - total_contributions),
+        "yearly_data": TSPGrowthYearlyData(current_balance, annual_contribution, years, annual_rate)
+    }
 
-        # Apply growth
-        balance *= (1 + annual_rate / 100)
+def _tsp_growth_paths(current_balance, annual_contribution, years, annual_rate, volatility, num_paths, seed):
+    """Simulate `num_paths` year-end balance paths as a (num_paths, years) matrix."""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(annual_rate / 100, volatility / 100, size=(num_paths, years))
+    np.maximum(returns, -0.99, out=returns)  # a year cannot lose more than the whole balance
+
+    balances = np.empty((num_paths, years))
+    balance = np.full(num_paths, float(current_balance))
+    for year in range(years):
+        balance = (balance + annual_contribution) * (1 + returns[:, year])
+        balances[:, year] = balance
+    return balances
+
+def _bin_log_balances(log_balances, lower, width, bins):
+    """Count a (paths, years) matrix of log1p(balance) into per-year bins; out-of-range values land in the edge bins."""
+    years = log_balances.shape[1]
+    index = np.clip(((log_balances - lower) / width).astype(np.int64), 0, bins - 1)
+    index += np.arange(years) * bins
+    return np.bincount(index.ravel(), minlength=years * bins).reshape(years, bins)
+
+def _tsp_growth_histogram(chunk):
+    """Simulate one chunk of paths and bin it on the shared grid (process-pool worker)."""
+    (current_balance, annual_contribution, years, annual_rate, volatility,
+     num_paths, seed, lower, width, bins) = chunk
+    balances = _tsp_growth_paths(current_balance, annual_contribution, years, annual_rate, volatility, num_paths, seed)
+    return _bin_log_balances(np.log1p(balances), lower, width, bins)
+
+def _histogram_percentile(counts, q, lower, width):
+    """Per-year q-th percentile of balances binned by _tsp_growth_histogram, interpolated within the bin."""
+    years, bins = counts.shape
+    cumulative = np.cumsum(counts, axis=1)
+    target = q / 100 * cumulative[:, -1]
+    bin_index = np.minimum((cumulative < target[:, None]).sum(axis=1), bins - 1)
+    rows = np.arange(years)
+    in_bin = counts[rows, bin_index]
+    below = cumulative[rows, bin_index] - in_bin
+    fraction = np.divide(target - below, in_bin, out=np.zeros(years), where=in_bin > 0)
+    return np.expm1(lower + (bin_index + fraction) * width)
+
+def simulate_tsp_growth(current_balance, annual_salary, employee_percent,
+                        employer_percent, years, annual_rate, inflation_rate,
+                        volatility=15.0, num_paths=10000, percentiles=(10, 50, 90),
+                        seed=None, chunk_size=10000, bins=4096, workers=None):
+    """
+    Monte Carlo version of calculate_tsp_growth.
 
-        # Track breakdown for chart
-        yearly_data.append({
+    Each year's return is drawn from a normal distribution with mean
+    annual_rate and standard deviation volatility (both in percent). Paths
+    are simulated chunk_size at a time as a NumPy matrix and folded into a
+    fixed per-year histogram of log1p(balance), so memory stays bounded no
+    matter how large num_paths is. The histogram range comes from the first
+    chunk; percentiles are read back from it with linear interpolation.
+
+    Chunks get independent child seeds of `seed`, so results are
+    reproducible and identical whether or not `workers` fans the chunks out
+    to a process pool.
+
+    Returns:
+        dict with the calculate_tsp_growth keys (summary figures use the
+        median path), plus:
+        - yearly_data rows also carry one "p<N>" balance per percentile
+        - percentiles: {"p<N>": [balance per year]}
+    """
+    if years < 1:
+        raise ValueError("Years to invest must be at least 1.")
+    if num_paths < 1:
+        raise ValueError("Number of simulated paths must be at least 1.")
+
+    annual_contribution = annual_salary * (employee_percent + employer_percent) / 100
+    chunk_sizes = [min(chunk_size, num_paths - start) for start in range(0, num_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+
+    # The first chunk fixes the histogram range: its log-span padded by half on each side
+    pilot = np.log1p(_tsp_growth_paths(current_balance, annual_contribution, years, annual_rate,
+                                       volatility, chunk_sizes[0], seeds[0]))
+    low, high = pilot.min(axis=0), pilot.max(axis=0)
+    pad = np.maximum(high - low, 1e-6) / 2
+    lower = np.maximum(low - pad, 0.0)
+    width = (high + pad - lower) / bins
+
+    counts = _bin_log_balances(pilot, lower, width, bins)
+    del pilot
+
+    chunks = [
+        (current_balance, annual_contribution, years, annual_rate, volatility,
+         size, chunk_seed, lower, width, bins)
+        for size, chunk_seed in zip(chunk_sizes[1:], seeds[1:])
+    ]
+    if workers and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk_counts in pool.map(_tsp_growth_histogram, chunks):
+                counts += chunk_counts
+    else:
+        for chunk in chunks:
+            counts += _tsp_growth_histogram(chunk)
+
+    bands = {f"p{q:g}": _histogram_percentile(counts, q, lower, width) for q in percentiles}
+    median = _histogram_percentile(counts, 50, lower, width)
+
+    yearly_data = []
+    for year in range(1, years + 1):
+        contributions = annual_contribution * year
+        row = {
             "year": year,
-            "contributions": round(total_contributions, 2),
-            "growth": round(balance - total_contributions - current_balance, 2)
-        })
+            "contributions": round_cents(contributions),
+            "growth": round_cents(float(median[year - 1]) - contributions - current_balance)
+        }
+        for key, band in bands.items():
+            row[key] = round_cents(float(band[year - 1]))
+        yearly_data.append(row)
 
-    future_value_nominal = balance
-    future_value_real = balance / ((1 + inflation_rate / 100) ** years)
+    future_value_nominal = float(median[-1])
+    future_value_real = future_value_nominal / ((1 + inflation_rate / 100) ** years)
+    total_contributions = annual_contribution * years
 
     return {
-        "future_value_nominal": round(future_value_nominal, 2),
-        "future_value_real": round(future_value_real, 2),
-        "total_contributions": round(total_contributions, 2),
-        "growth": round(future_value_nominal - current_balance - total_contributions, 2),
-        "yearly_data": yearly_data
+        "future_value_nominal": round_cents(future_value_nominal),
+        "future_value_real": round_cents(future_value_real),
+        "total_contributions": round_cents(total_contributions),
+        "growth": round_cents(future_value_nominal - current_balance - total_contributions),
+        "yearly_data": yearly_data,
+        "percentiles": {key: [round_cents(float(v)) for v in band] for key, band in bands.items()}
     }
 
-def calculate_tsp_loan(
-    loan_type: str,
-    tsp_balance: float,
-    loan_amount: float,
-    loan_interest_rate: float,
-    expected_annual_growth: float,
-    num_pay_periods: int,
-    biweekly_contribution_no_loan: float,
-    biweekly_contribution_during_loan: float
-):
-    annual_growth_rate = expected_annual_growth / 100
+class RoundedColumn(Sequence):
+    """Read-only view of an array('d') column that rounds each value to cents on access."""
+
+    def __init__(self, values):
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [round_cents(v) for v in self.values[index]]
+        return round_cents(self.values[index])
+
+class PayPeriodSchedule(Sequence):
+    """
+    Pay-period table for calculate_tsp_loan, stored as one array('d') per column.
+
+    Values stay at full precision and are rounded to cents only when a row
+    is read or the schedule is serialized. Each row comes back as a dict with
+    the keys templates already use (period, no_loan, with_loan, diff,
+    loan_balance, interest, principal, contribution_with_loan,
+    contribution_no_loan, remaining_loan_payments).
+    """
+
+    def __init__(self, num_loan_periods, contribution_no_loan, contribution_with_loan):
+        self.num_loan_periods = num_loan_periods
+        self.contribution_no_loan = contribution_no_loan
+        self.contribution_with_loan = contribution_with_loan
+        self.no_loan = array("d")
+        self.with_loan = array("d")
+        # Loan columns only cover the repayment periods
+        self.loan_balance = array("d")
+        self.interest = array("d")
+        self.principal = array("d")
+
+    def __len__(self):
+        return len(self.with_loan)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("payperiod_data index out of range")
+
+        period = index + 1
+        no_loan = round_cents(self.no_loan[index])
+        with_loan = round_cents(self.with_loan[index])
+        row = {
+            "period": period,
+            "no_loan": no_loan,
+            "with_loan": with_loan,
+            # As the original row-dict schedule computed it: rounded no-loan balance minus the exact with-loan one
+            "diff": round_cents(no_loan - self.with_loan[index])
+        }
+        if period <= self.num_loan_periods:
+            row.update({
+                "loan_balance": round_cents(self.loan_balance[index]),
+                "interest": round_cents(self.interest[index]),
+                "principal": round_cents(self.principal[index]),
+                "contribution_with_loan": round_cents(self.contribution_with_loan),
+                "contribution_no_loan": round_cents(self.contribution_no_loan),
+                "remaining_loan_payments": self.num_loan_periods - period
+            })
+        else:
+            row.update({"loan_balance": None, "remaining_loan_payments": None})
+        return row
+
+    def __repr__(self):
+        return f"PayPeriodSchedule(periods={len(self)}, loan_periods={self.num_loan_periods})"
+
+class StageGraph:
+    """
+    A calculation split into named stages, each cached on the inputs it reads.
+
+    A stage declares the input fields it reads and the stages it builds on.
+    Its cache key is every field it reads directly or through those stages,
+    so a changed field recomputes only the stages downstream of it and the
+    rest come from cache. Stage results are shared between calls and must be
+    treated as read-only.
+
+    Parameters:
+    - maxsize: results kept per stage, least recently used dropped first
+    """
+
+    _missing = object()
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.stages = {}
+        self.caches = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def stage(self, name, fields, after=()):
+        """Register func(*field values, *upstream results) as stage `name`."""
+        key_fields = set(fields)
+        for upstream in after:
+            key_fields.update(self.stages[upstream][3])
+
+        def register(func):
+            self.stages[name] = (func, tuple(fields), tuple(after), tuple(sorted(key_fields)))
+            self.caches[name] = OrderedDict()
+            self.counts[name] = {"hits": 0, "misses": 0}
+            return func
+
+        return register
+
+    def run(self, inputs, names=None):
+        """Results of the named stages (default: all), as {stage name: result}."""
+        results = {}
+        for name in names or self.stages:
+            self._resolve(name, inputs, results)
+        return results
+
+    def _resolve(self, name, inputs, results):
+        if name in results:
+            return results[name]
+        func, fields, after, key_fields = self.stages[name]
+        key = tuple(inputs[field] for field in key_fields)
+        cache = self.caches[name]
+        with self.lock:
+            value = cache.get(key, self._missing)
+            if value is not self._missing:
+                cache.move_to_end(key)
+                self.counts[name]["hits"] += 1
+        if value is self._missing:
+            upstream = [self._resolve(dependency, inputs, results) for dependency in after]
+            value = func(*(inputs[field] for field in fields), *upstream)
+            with self.lock:
+                cache[key] = value
+                if len(cache) > self.maxsize:
+                    cache.popitem(last=False)
+                self.counts[name]["misses"] += 1
+        results[name] = value
+        return value
+
+    def stats(self):
+        """Hits and misses per stage since start or the last clear()."""
+        with self.lock:
+            return {name: dict(counts) for name, counts in self.counts.items()}
+
+    def clear(self):
+        with self.lock:
+            for name in self.stages:
+                self.caches[name].clear()
+                self.counts[name] = {"hits": 0, "misses": 0}
+
+class BalancePath:
+    """
+    Per-period balances of an account growing with a fixed contribution, extended on demand.
+
+    Periods already computed are reused, so a longer loan term only steps the
+    extra periods.
+    """
+
+    def __init__(self, balance, contribution, growth_factor):
+        self.contribution = contribution
+        self.growth_factor = growth_factor
+        self.balances = array("d")
+        self._balance = balance
+        self._lock = threading.Lock()
+
+    def prefix(self, periods):
+        """Balances after each of the first `periods` periods, as a new array."""
+        with self._lock:
+            balance = self._balance
+            for _ in range(periods - len(self.balances)):
+                balance += self.contribution
+                balance *= self.growth_factor
+                self.balances.append(balance)
+            self._balance = balance
+            return self.balances[:periods]
+
+# calculate_tsp_loan's stages:
+#   tsp_balance, expected_annual_growth, biweekly_contribution_no_loan -> no_loan
+#   loan_amount, loan_interest_rate, num_pay_periods -> amortization
+#   amortization + loan_type, tsp_balance, expected_annual_growth,
+#   biweekly_contribution_during_loan -> with_loan
+TSP_LOAN_STAGES = StageGraph()
+
+@TSP_LOAN_STAGES.stage("no_loan", fields=("tsp_balance", "expected_annual_growth", "biweekly_contribution_no_loan"))
+def _tsp_loan_no_loan_path(tsp_balance, expected_annual_growth, biweekly_contribution_no_loan):
+    g = expected_annual_growth / 100 / 26
+    return BalancePath(tsp_balance, biweekly_contribution_no_loan, 1 + g)
+
+@TSP_LOAN_STAGES.stage("amortization", fields=("loan_amount", "loan_interest_rate", "num_pay_periods"))
+def _tsp_loan_amortization(loan_amount, loan_interest_rate, num_pay_periods):
+    """Returns (payment, loan_balance, interest, principal) with one array entry per pay period."""
     loan_rate = loan_interest_rate / 100
     r = loan_rate / 26
-    g = annual_growth_rate / 26
-    years = num_pay_periods / 26
-
-    processing_fee = 100 if loan_type == "residential" else 50
 
     # Loan payment
     if r > 0:
         payment = loan_amount * r / (1 - (1 + r) ** -num_pay_periods)
     else:
         payment = loan_amount / num_pay_periods
-    total_repaid = payment * num_pay_periods
 
-    # No loan growth
-    no_loan_bal = tsp_balance
-    no_loan_periods = []
-    for p in range(1, num_pay_periods + 1):
-        no_loan_bal += biweekly_contribution_no_loan
-        no_loan_bal *= (1 + g)
-        no_loan_periods.append(round(no_loan_bal, 2))
-
-    # With loan
-    with_loan_bal = tsp_balance - loan_amount - processing_fee
+    loan_balance_col = array("d")
+    interest_col = array("d")
+    principal_col = array("d")
     loan_balance = loan_amount
-    with_loan_periods = []
-    payperiod_data = []
-
     for p in range(1, num_pay_periods + 1):
         interest = loan_balance * r
         principal = payment - interest
         loan_balance = max(0, loan_balance - principal)
 
+        loan_balance_col.append(loan_balance)
+        interest_col.append(interest)
+        principal_col.append(principal)
+    return payment, loan_balance_col, interest_col, principal_col
+
+@TSP_LOAN_STAGES.stage(
+    "with_loan",
+    fields=("loan_type", "tsp_balance", "loan_amount", "expected_annual_growth", "biweekly_contribution_during_loan"),
+    after=("amortization",),
+)
+def _tsp_loan_with_loan_path(loan_type, tsp_balance, loan_amount, expected_annual_growth,
+                             biweekly_contribution_during_loan, amortization):
+    g = expected_annual_growth / 100 / 26
+    processing_fee = 100 if loan_type == "residential" else 50
+    with_loan_bal = tsp_balance - loan_amount - processing_fee
+    with_loan_col = array("d")
+    for principal in amortization[3]:
         with_loan_bal += biweekly_contribution_during_loan
         with_loan_bal += principal  # Credit the repaid principal
         with_loan_bal *= (1 + g)    # Apply growth AFTER contributions + repayment
+        with_loan_col.append(with_loan_bal)
+    return with_loan_col
 
-        payperiod_data.append({
-            "period": p,
-            "no_loan": round(no_loan_periods[p - 1], 2),
-            "with_loan": round(with_loan_bal, 2),
-            "diff": round(no_loan_periods[p - 1] - with_loan_bal, 2),
-            "loan_balance": round(loan_balance, 2),
-            "interest": round(interest, 2),
-            "principal": round(principal, 2),
-            "contribution_with_loan": round(biweekly_contribution_during_loan, 2),
-            "contribution_no_loan": round(biweekly_contribution_no_loan, 2),
-            "remaining_loan_payments": num_pay_periods - p
-        })
+def calculate_tsp_loan(
+    loan_type: str,
+    tsp_balance: float,
+    loan_amount: float,
+    loan_interest_rate: float,
+    expected_annual_growth: float,
+    num_pay_periods: int,
+    biweekly_contribution_no_loan: float,
+    biweekly_contribution_during_loan: float
+):
+    """
+    Compare TSP balances with and without a loan, pay period by pay period.
 
-        if p % 26 == 0:
-            with_loan_periods.append(round(with_loan_bal, 2))
+    The work runs as TSP_LOAN_STAGES, so when only some inputs change (a
+    live-updating form) only the stages that read them are recomputed: a new
+    contribution reruns one balance path, a new interest rate reruns the
+    amortization and the with-loan path but not the no-loan path.
+    """
+    stages = TSP_LOAN_STAGES.run({
+        "loan_type": loan_type,
+        "tsp_balance": tsp_balance,
+        "loan_amount": loan_amount,
+        "loan_interest_rate": loan_interest_rate,
+        "expected_annual_growth": expected_annual_growth,
+        "num_pay_periods": num_pay_periods,
+        "biweekly_contribution_no_loan": biweekly_contribution_no_loan,
+        "biweekly_contribution_during_loan": biweekly_contribution_during_loan,
+    })
+    payment, loan_balance_col, interest_col, principal_col = stages["amortization"]
+    total_repaid = payment * num_pay_periods
+    processing_fee = 100 if loan_type == "residential" else 50
 
-    # Continue growing balance after loan is paid
-    total_periods = int(years * 26)
-    for p in range(num_pay_periods + 1, total_periods + 1):
-        no_loan_bal += biweekly_contribution_no_loan
-        no_loan_bal *= (1 + g)
+    schedule = PayPeriodSchedule(num_pay_periods, biweekly_contribution_no_loan, biweekly_contribution_during_loan)
+    schedule.no_loan = stages["no_loan"].prefix(num_pay_periods)
+    schedule.with_loan = stages["with_loan"]
+    schedule.loan_balance = loan_balance_col
+    schedule.interest = interest_col
+    schedule.principal = principal_col
 
-        with_loan_bal += biweekly_contribution_no_loan
-        with_loan_bal *= (1 + g)
+    no_loan_bal = schedule.no_loan[-1] if num_pay_periods else tsp_balance
+    with_loan_bal = schedule.with_loan[-1] if num_pay_periods else tsp_balance - loan_amount - processing_fee
+    delta = no_loan_bal - with_loan_bal
 
-        payperiod_data.append({
-            "period": p,
-            "no_loan": round(no_loan_bal, 2),
-            "with_loan": round(with_loan_bal, 2),
-            "diff": round(no_loan_bal - with_loan_bal, 2),
-            "loan_balance": None,
-            "remaining_loan_payments": None
+    return {
+        "balance_no_loan": round_cents(no_loan_bal),
+        "balance_with_loan": round_cents(with_loan_bal),
+        "delta": round_cents(delta),
+        "loan_payment": round_cents(payment),
+        "total_repaid": round_cents(total_repaid),
+        "processing_fee": processing_fee,
+        "yearly_data": {
+            "labels": range(1, len(schedule) + 1),
+            "no_loan": RoundedColumn(schedule.no_loan),
+            "with_loan": RoundedColumn(schedule.with_loan)
+        },
+        "payperiod_data": schedule
+    }
+
+def calculate_tsp_loan_comparison(tsp_balance, expected_annual_growth, biweekly_contribution_no_loan, options):
+    """
+    Compare several loan options for one member against a single no-loan baseline.
+
+    Everything runs through TSP_LOAN_STAGES: the no-loan path is computed
+    once, out to the longest term, and each option only adds its own
+    amortization and with-loan stages (which /tsp-loan then reuses), so the
+    payoff figures match calculate_tsp_loan for the same inputs. Past its
+    own payoff an option's balance keeps growing with the no-loan
+    contribution, so every option is also compared at the longest term
+    (the horizon).
+
+    Parameters:
+    - options: mappings with loan_type, loan_amount, loan_interest_rate,
+      num_pay_periods and biweekly_contribution_during_loan
+
+    Returns:
+    - dict with horizon, balance_no_loan_at_horizon, labels (pay periods
+      1..horizon), no_loan (baseline path), with_loan (one path per option)
+      and options: per-option loan_payment, total_repaid, processing_fee,
+      balance_no_loan, balance_with_loan and delta at payoff, plus
+      balance_at_horizon and delta_at_horizon
+    """
+    if not options:
+        raise ValueError("Enter at least one loan option.")
+    if min(option["num_pay_periods"] for option in options) < 1:
+        raise ValueError("Number of pay periods must be at least 1.")
+    horizon = max(option["num_pay_periods"] for option in options)
+    shared = {
+        "tsp_balance": tsp_balance,
+        "expected_annual_growth": expected_annual_growth,
+        "biweekly_contribution_no_loan": biweekly_contribution_no_loan,
+    }
+    no_loan = TSP_LOAN_STAGES.run(shared, names=("no_loan",))["no_loan"].prefix(horizon)
+    growth_factor = 1 + expected_annual_growth / 100 / 26
+
+    with_loan_paths = []
+    rows = []
+    for option in options:
+        stages = TSP_LOAN_STAGES.run({**shared, **option}, names=("amortization", "with_loan"))
+        payment = stages["amortization"][0]
+        num_pay_periods = option["num_pay_periods"]
+        with_loan = stages["with_loan"]
+        # After payoff the account grows like the no-loan one, from its own balance
+        with_loan = with_loan + BalancePath(
+            with_loan[-1], biweekly_contribution_no_loan, growth_factor
+        ).prefix(horizon - num_pay_periods)
+        with_loan_paths.append(RoundedColumn(with_loan))
+
+        no_loan_bal = no_loan[num_pay_periods - 1]
+        with_loan_bal = with_loan[num_pay_periods - 1]
+        rows.append({
+            **option,
+            "loan_payment": round_cents(payment),
+            "total_repaid": round_cents(payment * num_pay_periods),
+            "processing_fee": 100 if option["loan_type"] == "residential" else 50,
+            "balance_no_loan": round_cents(no_loan_bal),
+            "balance_with_loan": round_cents(with_loan_bal),
+            "delta": round_cents(no_loan_bal - with_loan_bal),
+            "balance_at_horizon": round_cents(with_loan[-1]),
+            "delta_at_horizon": round_cents(no_loan[-1] - with_loan[-1]),
         })
 
-        if p % 26 == 0:
-            no_loan_periods.append(round(no_loan_bal, 2))
-            with_loan_periods.append(round(with_loan_bal, 2))
+    return {
+        "horizon": horizon,
+        "balance_no_loan_at_horizon": round_cents(no_loan[-1]),
+        "labels": range(1, horizon + 1),
+        "no_loan": RoundedColumn(no_loan),
+        "with_loan": with_loan_paths,
+        "options": rows
+    }
 
-    delta = no_loan_bal - with_loan_bal
+# Allowed number of payments for each TSP loan type
+TSP_LOAN_PAY_PERIOD_RANGES = {
+    "general": (26, 130),
+    "residential": (131, 390)
+}
+
+def parse_tsp_loan_inputs(form):
+    """
+    Parse and validate TSP loan inputs from a form (or any mapping).
+
+    Returns (inputs, error): inputs are calculate_tsp_loan keyword arguments,
+    error is a message for the user, or None when the inputs are valid.
+    """
+    try:
+        inputs = {
+            "loan_type": form["loan_type"],
+            "tsp_balance": float(form["tsp_balance"]),
+            "loan_amount": float(form["loan_amount"]),
+            "loan_interest_rate": float(form["loan_interest_rate"]),
+            "expected_annual_growth": float(form["expected_annual_growth"]),
+            "num_pay_periods": int(form["num_pay_periods"]),
+            "biweekly_contribution_no_loan": float(form["biweekly_contribution_no_loan"]),
+            "biweekly_contribution_during_loan": float(form["biweekly_contribution_during_loan"])
+        }
+    except (ValueError, KeyError, TypeError):
+        return None, "Please enter valid numeric values."
+
+    loan_amount = inputs["loan_amount"]
+    num_pay_periods = inputs["num_pay_periods"]
+
+    # Validations
+    if loan_amount < 1000:
+        return None, "Loan must be at least $1,000."
+    if loan_amount > inputs["tsp_balance"]:
+        return None, "Loan cannot exceed current TSP balance."
+    if num_pay_periods < 26 or num_pay_periods > 390:
+        return None, "Loan length must be between 26 and 390 pay periods."
+    if loan_amount > 50000:
+        return None, "Loan cannot exceed $50,000."
+
+    # Loan-type-specific validation
+    loan_type = inputs["loan_type"]
+    if loan_type not in TSP_LOAN_PAY_PERIOD_RANGES:
+        return None, "Please select a general or residential loan."
+    min_pp, max_pp = TSP_LOAN_PAY_PERIOD_RANGES[loan_type]
+    if not (min_pp <= num_pay_periods <= max_pp):
+        return None, f"{loan_type.capitalize()} loans must be between {min_pp} and {max_pp} payments (pay periods)."
+
+    return inputs, None
+
+def calculate_tsp_loan_batch(
+    loan_type,
+    tsp_balance,
+    loan_amount,
+    loan_interest_rate,
+    expected_annual_growth,
+    num_pay_periods,
+    biweekly_contribution_no_loan,
+    biweekly_contribution_during_loan
+):
+    """
+    Vectorized calculate_tsp_loan over many scenarios at once.
+
+    Every argument may be a scalar or a 1-D array; they are broadcast to a
+    common length N. Each scenario is stepped with the same arithmetic, in the
+    same order, as calculate_tsp_loan, so results match it to the cent.
+
+    Returns:
+    - dict of length-N arrays: balance_no_loan, balance_with_loan, delta,
+      loan_payment, total_repaid, processing_fee, num_pay_periods
+    - no_loan / with_loan: (N, max periods) balance paths, NaN past each
+      scenario's own term
+    """
+    loan_type = np.asarray(loan_type)
+    tsp_balance, loan_amount, loan_interest_rate, expected_annual_growth, \
+        contrib_no_loan, contrib_during_loan = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(a, dtype=float)) for a in (
+                tsp_balance, loan_amount, loan_interest_rate, expected_annual_growth,
+                biweekly_contribution_no_loan, biweekly_contribution_during_loan))
+        )
+    n_scenarios = tsp_balance.shape[0]
+    periods = np.broadcast_to(np.atleast_1d(np.asarray(num_pay_periods, dtype=np.int64)), (n_scenarios,))
+    loan_type = np.broadcast_to(np.atleast_1d(loan_type), (n_scenarios,))
+    if periods.min() < 1:
+        raise ValueError("Number of pay periods must be at least 1.")
+
+    r = loan_interest_rate / 100 / 26
+    g = expected_annual_growth / 100 / 26
+    processing_fee = np.where(loan_type == "residential", 100, 50)
+
+    # Loan payment (zero-rate scenarios fall back to straight-line repayment)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        amortized = loan_amount * r / (1 - (1 + r) ** -periods)
+    payment = np.where(r > 0, amortized, loan_amount / periods)
+    total_repaid = payment * periods
+
+    max_periods = int(periods.max())
+    no_loan_path = np.empty((n_scenarios, max_periods))
+    with_loan_path = np.empty((n_scenarios, max_periods))
+
+    no_loan_bal = tsp_balance.copy()
+    with_loan_bal = tsp_balance - loan_amount - processing_fee
+    loan_balance = loan_amount.copy()
+    for p in range(max_periods):
+        no_loan_bal = (no_loan_bal + contrib_no_loan) * (1 + g)
+
+        interest = loan_balance * r
+        principal = payment - interest
+        loan_balance = np.maximum(0, loan_balance - principal)
+        with_loan_bal = (with_loan_bal + contrib_during_loan + principal) * (1 + g)
+
+        no_loan_path[:, p] = no_loan_bal
+        with_loan_path[:, p] = with_loan_bal
+
+    rows = np.arange(n_scenarios)
+    final_no_loan = no_loan_path[rows, periods - 1]
+    final_with_loan = with_loan_path[rows, periods - 1]
+
+    past_term = np.arange(1, max_periods + 1) > periods[:, None]
+    no_loan_path[past_term] = np.nan
+    with_loan_path[past_term] = np.nan
 
     return {
-        "balance_no_loan": round(no_loan_bal, 2),
-        "balance_with_loan": round(with_loan_bal, 2),
-        "delta": round(delta, 2),
-        "loan_payment": round(payment, 2),
-        "total_repaid": round(total_repaid, 2),
+        "balance_no_loan": round_cents_array(final_no_loan),
+        "balance_with_loan": round_cents_array(final_with_loan),
+        "delta": round_cents_array(final_no_loan - final_with_loan),
+        "loan_payment": round_cents_array(payment),
+        "total_repaid": round_cents_array(total_repaid),
         "processing_fee": processing_fee,
-        "yearly_data": {
-            "labels": [p["period"] for p in payperiod_data],
-            "no_loan": [p["no_loan"] for p in payperiod_data],
-            "with_loan": [p["with_loan"] for p in payperiod_data]
-        },
-        "payperiod_data": payperiod_data
+        "num_pay_periods": periods,
+        "no_loan": round_cents_array(no_loan_path),
+        "with_loan": round_cents_array(with_loan_path)
+    }
+
+def calculate_tsp_loan_sweep(
+    tsp_balance,
+    loan_amounts,
+    loan_interest_rate,
+    growth_rates,
+    pay_period_options,
+    biweekly_contribution_no_loan,
+    biweekly_contribution_during_loan
+):
+    """
+    Sensitivity grid of calculate_tsp_loan over loan amount x term x growth.
+
+    The no-loan baseline does not depend on the loan, so it is simulated once
+    per growth rate; every (growth, amount, term) with-loan path is then
+    stepped together as one array. Terms of 131+ pay periods are treated as
+    residential loans (higher processing fee), shorter ones as general.
+
+    Returns dict of arrays (rounded to cents like calculate_tsp_loan):
+    - loan_payment, total_repaid: (amounts, terms)
+    - balance_no_loan: (growth rates, terms)
+    - balance_with_loan, delta: (growth rates, amounts, terms)
+    """
+    amounts = np.asarray(loan_amounts, dtype=float)[None, :, None]
+    terms = np.asarray(pay_period_options, dtype=np.int64)
+    growth = np.asarray(growth_rates, dtype=float)
+    if terms.min() < 1:
+        raise ValueError("Number of pay periods must be at least 1.")
+
+    r = loan_interest_rate / 100 / 26
+    g = (growth / 100 / 26)[:, None, None]
+    processing_fee = np.where(terms > 130, 100, 50)[None, None, :]
+
+    if r > 0:
+        payment = amounts * r / (1 - (1 + r) ** -terms[None, None, :])
+    else:
+        payment = amounts / terms[None, None, :]
+    payment = np.broadcast_to(payment, (1, amounts.shape[1], terms.size))
+
+    max_periods = int(terms.max())
+    grid_shape = (growth.size, amounts.shape[1], terms.size)
+
+    # Shared baseline: one path per growth rate, read off at each term
+    no_loan_path = np.empty((growth.size, max_periods))
+    no_loan_bal = np.full(growth.size, float(tsp_balance))
+    for p in range(max_periods):
+        no_loan_bal = (no_loan_bal + biweekly_contribution_no_loan) * (1 + g[:, 0, 0])
+        no_loan_path[:, p] = no_loan_bal
+    balance_no_loan = no_loan_path[:, terms - 1]
+
+    with_loan_bal = np.broadcast_to(tsp_balance - amounts - processing_fee, grid_shape).copy()
+    loan_balance = np.broadcast_to(amounts, grid_shape).copy()
+    balance_with_loan = np.empty(grid_shape)
+    for p in range(1, max_periods + 1):
+        interest = loan_balance * r
+        principal = payment - interest
+        loan_balance = np.maximum(0, loan_balance - principal)
+        with_loan_bal = (with_loan_bal + biweekly_contribution_during_loan + principal) * (1 + g)
+        ends_here = terms == p
+        if ends_here.any():
+            balance_with_loan[:, :, ends_here] = with_loan_bal[:, :, ends_here]
+
+    return {
+        "loan_payment": round_cents_array(payment[0]),
+        "total_repaid": round_cents_array(payment[0] * terms),
+        "balance_no_loan": round_cents_array(balance_no_loan),
+        "balance_with_loan": round_cents_array(balance_with_loan),
+        "delta": round_cents_array(balance_no_loan[:, None, :] - balance_with_loan)
     }
 
 def calculate_tsp_frontload(
@@ -524,56 +1455,55 @@ def calculate_tsp_frontload(
     include_match_in_growth=False
 ):
     # --- constants / base values ---
+    # Contributions are whole cents (ints) throughout; only the growth projection is float
     num_periods = 26
     # Employee minimum needed each PP to qualify for match (employee-only dollars)
-    base = round(annual_salary * (match_percent / 100) / num_periods, 2)
+    base_cents = to_cents(annual_salary * (match_percent / 100) / num_periods)
+    base = from_cents(base_cents)
 
     # Require enough target to fund the base all year (otherwise you can't earn full match)
-    min_year_employee = round(base * num_periods, 2)
-    if target_investment < min_year_employee:
+    min_year_cents = base_cents * num_periods
+    target_cents = to_cents(target_investment)
+    if target_cents < min_year_cents:
         raise ValueError(
             f"Target investment (${target_investment:,.2f}) must be at least "
-            f"the yearly minimum to receive full match (${min_year_employee:,.2f})."
+            f"the yearly minimum to receive full match (${from_cents(min_year_cents):,.2f})."
         )
 
-    # Extra dollars you can front-load beyond the reserved base in every period
-    extra_front_budget = round(target_investment - min_year_employee, 2)
+    # Extra cents you can front-load beyond the reserved base in every period
+    extra_front_budget = target_cents - min_year_cents
 
     # The most EXTRA you can add in any front-load period (employee-only)
-    per_period_extra_cap = max(0.0, round(max_biweekly - base, 2))
+    max_biweekly_cents = to_cents(max_biweekly)
+    per_period_extra_cap = max(0, max_biweekly_cents - base_cents)
 
     # How many full "max" periods fit, then a one-off remainder (employee-only extras)
     if per_period_extra_cap > 0:
-        full_max_periods = int(extra_front_budget // per_period_extra_cap)
-        extra_remainder = round(extra_front_budget - full_max_periods * per_period_extra_cap, 2)
+        full_max_periods, extra_remainder = divmod(extra_front_budget, per_period_extra_cap)
     else:
         full_max_periods = 0
-        extra_remainder = 0.0
+        extra_remainder = 0
 
-    # --- build schedules (employee-only amounts) ---
+    # --- build schedules (employee-only cents) ---
     # Front plan: base in all 26 periods, plus extras up front
     front_emp = []
     for i in range(1, num_periods + 1):
         if i <= full_max_periods:
             # base + full extra -> equals max_biweekly (employee-only)
-            emp = round(base + per_period_extra_cap, 2)
+            emp = base_cents + per_period_extra_cap
             label = "Front-Load (Max)"
         elif i == full_max_periods + 1 and extra_remainder > 0:
-            emp = round(base + extra_remainder, 2)
+            emp = base_cents + extra_remainder
             label = "One-Off Remainder"
         else:
-            emp = round(base, 2)
+            emp = base_cents
             label = "Match Only"
         front_emp.append((emp, label))
 
-    # Even plan: distribute employee-only dollars in cents, put remainder in LAST period
-    tgt_cents = int(round(target_investment * 100))          # total employee cents
-    base_even_cents = tgt_cents // num_periods               # floor per period
-    leftover_cents = tgt_cents - base_even_cents * num_periods
-    even_emp = []
-    for i in range(1, num_periods + 1):
-        cents = base_even_cents + (leftover_cents if i == num_periods else 0)
-        even_emp.append(round(cents / 100.0, 2))
+    # Even plan: distribute employee-only cents, put remainder in LAST period
+    base_even_cents = target_cents // num_periods            # floor per period
+    leftover_cents = target_cents - base_even_cents * num_periods
+    even_emp = [base_even_cents] * (num_periods - 1) + [base_even_cents + leftover_cents]
 
     # --- growth calculation (optionally include employer match in the account growth) ---
     growth_rate = (1 + annual_growth_percent / 100) ** (1 / num_periods)
@@ -581,18 +1511,20 @@ def calculate_tsp_frontload(
 
     front_balance = 0.0
     even_balance = 0.0
-    cumulative_front = 0.0
-    cumulative_even = 0.0
+    cumulative_front = 0
+    cumulative_even = 0
     table = []
     labels = []
 
     for i in range(1, num_periods + 1):
-        f_emp, f_label = front_emp[i - 1]
-        e_emp = even_emp[i - 1]
+        f_cents, f_label = front_emp[i - 1]
+        e_cents = even_emp[i - 1]
+        f_emp = from_cents(f_cents)
+        e_emp = from_cents(e_cents)
 
         # cumulative (employee-only)
-        cumulative_front = round(cumulative_front + f_emp, 2)
-        cumulative_even = round(cumulative_even + e_emp, 2)
+        cumulative_front += f_cents
+        cumulative_even += e_cents
 
         # growth step
         f_begin = front_balance
@@ -608,35 +1540,35 @@ def calculate_tsp_frontload(
 
         table.append({
             "PP": i,
-            "Front Contribution": round(f_emp, 2),     # employee-only
-            "Even Contribution": round(e_emp, 2),      # employee-only
+            "Front Contribution": f_emp,     # employee-only
+            "Even Contribution": e_emp,      # employee-only
             "Type": f_label,
-            "Cumulative Front": round(cumulative_front, 2),
-            "Cumulative Even": round(cumulative_even, 2),
-            "Front Begin": round(f_begin, 2),
-            "Front End": round(front_balance, 2),
-            "Even Begin": round(e_begin, 2),
-            "Even End": round(even_balance, 2),
+            "Cumulative Front": from_cents(cumulative_front),
+            "Cumulative Even": from_cents(cumulative_even),
+            "Front Begin": round_cents(f_begin),
+            "Front End": round_cents(front_balance),
+            "Even Begin": round_cents(e_begin),
+            "Even End": round_cents(even_balance),
         })
         labels.append(i)
 
     # --- derive summary from actual schedule (not assumptions) ---
-    front_max_count = sum(1 for emp, _lbl in front_emp if emp == round(max_biweekly, 2))
+    front_max_count = sum(1 for emp, _lbl in front_emp if emp == max_biweekly_cents)
     # a one-off is any period strictly between base and max (employee-only)
-    one_off_emp = next((emp for emp, _ in front_emp if base < emp < round(max_biweekly, 2)), 0.0)
-    match_only_count = sum(1 for emp, _ in front_emp if emp == base)
+    one_off_emp = from_cents(next((emp for emp, _ in front_emp if base_cents < emp < max_biweekly_cents), 0))
+    match_only_count = sum(1 for emp, _ in front_emp if emp == base_cents)
 
     if front_max_count > 0 and one_off_emp > 0:
         summary_lines = [
             f"Always contribute at least ${base} per pay period to receive the full agency match.",
-            f"First, contribute ${round(max_biweekly,2)} for {front_max_count} pay periods.",
-            f"Then contribute ${round(one_off_emp,2)} for 1 pay period.",
+            f"First, contribute ${from_cents(max_biweekly_cents)} for {front_max_count} pay periods.",
+            f"Then contribute ${one_off_emp} for 1 pay period.",
             f"Finally, continue contributing ${base} for the remaining {match_only_count} pay periods."
         ]
     elif front_max_count > 0 and one_off_emp == 0:
         summary_lines = [
             f"Always contribute at least ${base} per pay period to receive the full agency match.",
-            f"First, contribute ${round(max_biweekly,2)} for {front_max_count} pay periods.",
+            f"First, contribute ${from_cents(max_biweekly_cents)} for {front_max_count} pay periods.",
             f"Finally, continue contributing ${base} for the remaining {match_only_count} pay periods."
         ]
     elif front_max_count == 0 and one_off_emp > 0:
@@ -645,7 +1577,7 @@ def calculate_tsp_frontload(
         remaining = match_only_count - 1 if match_only_count > 0 else 0
         summary_lines = [
             f"Always contribute at least ${base} per pay period to receive the full agency match.",
-            f"Make a one-off of ${round(one_off_emp,2)} in the first pay period,",
+            f"Make a one-off of ${one_off_emp} in the first pay period,",
             f"then contribute ${base} for the remaining {remaining} pay periods."
         ]
     else:
@@ -654,14 +1586,14 @@ def calculate_tsp_frontload(
         ]
 
     result = {
-        "match_per_period": round(base, 2),
+        "match_per_period": base,
         "front_load_periods": front_max_count,
-        "one_off_amount": round(one_off_emp, 2),
+        "one_off_amount": one_off_emp,
         "match_only_periods": match_only_count,
-        "max_biweekly": round(max_biweekly, 2),  # employee-only max per PP
-        "front_ending_balance": round(front_balance, 2),
-        "even_ending_balance": round(even_balance, 2),
-        "advantage": round(front_balance - even_balance, 2),
+        "max_biweekly": from_cents(max_biweekly_cents),  # employee-only max per PP
+        "front_ending_balance": round_cents(front_balance),
+        "even_ending_balance": round_cents(even_balance),
+        "advantage": round_cents(front_balance - even_balance),
         "summary_lines": summary_lines,
     }
 
@@ -672,3 +1604,167 @@ def calculate_tsp_frontload(
     }
 
     return result, table, chart_data
+
+def calculate_tsp_frontload_batch(
+    annual_salary,
+    target_investment,
+    max_biweekly,
+    match_percent,
+    annual_growth_percent,
+    include_match_in_growth=False
+):
+    """
+    Vectorized calculate_tsp_frontload for many employees at once.
+
+    Arguments may be scalars or 1-D arrays and are broadcast together.
+    Contributions are int64 cents as in calculate_tsp_frontload, so each
+    row's figures match it. Rows whose target is below the yearly minimum
+    for the full match (where the scalar function raises) come back with
+    valid=False and NaN figures instead of raising.
+
+    Returns:
+    - dict of arrays: valid, match_per_period, front_load_periods,
+      one_off_amount, match_only_periods, max_biweekly,
+      front_ending_balance, even_ending_balance, advantage
+    """
+    num_periods = 26
+    annual_salary, target_investment, max_biweekly, match_percent, annual_growth_percent, include_match = \
+        np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(a, dtype=float)) for a in (
+                annual_salary, target_investment, max_biweekly, match_percent, annual_growth_percent)),
+            np.atleast_1d(np.asarray(include_match_in_growth, dtype=bool))
+        )
+
+    base_cents = to_cents_array(annual_salary * (match_percent / 100) / num_periods)
+    base = base_cents / 100
+    min_year_cents = base_cents * num_periods
+    tgt_cents = to_cents_array(target_investment)
+    valid = tgt_cents >= min_year_cents
+
+    extra_front_budget = tgt_cents - min_year_cents
+    max_biweekly_cents = to_cents_array(max_biweekly)
+    per_period_extra_cap = np.maximum(0, max_biweekly_cents - base_cents)
+    has_cap = per_period_extra_cap > 0
+    safe_cap = np.where(has_cap, per_period_extra_cap, 1)
+    full_max_periods = np.where(has_cap, extra_front_budget // safe_cap, 0)
+    extra_remainder = np.where(has_cap, extra_front_budget - full_max_periods * per_period_extra_cap, 0)
+
+    max_emp = base_cents + per_period_extra_cap
+    remainder_emp = base_cents + extra_remainder
+
+    base_even_cents = tgt_cents // num_periods
+    leftover_cents = tgt_cents - base_even_cents * num_periods
+
+    growth_rate = (1 + annual_growth_percent / 100) ** (1 / num_periods)
+    match_add = np.where(include_match, base, 0.0)
+
+    front_balance = np.zeros_like(base)
+    even_balance = np.zeros_like(base)
+    front_max_count = np.zeros(base.shape, dtype=np.int64)
+    match_only_count = np.zeros(base.shape, dtype=np.int64)
+    one_off_cents = np.zeros(base.shape, dtype=np.int64)
+    for i in range(1, num_periods + 1):
+        f_cents = np.where(i <= full_max_periods, max_emp,
+                           np.where((i == full_max_periods + 1) & (extra_remainder > 0), remainder_emp, base_cents))
+        e_cents = base_even_cents + (leftover_cents if i == num_periods else 0)
+
+        front_balance = (front_balance + (f_cents / 100 + match_add)) * growth_rate
+        even_balance = (even_balance + (e_cents / 100 + match_add)) * growth_rate
+
+        front_max_count += f_cents == max_biweekly_cents
+        match_only_count += f_cents == base_cents
+        is_one_off = (one_off_cents == 0) & (base_cents < f_cents) & (f_cents < max_biweekly_cents)
+        one_off_cents = np.where(is_one_off, f_cents, one_off_cents)
+
+    def masked(values):
+        return np.where(valid, values, np.nan)
+
+    return {
+        "valid": valid,
+        "match_per_period": masked(base),
+        "front_load_periods": np.where(valid, front_max_count, 0),
+        "one_off_amount": masked(one_off_cents / 100),
+        "match_only_periods": np.where(valid, match_only_count, 0),
+        "max_biweekly": masked(max_biweekly_cents / 100),
+        "front_ending_balance": masked(round_cents_array(front_balance)),
+        "even_ending_balance": masked(round_cents_array(even_balance)),
+        "advantage": masked(round_cents_array(front_balance - even_balance)),
+    }
+
+def optimize_tsp_frontload(
+    annual_salary,
+    match_percent,
+    annual_growth_percent,
+    annual_limit,
+    max_biweekly_cap=None,
+    include_match_in_growth=False,
+    num_candidates=500
+):
+    """
+    Find the max_biweekly (and resulting period split) with the largest front-load advantage.
+
+    The whole annual_limit is invested. Candidate per-period maximums run
+    from a cent above the match-only base up to max_biweekly_cap (default:
+    gross biweekly pay, annual_salary / 26) and are all scored in one
+    calculate_tsp_frontload_batch call. The even-contribution plan is the
+    baseline, with an advantage of zero: when no candidate beats it (zero or
+    negative growth, or a cap equal to the base) the result is the even plan,
+    with front_load False and max_biweekly None. Otherwise the figures are
+    those calculate_tsp_frontload gives for the chosen max_biweekly.
+
+    Returns:
+    - dict with front_load, max_biweekly, target_investment,
+      front_load_periods, one_off_amount, match_only_periods,
+      front_ending_balance, even_ending_balance, advantage
+    """
+    num_periods = 26
+    base_cents = to_cents(annual_salary * (match_percent / 100) / num_periods)
+    base = from_cents(base_cents)
+    if to_cents(annual_limit) < base_cents * num_periods:
+        raise ValueError(
+            f"Annual limit (${annual_limit:,.2f}) must be at least "
+            f"the yearly minimum to receive full match (${from_cents(base_cents * num_periods):,.2f})."
+        )
+    if max_biweekly_cap is None:
+        max_biweekly_cap = annual_salary / num_periods
+    if to_cents(max_biweekly_cap) < base_cents:
+        raise ValueError(
+            f"Max per-pay contribution (${max_biweekly_cap:,.2f}) must be at least "
+            f"the per-pay minimum to receive full match (${base:,.2f})."
+        )
+    # Contributing more than the whole remaining budget in one period changes nothing
+    upper = max(base, min(max_biweekly_cap, annual_limit - base * (num_periods - 1)))
+
+    # A maximum equal to the base front-loads nothing and would leave the extras uninvested,
+    # so it is scored only for the even plan's balance, which does not depend on the maximum
+    candidates = np.unique(np.round(np.linspace(base + 0.01, upper, num_candidates), 2))
+    candidates = np.concatenate(([base], candidates[(candidates > base) & (candidates <= upper)]))
+    scores = calculate_tsp_frontload_batch(
+        annual_salary, annual_limit, candidates, match_percent, annual_growth_percent, include_match_in_growth
+    )
+    even_ending_balance = float(scores["even_ending_balance"][0])
+    best = 1 + int(np.argmax(scores["advantage"][1:])) if len(candidates) > 1 else None
+
+    if best is None or scores["advantage"][best] <= 0:
+        return {
+            "front_load": False,
+            "max_biweekly": None,
+            "target_investment": round(annual_limit, 2),
+            "front_load_periods": 0,
+            "one_off_amount": 0.0,
+            "match_only_periods": 0,
+            "front_ending_balance": even_ending_balance,
+            "even_ending_balance": even_ending_balance,
+            "advantage": 0.0,
+        }
+    return {
+        "front_load": True,
+        "max_biweekly": float(candidates[best]),
+        "target_investment": round(annual_limit, 2),
+        "front_load_periods": int(scores["front_load_periods"][best]),
+        "one_off_amount": float(scores["one_off_amount"][best]),
+        "match_only_periods": int(scores["match_only_periods"][best]),
+        "front_ending_balance": float(scores["front_ending_balance"][best]),
+        "even_ending_balance": even_ending_balance,
+        "advantage": float(scores["advantage"][best]),
+    }
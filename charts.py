@@ -0,0 +1,81 @@
+"""
+Server-side preparation of chart series for the result pages.
+
+Series are downsampled with largest-triangle-three-buckets (LTTB) to a point
+budget, and can be shipped as base64-packed little-endian Float32 arrays
+instead of JSON number lists. static/chart_payload.js decodes either form.
+"""
+import base64
+
+import numpy as np
+
+
+def lttb_indices(x, y, max_points):
+    """Indices of the points LTTB keeps when reducing (x, y) to max_points (first and last always kept)."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if max_points >= n:
+        return np.arange(n)
+    if max_points < 3:
+        raise ValueError("A chart needs a budget of at least 3 points.")
+
+    every = (n - 2) / (max_points - 2)
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(max_points - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        # Keep the point forming the largest triangle with the last kept point and the next bucket's average
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def downsample(labels, series, max_points):
+    """
+    Downsample several series that share one x axis.
+
+    The union of the points LTTB keeps for each series is used for all of
+    them, so the series stay aligned. Series that move together mostly keep
+    the same points, so each starts with the whole budget and is trimmed
+    only while the union overflows it.
+    """
+    x = np.asarray(labels, dtype=float)
+    if len(x) <= max_points:
+        return list(labels), {name: list(values) for name, values in series.items()}
+
+    per_series = max_points
+    while True:
+        keep = np.unique(np.concatenate([lttb_indices(x, values, per_series) for values in series.values()]))
+        if len(keep) <= max_points or per_series == 3:
+            break
+        per_series = max(3, per_series - (len(keep) - max_points + len(series) - 1) // len(series))
+    labels = [labels[i] for i in keep.tolist()]
+    return labels, {name: np.asarray(values, dtype=float)[keep].tolist() for name, values in series.items()}
+
+
+def pack_float32(values):
+    """Base64 of the values as little-endian Float32 (about a dollar of precision at seven-figure balances)."""
+    return base64.b64encode(np.asarray(values, dtype="<f4").tobytes()).decode("ascii")
+
+
+def build_chart_payload(labels, series, max_points=120, encoding="json"):
+    """
+    Chart payload for a result template: {"labels", "series", "encoding"}.
+
+    encoding is "json" (plain number lists) or "float32" (base64 strings).
+    """
+    if encoding not in ("json", "float32"):
+        raise ValueError(f"Unknown chart encoding: {encoding}")
+    labels, series = downsample(list(labels), {name: list(values) for name, values in series.items()}, max_points)
+    if encoding == "float32":
+        series = {name: pack_float32(values) for name, values in series.items()}
+    return {"labels": labels, "series": series, "encoding": encoding}
@@ -0,0 +1,185 @@
+"""
+HTTP caching for the calculator pages: ETags, conditional GET and compression.
+
+Every page is a pure function of the request's inputs (query string, form
+or JSON body, session cookie, today's date) and of the templates and code
+that render it. ETags are a hash of exactly those, so a matching
+If-None-Match is answered with 304 before the view, and its calculation,
+runs. Responses above a size threshold are compressed with brotli (when
+the brotli package is installed) or gzip; streamed exports are compressed
+as they stream.
+"""
+import hashlib
+import os
+import zlib
+from datetime import date
+
+from flask import current_app, g, request, session
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "application/x-ndjson", "application/javascript", "image/svg+xml"}
+FORM_MIMETYPES = {"application/x-www-form-urlencoded", "multipart/form-data"}
+ETAG_SUFFIXES = ("", "-gzip", "-br")
+
+
+def content_version(root, sources=("templates", "static", "app_flask.py", "calculations.py", "charts.py", "money.py", "roster.py")):
+    """Hash of the templates and the modules that fill them; changes whenever a deploy can change a page."""
+    digest = hashlib.sha256()
+    for source in sources:
+        path = os.path.join(root, source)
+        files = [path] if os.path.isfile(path) else sorted(
+            os.path.join(dirpath, name) for dirpath, _, names in os.walk(path) for name in names
+        )
+        for file in files:
+            digest.update(os.path.relpath(file, root).encode())
+            with open(file, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _brotli_stream(chunks):
+    compressor = brotli.Compressor(quality=4)
+    for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class HTTPCache:
+    """
+    Flask extension adding validators, conditional GET and compression.
+
+    Parameters:
+     - min_size: smallest body, in bytes, worth compressing
+     - form_max_age: max-age for GET pages that do not depend on the session
+     - exempt: endpoints whose bodies are not a function of their inputs (counters, metrics)
+     - config_keys: app.config keys that change rendered pages and so belong in the ETag
+    """
+
+    def __init__(self, app=None, min_size=1024, form_max_age=300, exempt=("static",),
+                 config_keys=("CHART_MAX_POINTS", "CHART_ENCODING")):
+        self.min_size = min_size
+        self.form_max_age = form_max_age
+        self.exempt = set(exempt)
+        self.config_keys = config_keys
+        self.version = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.version = content_version(app.root_path)
+        app.before_request(self._conditional_get)
+        app.after_request(self._finish_response)
+        app.extensions["http_cache"] = self
+
+    def request_etag(self):
+        """Strong ETag for the current request's inputs, or None when they cannot be hashed cheaply."""
+        if request.files:
+            return None  # uploads are not worth reading twice
+        digest = hashlib.sha256()
+        digest.update(f"{self.version}|{date.today().isoformat()}|{request.path}".encode())
+        for key in self.config_keys:
+            digest.update(f"|{key}={current_app.config.get(key)!r}".encode())
+        digest.update(repr(sorted(request.args.items(multi=True))).encode())
+        if request.method not in ("GET", "HEAD"):
+            if request.mimetype in FORM_MIMETYPES:
+                digest.update(repr(sorted(request.form.items(multi=True))).encode())
+            else:
+                digest.update(request.get_data())
+        cookie = request.cookies.get(current_app.config["SESSION_COOKIE_NAME"], "")
+        digest.update(cookie.encode())
+        return digest.hexdigest()[:32]
+
+    def _matching_etag(self, etag):
+        for suffix in ETAG_SUFFIXES:
+            if request.if_none_match.contains(etag + suffix):
+                return etag + suffix
+        return None
+
+    def _conditional_get(self):
+        if request.endpoint is None or request.endpoint in self.exempt:
+            return None
+        g.etag = self.request_etag()
+        if g.etag is None or request.method not in ("GET", "HEAD"):
+            return None
+        matched = self._matching_etag(g.etag)
+        if matched is None:
+            return None
+        response = current_app.response_class(status=304)
+        response.set_etag(matched)
+        return response
+
+    def _choose_encoding(self):
+        offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+        return request.accept_encodings.best_match(offered)
+
+    def _compress(self, response):
+        compressible = response.mimetype.startswith("text/") or response.mimetype in COMPRESSIBLE_MIMETYPES
+        if (not compressible or response.direct_passthrough or "Content-Encoding" in response.headers
+                or response.status_code != 200):
+            return None
+        response.vary.add("Accept-Encoding")
+
+        if response.is_streamed:
+            encoding = self._choose_encoding()
+            if encoding is None:
+                return None
+            chunks = response.iter_encoded()
+            response.response = _brotli_stream(chunks) if encoding == "br" else _gzip_stream(chunks)
+            response.headers.pop("Content-Length", None)
+        else:
+            if response.content_length is not None and response.content_length < self.min_size:
+                return None
+            encoding = self._choose_encoding()
+            if encoding is None:
+                return None
+            data = response.get_data()
+            if encoding == "br":
+                response.set_data(brotli.compress(data, quality=5))
+            else:
+                compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+                response.set_data(compressor.compress(data) + compressor.flush())
+        response.headers["Content-Encoding"] = encoding
+        return encoding
+
+    def _finish_response(self, response):
+        if request.endpoint is None or request.endpoint in self.exempt:
+            return response
+
+        if response.status_code == 304:
+            response.vary.add("Accept-Encoding")
+            return response
+        if response.status_code != 200:
+            return response
+
+        if "Cache-Control" not in response.headers:
+            if request.method not in ("GET", "HEAD"):
+                # Results carry the user's salary and balances; keep them out of every cache
+                response.headers["Cache-Control"] = "no-store"
+            elif session.accessed or request.args:
+                # Forms prefilled from the session and exports of the user's inputs: cache per
+                # browser, revalidate with the ETag
+                response.headers["Cache-Control"] = "private, no-cache"
+            else:
+                response.cache_control.public = True
+                response.cache_control.max_age = self.form_max_age
+
+        encoding = self._compress(response)
+        etag = g.get("etag")
+        if etag is not None:
+            response.set_etag(etag + ({"gzip": "-gzip", "br": "-br"}[encoding] if encoding else ""))
+        return response
@@ -0,0 +1,321 @@
+"""
+Request instrumentation for the Flask app and a Prometheus text exporter.
+
+Every request is split into phases:
+ - parse: from the start of the request until the first calculation or
+   template render (form parsing and validation)
+ - calc: time inside calculations.py's public functions, which this module
+   wraps with `timed` when it is imported, so every caller that imports
+   their names afterwards is timed
+ - render: template rendering
+ - total: the whole request, as seen by Flask
+
+Histograms and counters are kept in memory per process; recording a request
+is a few dict updates under one lock. Each process writes a snapshot to
+`directory` at most every `flush_interval` seconds, and /metrics merges the
+snapshots of every live worker, so any gunicorn worker can answer a scrape.
+"""
+import functools
+import inspect
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+from flask import before_render_template, g, has_app_context, request, template_rendered
+
+import calculations
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "fedbenefits_request_duration_seconds": ("histogram", "Request latency by route and phase."),
+    "fedbenefits_calculation_duration_seconds": ("histogram", "Time spent in calculations.py functions."),
+    "fedbenefits_template_render_seconds": ("histogram", "Template render time by template."),
+    "fedbenefits_requests_total": ("counter", "Requests by route, method and status."),
+    "fedbenefits_request_errors_total": ("counter", "Requests that ended in a 5xx response."),
+}
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class MetricsRegistry:
+    """Counters and fixed-bucket histograms keyed by (metric name, label pairs)."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, seconds):
+        """Record one observation; the caller holds no lock."""
+        with self.lock:
+            self._observe(name, labels, seconds)
+
+    def _observe(self, name, labels, seconds):
+        key = (name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        histogram[0][bisect_left(self.buckets, seconds)] += 1
+        histogram[1] += seconds
+
+    def snapshot(self):
+        """JSON-able copy of every metric."""
+        with self.lock:
+            return {
+                "counters": [[name, list(map(list, labels)), value] for (name, labels), value in self.counters.items()],
+                "histograms": [
+                    [name, list(map(list, labels)), list(h[0]), h[1]] for (name, labels), h in self.histograms.items()
+                ],
+            }
+
+    @staticmethod
+    def merge(snapshots):
+        """Sum several snapshots into ({key: value}, {key: [bucket counts, sum]})."""
+        counters = {}
+        histograms = {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, counts, total in snapshot["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                merged = histograms.setdefault(key, [[0] * len(counts), 0.0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+        return counters, histograms
+
+    def render(self, counters, histograms, extra=()):
+        """Prometheus text exposition of merged counters and histograms, plus extra (name, type, help, value) samples."""
+        lines = []
+        described = set()
+
+        def describe(name):
+            if name not in described:
+                kind, text = HELP.get(name, ("untyped", name))
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+                described.add(name)
+
+        for (name, labels), value in sorted(counters.items()):
+            describe(name)
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), (counts, total) in sorted(histograms.items()):
+            describe(name)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total!r}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        for name, kind, text, value in extra:
+            HELP.setdefault(name, (kind, text))
+            describe(name)
+            lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# This process's metrics; RequestTimer flushes it for /metrics
+REGISTRY = MetricsRegistry()
+
+# Calls to timed functions in progress on this thread
+_calls = threading.local()
+
+
+def timed(func, registry=REGISTRY):
+    """
+    Wrap a calculator so its time counts as calculation time, per request and per function.
+
+    A timed function called from inside another is recorded under its own
+    name, but only the outermost call adds to the request's calc phase.
+    """
+    labels = (("function", func.__name__),)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        depth = getattr(_calls, "depth", 0)
+        _calls.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _calls.depth = depth
+            elapsed = time.perf_counter() - start
+            registry.observe("fedbenefits_calculation_duration_seconds", labels, elapsed)
+            if depth == 0 and has_app_context():
+                g.setdefault("work_start", start)
+                g.calc_time = g.get("calc_time", 0.0) + elapsed
+
+    wrapper.timed = True
+    return wrapper
+
+
+def instrument_module(module, exclude=(), registry=REGISTRY):
+    """Replace each public function defined in module, except those in exclude, with its timed wrapper (once)."""
+    for name, value in list(vars(module).items()):
+        if (inspect.isfunction(value) and value.__module__ == module.__name__ and not name.startswith("_")
+                and name not in exclude and not getattr(value, "timed", False)):
+            setattr(module, name, timed(value, registry))
+
+
+class RequestTimer:
+    """
+    Times each request's phases, every wrapped calculation and every template.
+
+    Each response gets a Server-Timing header (parse, calc, render, total) so
+    the split shows up in the browser's network panel; /metrics exposes the
+    histograms and /render-stats a JSON summary.
+
+    Parameters:
+     - directory: where processes write snapshots for /metrics to merge
+     - flush_interval: seconds between a process's snapshot writes
+     - registry: metrics to record and flush (default: this process's REGISTRY,
+       which the calculations.py wrappers record into)
+    """
+
+    def __init__(self, app=None, directory=None, flush_interval=5.0, registry=None):
+        self.registry = registry or REGISTRY
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "fedbenefits_metrics")
+        self.flush_interval = flush_interval
+        self.collectors = []
+        self._last_flush = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        before_render_template.connect(self._start_render, app, weak=False)
+        template_rendered.connect(self._finish_render, app, weak=False)
+        app.extensions["request_timer"] = self
+
+    def add_collector(self, collector):
+        """Register a callable returning (name, type, help, value) samples to add at scrape time."""
+        self.collectors.append(collector)
+        return collector
+
+    def timed(self, func):
+        """timed(func) recording into this timer's registry."""
+        return timed(func, self.registry)
+
+    def _start_request(self):
+        g.request_start = time.perf_counter()
+
+    def _start_render(self, sender, template, context, **extra):
+        g.render_start = time.perf_counter()
+        g.setdefault("work_start", g.render_start)
+
+    def _finish_render(self, sender, template, context, **extra):
+        elapsed = time.perf_counter() - g.pop("render_start")
+        g.render_time = g.get("render_time", 0.0) + elapsed
+        self.registry.observe("fedbenefits_template_render_seconds", (("template", template.name),), elapsed)
+
+    def _finish_request(self, response):
+        start = g.get("request_start")
+        if start is None:
+            return response
+        end = time.perf_counter()
+        phases = {
+            "parse": g.get("work_start", end) - start,
+            "calc": g.get("calc_time", 0.0),
+            "render": g.get("render_time", 0.0),
+            "total": end - start,
+        }
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        method = request.method
+        registry = self.registry
+        with registry.lock:
+            for phase, seconds in phases.items():
+                registry._observe(
+                    "fedbenefits_request_duration_seconds",
+                    (("route", route), ("method", method), ("phase", phase)),
+                    seconds,
+                )
+            key = ("fedbenefits_requests_total", (("route", route), ("method", method), ("status", str(response.status_code))))
+            registry.counters[key] = registry.counters.get(key, 0) + 1
+            if response.status_code >= 500:
+                key = ("fedbenefits_request_errors_total", (("route", route), ("method", method)))
+                registry.counters[key] = registry.counters.get(key, 0) + 1
+
+        response.headers["Server-Timing"] = ", ".join(
+            f"{phase};dur={seconds * 1e3:.2f}" for phase, seconds in phases.items()
+        )
+        if end - self._last_flush >= self.flush_interval:
+            self.flush()
+        return response
+
+    def flush(self):
+        """Write this process's snapshot where the other workers' /metrics can read it."""
+        self._last_flush = time.perf_counter()
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.registry.snapshot(), f)
+        os.replace(tmp, path)
+
+    def _live_snapshots(self):
+        self.flush()
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            pid = int(name[:-5])
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                # Worker is gone; its counters reset as far as Prometheus is concerned
+                os.remove(os.path.join(self.directory, name))
+                continue
+            except PermissionError:
+                pass
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def prometheus(self):
+        """Prometheus text for every live worker, plus the registered collectors."""
+        counters, histograms = MetricsRegistry.merge(self._live_snapshots())
+        extra = [sample for collector in self.collectors for sample in collector()]
+        return self.registry.render(counters, histograms, extra)
+
+    def stats(self):
+        """Mean render time per template and phase split per route for this process, in milliseconds."""
+        snapshot = self.registry.snapshot()
+        templates = {}
+        routes = {}
+        for name, labels, counts, total in snapshot["histograms"]:
+            labels = dict(labels)
+            count = sum(counts)
+            summary = {"count": count, "mean_ms": round(total / count * 1e3, 3), "total_ms": round(total * 1e3, 3)}
+            if name == "fedbenefits_template_render_seconds":
+                templates[labels["template"]] = summary
+            elif name == "fedbenefits_request_duration_seconds":
+                routes.setdefault(f"{labels['method']} {labels['route']}", {})[labels["phase"]] = summary
+        return {"templates": dict(sorted(templates.items())), "routes": dict(sorted(routes.items()))}
+
+
+# Input parsing belongs to the parse phase, not calc
+instrument_module(calculations, exclude=("parse_tsp_loan_inputs",))
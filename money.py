@@ -0,0 +1,101 @@
+"""
+Integer-cents money arithmetic shared by the calculators.
+
+Dollar amounts are held as Python ints (or int64 arrays) counting cents, so
+sums, differences and multiples of money are exact. Rounding happens only
+where a dollar figure is derived from a non-money factor (a rate, a number
+of hours, a salary divided by 52.175): that product is computed exactly as a
+ratio of integers and rounded once, half a cent away from zero (Decimal's
+ROUND_HALF_UP, the usual rule for pay).
+
+Conversions:
+ - to_cents(dollars): agrees with round(dollars, 2) for every float
+ - from_cents(cents): the float round(dollars, 2) would have returned
+ - round_cents(dollars): from_cents(to_cents(dollars)), for figures that are
+   computed in float (compounding balances) and published to the cent
+ - to_cents_array / round_cents_array: the same, elementwise over arrays
+"""
+import numpy as np
+
+DECIMAL_DENOMINATORS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+def to_cents(dollars):
+    """Whole cents in a dollar amount, rounded exactly as round(dollars, 2) rounds it."""
+    scaled = dollars * 100
+    cents = round(scaled)
+    # Away from a half cent the product's rounding error cannot change the
+    # answer; near one, defer to round(), which rounds the exact binary value
+    if abs(scaled - cents) < 0.49:
+        return cents
+    return round(round(dollars, 2) * 100)
+
+
+def from_cents(cents):
+    """Dollar float for a whole number of cents."""
+    return cents / 100
+
+
+def round_cents(dollars):
+    """A float dollar figure rounded to whole cents through to_cents."""
+    return from_cents(to_cents(dollars))
+
+
+def ratio(factor):
+    """
+    A factor as an exact (numerator, denominator) pair.
+
+    Floats are read as the decimal they were typed as (31.5 hours, a 4.375%
+    rate): the shortest one with up to six places that converts back to the
+    same float, falling back to the float's exact binary value.
+    """
+    if isinstance(factor, int):
+        return factor, 1
+    factor = float(factor)
+    for denominator in DECIMAL_DENOMINATORS:
+        numerator = round(factor * denominator)
+        if numerator / denominator == factor:
+            return numerator, denominator
+    return factor.as_integer_ratio()
+
+
+def div_round(numerator, denominator):
+    """numerator / denominator rounded half away from zero, in exact integer arithmetic (denominator > 0)."""
+    if numerator < 0:
+        return -div_round(-numerator, denominator)
+    quotient, remainder = divmod(numerator, denominator)
+    return quotient + (2 * remainder >= denominator)
+
+
+def scale_cents(cents, factor, divisor=1):
+    """cents * factor / divisor rounded once to whole cents; factor may be any float."""
+    numerator, denominator = ratio(factor)
+    return div_round(cents * numerator, denominator * divisor)
+
+
+def div_round_array(numerator, denominator):
+    """Elementwise div_round for int64 arrays."""
+    numerator = np.asarray(numerator, dtype=np.int64)
+    quotient, remainder = np.divmod(np.abs(numerator), denominator)
+    return np.sign(numerator) * (quotient + (2 * remainder >= denominator))
+
+
+def to_cents_array(dollars):
+    """Elementwise to_cents for finite float arrays, as int64 cents."""
+    dollars = np.asarray(dollars, dtype=float)
+    scaled = dollars * 100
+    cents = np.rint(scaled)
+    # As in to_cents: only values within float error of a half cent need round()
+    near_half = np.abs(scaled - cents) >= 0.49
+    if near_half.any():
+        cents[near_half] = [to_cents(value) for value in dollars[near_half].tolist()]
+    return cents.astype(np.int64)
+
+
+def round_cents_array(dollars):
+    """Elementwise round_cents for float arrays; NaN and infinite entries are left as they are."""
+    dollars = np.asarray(dollars, dtype=float)
+    rounded = dollars.copy()
+    finite = np.isfinite(dollars)
+    rounded[finite] = from_cents(to_cents_array(dollars[finite]))
+    return rounded
@@ -0,0 +1,161 @@
+"""
+On-demand profiling of single requests.
+
+A request carrying the admin token, either as an `X-Profile` header or a
+`_profile` query parameter, runs under cProfile while a sampling thread
+records its stack every half millisecond. Profiled requests run one at a
+time, since the sampler needs a process-wide switch interval. Three files
+are written to the profile directory, named
+<time>-<pid>-<sequence>-<route>-<input hash>:
+ - .collapsed: sampled stacks in collapsed format, for flamegraph.pl or speedscope
+ - .txt: the cProfile top-N summary by cumulative time
+ - .prof: the raw cProfile stats, for snakeviz or pstats
+
+The middleware is only installed when a token is configured, and requests
+without the token pass straight through to the app.
+"""
+import cProfile
+import hashlib
+import hmac
+import io
+import itertools
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode
+
+SAMPLE_INTERVAL = 0.0005
+
+# sys.setswitchinterval is process-wide, so overlapping profiles would
+# restore each other's interval; they queue here instead
+_profile_lock = threading.Lock()
+_profile_sequence = itertools.count(1)
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack until stopped, counting collapsed stacks."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                key = ";".join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+            time.sleep(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+class RequestProfiler:
+    """
+    WSGI middleware that profiles requests presenting the admin token.
+
+    Parameters:
+     - wsgi_app: the application to wrap (app.wsgi_app)
+     - token: secret that enables profiling for a request
+     - directory: where profiles are written
+     - top_n: functions listed in the text summary
+    """
+
+    def __init__(self, wsgi_app, token, directory, top_n=30):
+        self.wsgi_app = wsgi_app
+        self.token = token
+        self.directory = directory
+        self.top_n = top_n
+        os.makedirs(directory, exist_ok=True)
+
+    def _requested(self, environ):
+        """The presented token, with a _profile query parameter removed from the environ."""
+        presented = environ.get("HTTP_X_PROFILE")
+        query = environ.get("QUERY_STRING", "")
+        if presented is None and "_profile=" in query:
+            params = parse_qsl(query, keep_blank_values=True)
+            presented = next((v for k, v in params if k == "_profile"), None)
+            environ["QUERY_STRING"] = urlencode([(k, v) for k, v in params if k != "_profile"])
+        return presented is not None and hmac.compare_digest(presented.encode(), self.token.encode())
+
+    def __call__(self, environ, start_response):
+        if "HTTP_X_PROFILE" not in environ and "_profile=" not in environ.get("QUERY_STRING", ""):
+            return self.wsgi_app(environ, start_response)
+        if not self._requested(environ):
+            return self.wsgi_app(environ, start_response)
+        return self._profile(environ, start_response)
+
+    def _input_hash(self, environ):
+        # Buffer the body so it can be hashed and still be read by the app
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        body = environ["wsgi.input"].read(length) if length else b""
+        environ["wsgi.input"] = io.BytesIO(body)
+        digest = hashlib.sha256()
+        for part in (environ["REQUEST_METHOD"], environ.get("PATH_INFO", ""), environ.get("QUERY_STRING", "")):
+            digest.update(part.encode("latin-1") + b"\0")
+        digest.update(body)
+        return digest.hexdigest()[:12]
+
+    def _profile(self, environ, start_response):
+        route = re.sub(r"[^A-Za-z0-9]+", "_", environ.get("PATH_INFO", "")).strip("_") or "index"
+        name = "-".join((
+            time.strftime("%Y%m%dT%H%M%S"), str(os.getpid()), f"{next(_profile_sequence):04d}",
+            route, self._input_hash(environ),
+        ))
+        captured = {}
+
+        def capture_start_response(status, headers, exc_info=None):
+            captured["status"] = status
+            captured["headers"] = headers + [("X-Profile-Id", name)]
+            captured["exc_info"] = exc_info
+            return lambda data: captured.setdefault("written", []).append(data)
+
+        with _profile_lock:
+            sampler = StackSampler(threading.get_ident())
+            profiler = cProfile.Profile()
+            switch_interval = sys.getswitchinterval()
+            # Let the sampler take the GIL often enough to see CPU-bound code
+            sys.setswitchinterval(SAMPLE_INTERVAL / 5)
+            sampler.start()
+            profiler.enable()
+            try:
+                iterable = self.wsgi_app(environ, capture_start_response)
+                try:
+                    body = captured.pop("written", []) + list(iterable)
+                finally:
+                    if hasattr(iterable, "close"):
+                        iterable.close()
+            finally:
+                profiler.disable()
+                sampler.stop()
+                sys.setswitchinterval(switch_interval)
+
+        self._write(name, profiler, sampler)
+        start_response(captured["status"], captured["headers"], captured["exc_info"])
+        return body
+
+    def _write(self, name, profiler, sampler):
+        base = os.path.join(self.directory, name)
+        with open(f"{base}.collapsed", "w") as f:
+            f.write(sampler.collapsed())
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(self.top_n)
+        with open(f"{base}.txt", "w") as f:
+            f.write(summary.getvalue())
+        profiler.dump_stats(f"{base}.prof")
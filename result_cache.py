@@ -0,0 +1,273 @@
+"""
+Result cache for the pure functions in calculations.py.
+
+Entries live in a local SQLite file, so every gunicorn worker on the host
+shares one cache. Keys are a canonical form of the call's arguments, so
+5 and 5.0, or positional and keyword arguments, hit the same entry, plus
+a hash of the calculator's source file and of every local module it
+imports from (money.py for calculations.py), so results computed by older
+code are never served. Values are stored as JSON, never pickle, so nothing
+read back from the file can run code; tuples and the lazy result sequences
+come back as lists, on a miss as well as on a hit. Entries expire after `ttl`
+seconds and the oldest are evicted once the cache holds more than
+`max_entries`.
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Sequence
+
+import numpy as np
+
+
+def default_cache_path():
+    """results.sqlite3 in a per-user directory only its owner can read ($XDG_CACHE_HOME or ~/.cache)."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    directory = os.path.join(base, "fedbenefits")
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    os.chmod(directory, 0o700)
+    return os.path.join(directory, "results.sqlite3")
+
+
+def _encode(value):
+    """JSON for values json.dumps cannot write itself: lazy sequences, ranges and NumPy values."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (Sequence, range)) and not isinstance(value, (str, bytes)):
+        return list(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _dumps(value):
+    return json.dumps(value, default=_encode, separators=(",", ":"))
+
+
+def _source_files(module_name):
+    """
+    Source files of a module and of the modules next to it that it imports
+    or takes functions and classes from, directly or through one another;
+    installed packages are left out.
+    """
+    path = getattr(sys.modules.get(module_name), "__file__", None)
+    if not path:
+        return []
+    directory = os.path.dirname(os.path.abspath(path))
+    files = {}
+    pending = [module_name]
+    while pending:
+        module = sys.modules.get(pending.pop())
+        path = os.path.abspath(getattr(module, "__file__", None) or "")
+        if os.path.dirname(path) != directory or path in files.values():
+            continue
+        files[module.__name__] = path
+        for value in vars(module).values():
+            name = value.__name__ if inspect.ismodule(value) else getattr(value, "__module__", None)
+            if isinstance(name, str) and name not in files:
+                pending.append(name)
+    return sorted(files.values())
+
+
+@functools.lru_cache(maxsize=None)
+def code_version(module_name):
+    """Short hash of a module's source file and its local dependencies' (see _source_files), or "" when it has none."""
+    files = _source_files(module_name)
+    if not files:
+        return ""
+    digest = hashlib.sha256()
+    for path in files:
+        with open(path, "rb") as f:
+            digest.update(os.path.basename(path).encode() + b"\0" + f.read())
+    return digest.hexdigest()[:12]
+
+
+def _canonical(value):
+    """Normalize an argument so equal inputs serialize identically."""
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value) + 0.0  # 5 == 5.0, -0.0 == 0.0
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    return repr(value)
+
+
+def canonical_key(func, args, kwargs):
+    """
+    Cache key for func(*args, **kwargs): function name, its module's code
+    version and a hash of the bound, defaulted arguments.
+    """
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    payload = json.dumps(
+        {name: _canonical(value) for name, value in bound.arguments.items()},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    version = code_version(func.__module__)
+    return f"{func.__module__}.{func.__qualname__}@{version}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+class ResultCache:
+    """
+    SQLite-backed result cache with size and TTL eviction and shared hit/miss counters.
+
+    Lookups only read the file. Hits and misses are counted in memory and
+    added to the shared counters in one write every `flush_interval`
+    seconds, with each set(), and by stats().
+    """
+
+    def __init__(self, path=None, max_entries=5000, ttl=3600, flush_interval=5.0):
+        self.path = path or default_cache_path()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._counts_lock = threading.Lock()
+        self._reset_counts()
+        with self._connect() as conn:
+            # Values were pickled before; that table is dropped rather than read
+            columns = dict(conn.execute("SELECT name, type FROM pragma_table_info('results')").fetchall())
+            if columns.get("value") == "BLOB":
+                conn.execute("DROP TABLE results")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_created ON results (created)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0)")
+
+    def _connect(self):
+        # One connection per thread, reopened after a fork so workers never share a handle
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _reset_counts(self):
+        self._counts = {"hits": 0, "misses": 0}
+        self._counts_pid = os.getpid()
+        self._last_flush = time.monotonic()
+
+    def _count(self, name):
+        """Count a lookup in memory; True when the counts are due to be written."""
+        with self._counts_lock:
+            if self._counts_pid != os.getpid():
+                # Inherited across a fork; the parent still owns those counts
+                self._reset_counts()
+            self._counts[name] += 1
+            return time.monotonic() - self._last_flush >= self.flush_interval
+
+    def _take_counts(self):
+        with self._counts_lock:
+            counts = self._counts if self._counts_pid == os.getpid() else {"hits": 0, "misses": 0}
+            self._reset_counts()
+        return [(value, name) for name, value in counts.items() if value]
+
+    def _add_counts(self, conn, counts):
+        conn.executemany("UPDATE counters SET value = value + ? WHERE name = ?", counts)
+
+    def _flush_counts(self, conn):
+        counts = self._take_counts()
+        if counts:
+            self._add_counts(conn, counts)
+
+    def get(self, key):
+        """Return (found, value) for key, counting the lookup as a hit or miss."""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value FROM results WHERE key = ? AND created >= ?",
+            (key, time.time() - self.ttl),
+        ).fetchone()
+        if self._count("hits" if row else "misses"):
+            self._flush_counts(conn)
+        if row is None:
+            return False, None
+        return True, json.loads(row[0])
+
+    def set(self, key, value):
+        """Store value under key, then drop expired entries and the oldest ones over max_entries."""
+        self._store(key, _dumps(value))
+
+    def _store(self, key, payload):
+        conn = self._connect()
+        now = time.time()
+        counts = self._take_counts()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created) VALUES (?, ?, ?)",
+                (key, payload, now),
+            )
+            self._add_counts(conn, counts)
+            conn.execute("DELETE FROM results WHERE created < ?", (now - self.ttl,))
+            excess = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY created LIMIT ?)",
+                    (excess,),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            with self._counts_lock:
+                for value, name in counts:
+                    self._counts[name] += value
+            raise
+
+    def clear(self):
+        conn = self._connect()
+        self._take_counts()
+        conn.execute("DELETE FROM results")
+        conn.execute("UPDATE counters SET value = 0")
+
+    def stats(self):
+        """
+        Hit/miss counters and current size, shared across every process using
+        this file; other processes' latest lookups show up once they flush.
+        """
+        conn = self._connect()
+        self._flush_counts(conn)
+        counters = dict(conn.execute("SELECT name, value FROM counters"))
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": conn.execute("SELECT COUNT(*) FROM results").fetchone()[0],
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+        }
+
+    def memoize(self, func):
+        """
+        Wrap a pure function so repeated calls with equal arguments are served
+        from the cache. Every result, computed or cached, is returned as its
+        JSON round-trip, so callers see the same types either way.
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = canonical_key(func, args, kwargs)
+            found, value = self.get(key)
+            if found:
+                return value
+            payload = _dumps(func(*args, **kwargs))
+            self._store(key, payload)
+            return json.loads(payload)
+
+        wrapper.cache = self
+        return wrapper
@@ -0,0 +1,314 @@
+"""
+Bulk roster processing: every calculator for every employee in a CSV.
+
+The roster is read with csv.DictReader one row at a time and cut into
+chunks; each chunk is computed by process_chunk in a process pool and the
+result rows are yielded in roster order as soon as their chunk is done.
+At most a few chunks per worker are in flight, so memory stays flat no
+matter how long the roster is. The pool is created on first use and shared
+by every upload in the process, so concurrent uploads queue for the same
+workers instead of each starting their own. It uses every core by default;
+under a multi-process server, give each server process its share of the
+cores instead (`workers`, FEDBENEFITS_ROSTER_WORKERS in app_flask).
+
+Input columns (header names; any may be blank, and a calculator runs for a
+row only when its required columns are filled in):
+ - employee_id: copied to the output to identify the row
+ - severance: annual_salary, years_of_service, age_years (months_of_service
+   and age_months default to 0)
+ - lump sum: hourly_rate, leave_balance_hours
+ - leave accrual: employee_type, years_of_service, pay_periods
+   (hours_in_pay_status for part-time, avg_hours_per_pay_period for
+   uncommon tours of duty)
+ - SCD: current_start (YYYY-MM-DD) and prior_periods as
+   "start:end;start:end"; overlapping periods are credited once, as in
+   calculate_scd_batch
+
+A row whose values cannot be used gets a message in the error column and
+blanks for that calculator; the other calculators and rows still run. If
+the file itself stops being readable partway through (bad encoding or
+malformed CSV), the rows before it are still returned, followed by one
+row whose error column says where reading stopped.
+"""
+import csv
+import itertools
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from calculations import (
+    calculate_annual_leave_accrual,
+    calculate_lump_sum_payment,
+    calculate_scd_batch,
+    calculate_severance_pay_bulk,
+)
+
+ROSTER_INPUT_FIELDS = [
+    "employee_id", "annual_salary", "years_of_service", "months_of_service", "age_years", "age_months",
+    "hourly_rate", "leave_balance_hours", "employee_type", "pay_periods", "hours_in_pay_status",
+    "avg_hours_per_pay_period", "current_start", "prior_periods"
+]
+ROSTER_OUTPUT_FIELDS = [
+    "row", "employee_id", "severance_total", "severance_basic", "severance_age_adjustment",
+    "severance_biweekly", "severance_weeks", "lump_sum", "accrued_leave_hours", "scd",
+    "creditable_days", "error"
+]
+LEAVE_EMPLOYEE_TYPES = (
+    "Full-time Employee", "Part-time Employee", "Uncommon Tours of Duty",
+    "SES, Senior Level, Scientific/Professional Positions"
+)
+SEVERANCE_FIELDS = {
+    "total_severance": "severance_total",
+    "total_severance_before_age_factor": "severance_basic",
+    "age_adjustment": "severance_age_adjustment",
+    "biweekly_severance": "severance_biweekly",
+    "weeks_of_severance": "severance_weeks",
+}
+
+
+def _filled(row, *names):
+    return all((row.get(name) or "").strip() for name in names)
+
+
+def _optional_float(value):
+    value = (value or "").strip()
+    return float(value) if value else None
+
+
+def _severance_inputs(row):
+    """(salary, years, months, age years, age months), with the /severance form's checks."""
+    inputs = (
+        float(row["annual_salary"]),
+        int(row["years_of_service"]),
+        int(row.get("months_of_service") or 0),
+        int(row["age_years"]),
+        int(row.get("age_months") or 0),
+    )
+    annual_salary, years, months, age_years, _ = inputs
+    if annual_salary == 0 or (years == 0 and months == 0) or age_years == 0:
+        raise ValueError("enter values greater than zero")
+    if years < 0 or months < 0:
+        raise ValueError("service cannot be negative")
+    return inputs
+
+
+def _leave_accrual(row):
+    employee_type = row["employee_type"].strip()
+    if employee_type not in LEAVE_EMPLOYEE_TYPES:
+        raise ValueError(f"unknown employee type {employee_type!r}")
+    return calculate_annual_leave_accrual(
+        employee_type,
+        int(row["years_of_service"]),
+        int(row["pay_periods"]),
+        _optional_float(row.get("hours_in_pay_status")),
+        _optional_float(row.get("avg_hours_per_pay_period"))
+    )
+
+
+def _scd(row):
+    periods = []
+    for period in (row.get("prior_periods") or "").split(";"):
+        if period.strip():
+            bounds = [bound.strip() for bound in period.split(":")]
+            if len(bounds) != 2 or not all(bounds):
+                raise ValueError(f"prior period {period.strip()!r} is not start:end, e.g. 2010-01-04:2014-06-30")
+            periods.append(tuple(bounds))
+    scd, total_days, _ = calculate_scd_batch([(row["current_start"].strip(), periods)])[0]
+    return scd.isoformat(), total_days
+
+
+def process_chunk(chunk):
+    """
+    Results for a chunk of (row number, roster row) pairs, one output row each.
+
+    Severance for the whole chunk goes through calculate_severance_pay_bulk;
+    the other calculators run per row.
+    """
+    results = []
+    errors = []
+    severance_rows = []
+    severance_inputs = []
+    for number, row in chunk:
+        result = dict.fromkeys(ROSTER_OUTPUT_FIELDS, "")
+        result["row"] = number
+        result["employee_id"] = row.get("employee_id") or ""
+        problems = []
+
+        if _filled(row, "annual_salary", "years_of_service", "age_years"):
+            try:
+                severance_inputs.append(_severance_inputs(row))
+                severance_rows.append(len(results))
+            except (ValueError, TypeError) as e:
+                problems.append(f"severance: {e}")
+        if _filled(row, "hourly_rate", "leave_balance_hours"):
+            try:
+                result["lump_sum"] = round(
+                    calculate_lump_sum_payment(float(row["hourly_rate"]), float(row["leave_balance_hours"])), 2
+                )
+            except (ValueError, TypeError) as e:
+                problems.append(f"lump sum: {e}")
+        if _filled(row, "employee_type", "years_of_service", "pay_periods"):
+            try:
+                result["accrued_leave_hours"] = round(_leave_accrual(row), 2)
+            except (ValueError, TypeError) as e:
+                problems.append(f"leave accrual: {e}")
+        if _filled(row, "current_start"):
+            try:
+                result["scd"], result["creditable_days"] = _scd(row)
+            except (ValueError, TypeError) as e:
+                problems.append(f"scd: {e}")
+
+        results.append(result)
+        errors.append(problems)
+
+    if severance_inputs:
+        severance = calculate_severance_pay_bulk(*zip(*severance_inputs))
+        for key, column in SEVERANCE_FIELDS.items():
+            for index, value in zip(severance_rows, severance[key].tolist()):
+                results[index][column] = value
+
+    for result, problems in zip(results, errors):
+        result["error"] = "; ".join(problems)
+    return results
+
+
+class RosterReadError(ValueError):
+    """The roster stopped being readable at `row`; the rows before it were read."""
+
+    def __init__(self, row, message):
+        super().__init__(message)
+        self.row = row
+
+
+def _error_row(number, message):
+    result = dict.fromkeys(ROSTER_OUTPUT_FIELDS, "")
+    result["row"] = number
+    result["error"] = message
+    return result
+
+
+def read_chunks(lines, chunk_size):
+    """
+    Chunks of (row number, row) pairs from CSV text lines, read lazily; row 1 is the first after the header.
+
+    A decoding or CSV error partway through yields the rows read so far,
+    then raises RosterReadError.
+    """
+    reader = csv.DictReader(lines)
+    try:
+        fieldnames = reader.fieldnames
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ValueError(f"The roster could not be read: {e}") from e
+    if fieldnames is None:
+        return
+    if not set(fieldnames) & set(ROSTER_INPUT_FIELDS[1:]):
+        raise ValueError("The roster has none of the expected columns; see the upload page for the header.")
+    numbered = enumerate(reader, start=1)
+    read = 0
+    while True:
+        chunk = []
+        try:
+            for item in itertools.islice(numbered, chunk_size):
+                chunk.append(item)
+        except (UnicodeDecodeError, csv.Error) as e:
+            if chunk:
+                yield chunk
+            raise RosterReadError(
+                read + len(chunk) + 1,
+                f"could not read the roster after line {reader.line_num}: {e}; the rows after it were not processed"
+            ) from e
+        if not chunk:
+            return
+        read += len(chunk)
+        yield chunk
+
+
+def process_roster(lines, chunk_size=1000, workers=None, max_pending=2):
+    """
+    Result rows for every employee in a CSV roster, in roster order.
+
+    Parameters:
+    - lines: iterable of CSV text lines, header first (an open text file)
+    - chunk_size: rows sent to a worker at a time
+    - workers: size of the shared pool when it is first created, default
+      os.cpu_count(); 1 computes in this process. Every server process has
+      its own pool, so with several (gunicorn workers) pass
+      cores // processes to keep them from oversubscribing the host
+    - max_pending: chunks in flight per worker before waiting for the oldest
+
+    The header is checked before anything is computed, so a file that is not
+    a roster raises ValueError straight away.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = read_chunks(lines, chunk_size)
+    try:
+        first = next(chunks, None)
+    except RosterReadError as e:
+        return iter([_error_row(e.row, str(e))])
+    if first is None:
+        return iter(())
+    chunks = itertools.chain([first], chunks)
+    if workers == 1:
+        return _process_inline(chunks)
+    return _process_in_pool(chunks, workers, max_pending)
+
+
+def _process_inline(chunks):
+    try:
+        for chunk in chunks:
+            yield from process_chunk(chunk)
+    except RosterReadError as e:
+        yield _error_row(e.row, str(e))
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _shared_pool(workers):
+    """
+    The process-wide pool, created with `workers` processes on first use,
+    and again after a fork or a crashed worker; later sizes are ignored.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def _process_in_pool(chunks, workers, max_pending):
+    pool = _shared_pool(workers)
+    pending = deque()
+    failure = None
+    try:
+        try:
+            for chunk in chunks:
+                pending.append(pool.submit(process_chunk, chunk))
+                if len(pending) >= workers * max_pending:
+                    yield from pending.popleft().result()
+        except RosterReadError as e:
+            failure = e
+        while pending:
+            yield from pending.popleft().result()
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
+    finally:
+        # A client that disconnects mid-download leaves chunks nobody will read
+        for future in pending:
+            future.cancel()
+    if failure is not None:
+        yield _error_row(failure.row, str(failure))
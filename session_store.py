@@ -0,0 +1,227 @@
+"""
+Server-side sessions for the Flask app.
+
+The cookie carries only a random session id; the calculator inputs each
+page remembers live in a store on the server. That keeps request headers
+small and skips signing and verifying the whole session on every request.
+
+Stores:
+ - SQLiteSessionStore: a local SQLite file shared by every worker on the
+   host (put it on /dev/shm to keep it in memory).
+ - MemorySessionStore: a dict in this process; for single-process servers
+   and development.
+
+A new id is issued whenever the session changes, so the cookie value also
+versions the session (the HTTP cache hashes it into ETags). The id it
+replaces stays readable, with its old contents, for a short grace period:
+requests the browser sent before it saw the new cookie still find their
+session instead of starting an empty one. Expired sessions are swept from
+the store at most every `sweep_interval` seconds.
+"""
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+
+serializer = TaggedJSONSerializer()
+
+
+class ServerSession(SecureCookieSession):
+    """Session dict that remembers which stored session it was loaded from."""
+
+    def __init__(self, initial=None, sid=None):
+        super().__init__(initial)
+        self.sid = sid
+
+
+class MemorySessionStore:
+    """Sessions in a dict in this process, with expiry sweeping."""
+
+    def __init__(self, sweep_interval=300):
+        self.sweep_interval = sweep_interval
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+
+    def load(self, sid):
+        with self._lock:
+            entry = self._sessions.get(sid)
+        if entry is None or entry[1] < time.time():
+            return None
+        return serializer.loads(entry[0])
+
+    def save(self, sid, data, expires, replaces=None, replaced_until=None):
+        now = time.time()
+        with self._lock:
+            if replaces is not None:
+                entry = self._sessions.pop(replaces, None)
+                if entry is not None and replaced_until is not None:
+                    self._sessions[replaces] = (entry[0], min(entry[1], replaced_until))
+            self._sessions[sid] = (serializer.dumps(data), expires)
+            if now - self._last_sweep >= self.sweep_interval:
+                self._sessions = {k: v for k, v in self._sessions.items() if v[1] >= now}
+                self._last_sweep = now
+
+    def touch(self, sid, expires):
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if entry is not None:
+                self._sessions[sid] = (entry[0], expires)
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteSessionStore:
+    """Sessions in a SQLite file shared across worker processes, with expiry sweeping."""
+
+    def __init__(self, path, sweep_interval=300):
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self._local = threading.local()
+        self._last_sweep = 0.0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)")
+
+    def _connect(self):
+        # One connection per thread, reopened after a fork so workers never share a handle
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def load(self, sid):
+        row = self._connect().execute(
+            "SELECT data FROM sessions WHERE sid = ? AND expires >= ?", (sid, time.time())
+        ).fetchone()
+        return serializer.loads(row[0]) if row is not None else None
+
+    def save(self, sid, data, expires, replaces=None, replaced_until=None):
+        """
+        Store data under sid. The session it replaces is dropped in the same
+        transaction, or with replaced_until kept readable until then.
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if replaces is not None and replaced_until is not None:
+                conn.execute("UPDATE sessions SET expires = MIN(expires, ?) WHERE sid = ?", (replaced_until, replaces))
+            elif replaces is not None:
+                conn.execute("DELETE FROM sessions WHERE sid = ?", (replaces,))
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)",
+                (sid, serializer.dumps(data), expires),
+            )
+            if now - self._last_sweep >= self.sweep_interval:
+                conn.execute("DELETE FROM sessions WHERE expires < ?", (now,))
+                self._last_sweep = now
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def touch(self, sid, expires):
+        self._connect().execute("UPDATE sessions SET expires = ? WHERE sid = ?", (expires, sid))
+
+    def delete(self, sid):
+        self._connect().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Flask session interface backed by a session store.
+
+    Parameters:
+     - store: a SQLiteSessionStore, MemorySessionStore or anything with the same
+       load/save/touch/delete methods
+     - rotation_grace: seconds a replaced session id stays readable; 0 drops
+       it as soon as the new one is stored
+    """
+
+    session_class = ServerSession
+
+    def __init__(self, store, rotation_grace=60):
+        self.store = store
+        self.rotation_grace = rotation_grace
+
+    def _lifetime(self, app):
+        return app.permanent_session_lifetime.total_seconds()
+
+    def open_session(self, app, request):
+        # Static files never read the session; skip the lookup
+        if app.static_url_path and request.path.startswith(app.static_url_path + "/"):
+            return self.session_class()
+        sid = request.cookies.get(self.get_cookie_name(app))
+        data = self.store.load(sid) if sid else None
+        if data is None:
+            return self.session_class()
+        return self.session_class(data, sid=sid)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        # Emptied sessions are dropped from the store along with the cookie
+        if not session:
+            if session.modified:
+                if session.sid is not None:
+                    self.store.delete(session.sid)
+                response.delete_cookie(
+                    name, domain=domain, path=path, secure=secure, samesite=samesite, httponly=httponly
+                )
+                response.vary.add("Cookie")
+            return
+
+        if not self.should_set_cookie(app, session):
+            return
+
+        now = time.time()
+        stored_until = now + self._lifetime(app)
+        if session.modified or session.sid is None:
+            sid = secrets.token_urlsafe(16)
+            # Requests already in flight with the old cookie can still read it for a while
+            replaced_until = now + self.rotation_grace if self.rotation_grace > 0 else None
+            self.store.save(sid, dict(session), stored_until, replaces=session.sid, replaced_until=replaced_until)
+        else:
+            # Permanent session refreshed without changes: extend it in place
+            sid = session.sid
+            self.store.touch(sid, stored_until)
+
+        response.set_cookie(
+            name,
+            sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=httponly,
+            domain=domain,
+            path=path,
+            secure=secure,
+            samesite=samesite,
+        )
+        response.vary.add("Cookie")
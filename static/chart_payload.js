@@ -0,0 +1,16 @@
+// Decodes chart payloads built by charts.build_chart_payload.
+// Returns { labels, series: { name: [numbers] } } for either encoding.
+function decodeChartSeries(payload) {
+  const series = {};
+  for (const [name, values] of Object.entries(payload.series)) {
+    if (payload.encoding === 'float32') {
+      const bytes = Uint8Array.from(atob(values), c => c.charCodeAt(0));
+      const view = new DataView(bytes.buffer);
+      series[name] = Array.from({ length: bytes.length / 4 },
+        (_, i) => Math.round(view.getFloat32(i * 4, true) * 100) / 100);
+    } else {
+      series[name] = values;
+    }
+  }
+  return { labels: payload.labels, series: series };
+}
@@ -0,0 +1,28 @@
+"""
+Jinja setup for the Flask app: a persistent bytecode cache and number filters.
+
+The bytecode cache lives on disk, so a freshly started worker loads compiled
+templates instead of compiling them on its first requests. Jinja checks each
+entry against the template's source checksum, so edited templates are
+recompiled automatically.
+"""
+import os
+
+from jinja2 import FileSystemBytecodeCache
+
+
+def money(value):
+    """Format a dollar amount as 1,234.56 (templates add the $); None renders as an em dash."""
+    if value is None:
+        return "—"
+    return format(value, ",.2f")
+
+
+def configure_templates(app, cache_dir):
+    """
+    Install the bytecode cache and filters. Must run before anything touches
+    app.jinja_env, since Flask builds the environment from jinja_options once.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    app.jinja_options = {**app.jinja_options, "bytecode_cache": FileSystemBytecodeCache(cache_dir)}
+    app.add_template_filter(money)
@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    """The Flask app with its cache, session, metrics and template directories under a temporary path."""
+    directory = tmp_path_factory.mktemp("fedbenefits")
+    os.environ.update({
+        "FEDBENEFITS_CACHE_PATH": str(directory / "cache.sqlite3"),
+        "FEDBENEFITS_SESSION_PATH": str(directory / "sessions.sqlite3"),
+        "FEDBENEFITS_METRICS_DIR": str(directory / "metrics"),
+        "FEDBENEFITS_TEMPLATE_CACHE_DIR": str(directory / "jinja"),
+    })
+    from app_flask import app
+
+    app.config["TESTING"] = True
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,108 @@
+"""The ASGI adapter: request/response round-trips through the thread pool and the lifespan protocol."""
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def adapter(app):
+    from asgi import ASGIAdapter
+
+    adapter = ASGIAdapter(app, max_threads=2)
+    yield adapter
+    adapter.executor.shutdown(wait=True)
+
+
+def http_scope(method, path, query_string=b"", headers=()):
+    return {
+        "type": "http", "method": method, "path": path, "query_string": query_string, "http_version": "1.1",
+        "headers": list(headers), "server": ("testserver", 80), "client": ("127.0.0.1", 5000),
+    }
+
+
+def call(adapter, scope, body_chunks=(b"",)):
+    """Run one request through the adapter; returns (status, headers, body, number of body messages)."""
+    incoming = [{"type": "http.request", "body": chunk, "more_body": i < len(body_chunks) - 1}
+                for i, chunk in enumerate(body_chunks)]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(adapter(scope, receive, send))
+    start, *bodies = sent
+    assert start["type"] == "http.response.start"
+    assert bodies[-1]["more_body"] is False
+    return start["status"], dict(start["headers"]), b"".join(m["body"] for m in bodies), len(bodies)
+
+
+def test_get_round_trip_matches_the_wsgi_response(adapter, client):
+    status, headers, body, _ = call(adapter, http_scope("GET", "/"))
+    assert status == 200
+    assert headers[b"content-type"] == b"text/html; charset=utf-8"
+    assert body == client.get("/").data
+
+
+def test_post_body_arrives_in_chunks(adapter):
+    payload = json.dumps({"hourly_rate": 40, "leave_hours": 80}).encode()
+    scope = http_scope("POST", "/api/v1/lump-sum", headers=[
+        (b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode()),
+    ])
+    status, _, body, _ = call(adapter, scope, body_chunks=(payload[:10], payload[10:]))
+    assert status == 200
+    assert json.loads(body)["result"] == {"lump_sum": 3200.0}
+
+
+def test_streamed_export_is_sent_in_batches(adapter, client):
+    query = ("loan_type=residential&tsp_balance=150000&loan_amount=25000&loan_interest_rate=4.375"
+             "&expected_annual_growth=6.5&num_pay_periods=390&biweekly_contribution_no_loan=450"
+             "&biweekly_contribution_during_loan=300&format=ndjson")
+    status, _, body, messages = call(adapter, http_scope("GET", "/tsp-loan/export", query.encode()))
+    assert status == 200
+    assert body == client.get("/tsp-loan/export?" + query).data
+    assert messages > 2
+
+
+def test_unknown_page_redirects_home(adapter):
+    status, headers, _, _ = call(adapter, http_scope("GET", "/no-such-page"))
+    assert status == 302
+    assert headers[b"location"] == b"/"
+
+
+def test_lifespan_startup_and_shutdown(adapter):
+    sent = []
+    ticks = []
+    finished = threading.Event()
+
+    async def run():
+        messages = asyncio.Queue()
+        for message in ("lifespan.startup", "lifespan.shutdown"):
+            messages.put_nowait({"type": message})
+
+        async def send(message):
+            sent.append(message["type"])
+
+        async def tick():
+            while not finished.is_set():
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        # A request still running on the pool when shutdown arrives
+        adapter.executor.submit(lambda: (time.sleep(0.3), finished.set()))
+        ticker = asyncio.create_task(tick())
+        await adapter({"type": "lifespan"}, messages.get, send)
+        await ticker
+
+    asyncio.run(run())
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    # Shutdown waited for the request, and the loop kept running meanwhile
+    assert finished.is_set()
+    assert len(ticks) > 5
+    with pytest.raises(RuntimeError):
+        adapter.executor.submit(print)
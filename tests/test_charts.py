@@ -0,0 +1,76 @@
+"""LTTB downsampling and the Float32 chart payload."""
+import base64
+
+import numpy as np
+import pytest
+
+from charts import build_chart_payload, downsample, lttb_indices, pack_float32
+
+
+@pytest.fixture
+def walk():
+    rng = np.random.default_rng(5)
+    return np.arange(1000), np.cumsum(rng.normal(0, 1, 1000))
+
+
+@pytest.mark.parametrize("max_points", [3, 10, 120, 999])
+def test_lttb_keeps_the_ends_within_the_budget(walk, max_points):
+    x, y = walk
+    indices = lttb_indices(x, y, max_points)
+    assert len(indices) == max_points
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert np.all(np.diff(indices) > 0)
+
+
+def test_lttb_keeps_a_spike():
+    y = np.zeros(500)
+    y[237] = 100
+    assert 237 in lttb_indices(np.arange(500), y, 20)
+
+
+def test_lttb_rejects_a_budget_below_three(walk):
+    with pytest.raises(ValueError):
+        lttb_indices(*walk, 2)
+
+
+def test_short_series_come_back_unchanged():
+    labels = [1, 2, 3, 4]
+    series = {"a": [1.5, 2.5, 3.5, 4.5], "b": [0, 0, 1, 1]}
+    assert downsample(labels, series, 4) == (labels, series)
+    assert lttb_indices(labels, series["a"], 10).tolist() == [0, 1, 2, 3]
+    payload = build_chart_payload(range(1, 5), series, max_points=120)
+    assert payload == {"labels": labels, "series": series, "encoding": "json"}
+
+
+def test_union_keeps_series_aligned_within_the_budget(walk):
+    x, y = walk
+    series = {"up": y, "down": -y[::-1], "flat": np.ones(len(x))}
+    labels, sampled = downsample(x.tolist(), series, 60)
+    assert len(labels) <= 60
+    assert labels[0] == 0 and labels[-1] == 999
+    positions = np.asarray(labels)
+    for name, values in series.items():
+        assert len(sampled[name]) == len(labels)
+        assert sampled[name] == values[positions].tolist()
+
+
+
+def test_series_moving_together_keep_the_whole_budget(walk):
+    x, y = walk
+    labels, _ = downsample(x.tolist(), {"balance": y, "scaled": 2 * y + 5}, 60)
+    assert labels == lttb_indices(x, y, 60).tolist()
+
+
+def test_float32_payload_decodes_to_the_same_values():
+    values = [0.0, 1.5, -2.25, 123456.75, 1e-3, 7654321.0]
+    decoded = np.frombuffer(base64.b64decode(pack_float32(values)), dtype="<f4")
+    assert decoded.tolist() == np.asarray(values, dtype=np.float32).tolist()
+    assert decoded[:4].tolist() == values[:4]   # exactly representable
+    payload = build_chart_payload([1, 2, 3], {"a": [1.5, 2.5, 3.5]}, encoding="float32")
+    assert payload["encoding"] == "float32"
+    assert np.frombuffer(base64.b64decode(payload["series"]["a"]), dtype="<f4").tolist() == [1.5, 2.5, 3.5]
+
+
+def test_unknown_encoding_is_rejected():
+    with pytest.raises(ValueError):
+        build_chart_payload([1], {"a": [1]}, encoding="msgpack")
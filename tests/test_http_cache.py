@@ -0,0 +1,121 @@
+"""ETags, conditional GET, Cache-Control and compression from HTTPCache."""
+import gzip
+
+import pytest
+
+try:
+    import brotli
+except ImportError:  # optional, as in http_cache
+    brotli = None
+
+needs_brotli = pytest.mark.skipif(brotli is None, reason="brotli is not installed")
+
+LOAN_EXPORT = {
+    "loan_type": "general", "tsp_balance": 150000, "loan_amount": 25000, "loan_interest_rate": 4.375,
+    "expected_annual_growth": 6.5, "num_pay_periods": 104, "biweekly_contribution_no_loan": 450,
+    "biweekly_contribution_during_loan": 300, "format": "csv",
+}
+
+
+@pytest.fixture
+def http_cache(app):
+    return app.extensions["http_cache"]
+
+
+def etag_for(app, http_cache, path="/", **kwargs):
+    with app.test_request_context(path, **kwargs):
+        return http_cache.request_etag()
+
+
+def test_matching_if_none_match_is_answered_with_304(client):
+    first = client.get("/")
+    assert first.status_code == 200 and first.headers["ETag"]
+    second = client.get("/", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert client.get("/", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_compressed_etag_variant_also_matches(client):
+    etag = client.get("/", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+    assert etag.endswith('-gzip"')
+    assert client.get("/", headers={"If-None-Match": etag, "Accept-Encoding": "gzip"}).status_code == 304
+
+
+def test_etag_changes_with_session_cookie_args_and_body(app, http_cache):
+    cookie = app.config["SESSION_COOKIE_NAME"]
+    base = etag_for(app, http_cache)
+    assert etag_for(app, http_cache) == base
+    assert etag_for(app, http_cache, headers={"Cookie": f"{cookie}=abc"}) != base
+    assert etag_for(app, http_cache, headers={"Cookie": f"{cookie}=abc"}) != \
+        etag_for(app, http_cache, headers={"Cookie": f"{cookie}=def"})
+    assert etag_for(app, http_cache, query_string={"a": "1"}) != base
+    assert etag_for(app, http_cache, query_string={"a": "1"}) != etag_for(app, http_cache, query_string={"a": "2"})
+    posted = etag_for(app, http_cache, method="POST", data={"years": "5"})
+    assert posted != etag_for(app, http_cache, method="POST", data={"years": "6"})
+    assert etag_for(app, http_cache, method="POST", json={"a": 1}) != etag_for(app, http_cache, method="POST", json={"a": 2})
+
+
+def test_post_results_are_not_stored(client):
+    response = client.post("/api/v1/lump-sum", json={"hourly_rate": 40, "leave_hours": 80})
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-store"
+    # A POST is never answered from its ETag
+    again = client.post("/api/v1/lump-sum", json={"hourly_rate": 40, "leave_hours": 80},
+                        headers={"If-None-Match": response.headers["ETag"]})
+    assert again.status_code == 200
+
+
+def test_public_page_is_cacheable(client):
+    assert client.get("/").headers["Cache-Control"] == "public, max-age=300"
+
+
+def decompress(encoding, data):
+    return brotli.decompress(data) if encoding == "br" else gzip.decompress(data)
+
+
+@pytest.mark.parametrize("accept, encoding", [
+    ("gzip", "gzip"),
+    pytest.param("br", "br", marks=needs_brotli),
+    pytest.param("gzip, br", "br", marks=needs_brotli),
+    pytest.param("br;q=0.5, gzip", "gzip", marks=needs_brotli),
+])
+def test_negotiates_gzip_and_brotli(client, accept, encoding):
+    plain = client.get("/").data
+    response = client.get("/", headers={"Accept-Encoding": accept})
+    assert response.headers["Content-Encoding"] == encoding
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert decompress(encoding, response.data) == plain
+    assert len(response.data) < len(plain)
+
+
+def test_identity_when_no_encoding_is_accepted(client):
+    response = client.get("/")
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_small_body_passes_through_uncompressed(client):
+    response = client.post("/api/v1/lump-sum", json={"hourly_rate": 40, "leave_hours": 80},
+                           headers={"Accept-Encoding": "gzip, br"})
+    assert len(response.data) < 1024
+    assert "Content-Encoding" not in response.headers
+    assert response.get_json()["result"] == {"lump_sum": 3200.0}
+
+
+def test_streamed_export_passes_through_without_accept_encoding(client):
+    response = client.get("/tsp-loan/export", query_string=LOAN_EXPORT)
+    assert response.is_streamed
+    assert "Content-Encoding" not in response.headers
+    assert response.get_data(as_text=True).startswith("period,")
+
+
+@pytest.mark.parametrize("encoding", ["gzip", pytest.param("br", marks=needs_brotli)])
+def test_streamed_export_is_compressed_as_it_streams(client, encoding):
+    plain = client.get("/tsp-loan/export", query_string=LOAN_EXPORT).data
+    response = client.get("/tsp-loan/export", query_string=LOAN_EXPORT, headers={"Accept-Encoding": encoding})
+    assert response.is_streamed
+    assert response.headers["Content-Encoding"] == encoding
+    assert "Content-Length" not in response.headers
+    assert decompress(encoding, response.data) == plain
@@ -0,0 +1,120 @@
+"""project_annual_leave against the per-period calculate_annual_leave_accrual, and the leave route's projection."""
+import numpy as np
+import pytest
+
+from calculations import calculate_annual_leave_accrual, project_annual_leave
+
+FULL_TIME = "Full-time Employee"
+PART_TIME = "Part-time Employee"
+UNCOMMON = "Uncommon Tours of Duty"
+SES = "SES, Senior Level, Scientific/Professional Positions"
+
+
+def scalar_projection(employee_type, years, starting_balance, num_leave_years, usage, hours=None, avg=None):
+    """One employee, one pay period at a time, with calculate_annual_leave_accrual for each period's rate."""
+    ceiling = 720 if employee_type == SES else 240
+    balance = starting_balance
+    rows = []
+    for year in range(num_leave_years):
+        accrued = used = 0.0
+        for k in range(26):
+            service = years + (year * 26 + k) / 26
+            accrual = calculate_annual_leave_accrual(employee_type, service, 1, hours, avg)
+            # Full-time employees with 3-15 years earn 10 hours, not 6, in the leave year's last period
+            if employee_type == FULL_TIME and k == 25 and accrual == 6:
+                accrual = 10
+            available = balance + accrual
+            use = min(usage, available)
+            balance = available - use
+            accrued += accrual
+            used += use
+        forfeited = max(balance - ceiling, 0.0)
+        balance -= forfeited
+        rows.append((accrued, used, forfeited, balance))
+    return rows
+
+
+EMPLOYEES = [
+    (FULL_TIME, 1, 0, 3, 0, None, None),
+    (FULL_TIME, 2, 0, 2, 0, None, None),      # reaches 3 years mid-projection
+    (FULL_TIME, 5, 200, 2, 0, None, None),    # 10-hour final period, then the ceiling
+    (FULL_TIME, 14, 300, 2, 4, None, None),   # reaches 15 years, starts above the ceiling
+    (FULL_TIME, 20, 0, 1, 9, None, None),     # usage exceeds accrual
+    (PART_TIME, 4, 10, 2, 2, 64, None),
+    (UNCOMMON, 16, 235, 2, 1, None, 72),
+    (SES, 2, 700, 2, 0, None, None),
+]
+
+
+@pytest.mark.parametrize("employee", EMPLOYEES)
+def test_projection_matches_per_period_accrual(employee):
+    employee_type, years, starting, num_years, usage, hours, avg = employee
+    projection = project_annual_leave(employee_type, years, starting, num_years, usage, hours, avg)
+    expected = np.array(scalar_projection(*employee))
+    np.testing.assert_allclose(projection["accrued"][0], expected[:, 0])
+    np.testing.assert_allclose(projection["used"][0], expected[:, 1])
+    np.testing.assert_allclose(projection["forfeited"][0], expected[:, 2])
+    np.testing.assert_allclose(projection["year_end_balance"][0], expected[:, 3])
+    assert projection["ending_balance"][0] == pytest.approx(expected[-1, 3])
+
+
+def test_workforce_matches_each_employee():
+    columns = list(zip(*EMPLOYEES))
+    hours = [np.nan if h is None else h for h in columns[5]]
+    avg = [np.nan if a is None else a for a in columns[6]]
+    projection = project_annual_leave(columns[0], columns[1], columns[2], 2, columns[4], hours, avg)
+    for i, employee in enumerate(EMPLOYEES):
+        expected = np.array(scalar_projection(*employee[:3], 2, *employee[4:]))
+        np.testing.assert_allclose(projection["year_end_balance"][i], expected[:, 3])
+
+
+def test_final_period_earns_ten_hours_over_the_flat_rate():
+    # calculate_annual_leave_accrual's flat 6 hours x 26 misses the 4 extra hours of the last period
+    accrued = project_annual_leave(FULL_TIME, 5)["accrued"][0, 0]
+    assert accrued == calculate_annual_leave_accrual(FULL_TIME, 5, 26) + 4 == 160
+
+
+def test_ceiling_forfeits_the_excess_at_year_end():
+    projection = project_annual_leave([FULL_TIME, SES], 20, 600)
+    np.testing.assert_array_equal(projection["forfeited"][:, 0], [600 + 208 - 240, 600 + 208 - 720])
+    np.testing.assert_array_equal(projection["ending_balance"], [240, 720])
+
+
+def test_employee_types_alone_set_the_workforce_size():
+    projection = project_annual_leave([FULL_TIME, FULL_TIME], 5)
+    np.testing.assert_array_equal(projection["ending_balance"], [160, 160])
+    projection = project_annual_leave(PART_TIME, 5, hours_in_pay_status=[40, 60, 80])
+    np.testing.assert_allclose(projection["accrued"][:, 0], [80, 120, 160])
+
+
+def test_mismatched_lengths_are_rejected():
+    with pytest.raises(ValueError):
+        project_annual_leave([FULL_TIME, FULL_TIME], [1, 2, 3])
+
+
+FORM = {"employee_type": FULL_TIME, "years": "5", "pay_periods": "26"}
+
+
+def test_form_without_leave_years_shows_only_the_flat_estimate(client):
+    page = client.post("/leave_accrual", data=FORM).get_data(as_text=True)
+    assert "156 hours" in page
+    assert "Leave Balance Projection" not in page
+
+
+def test_form_with_leave_years_shows_the_projection(client):
+    data = dict(FORM, starting_balance="200", leave_years="2", planned_usage="")
+    page = client.post("/leave_accrual", data=data).get_data(as_text=True)
+    assert "Leave Balance Projection" in page
+    assert "120.0</td>" in page   # forfeited in year 1: 200 + 160 - 240
+    assert "Please enter between" in client.post(
+        "/leave_accrual", data=dict(data, leave_years="41")
+    ).get_data(as_text=True)
+
+
+def test_api_projects_a_workforce(client):
+    response = client.post("/api/v1/leave-projection", json={
+        "employee_type": [FULL_TIME, SES], "years": 5, "starting_balance": [200, 700], "leave_years": 2,
+    })
+    result = response.get_json()["result"]
+    assert result["forfeited"] == [[120.0, 160.0], [188.0, 208.0]]
+    assert result["ending_balance"] == [240.0, 720.0]
@@ -0,0 +1,124 @@
+"""Calculation timing, the Prometheus exposition and merging per-process snapshots."""
+import inspect
+import json
+import os
+import subprocess
+import sys
+import types
+
+from flask import Flask, g
+
+import calculations
+from metrics import MetricsRegistry, RequestTimer, instrument_module
+
+
+def test_every_public_calculator_is_timed():
+    public = [name for name, value in vars(calculations).items()
+              if inspect.isfunction(value) and value.__module__ == "calculations" and not name.startswith("_")]
+    assert "calculate_tsp_loan_batch" in public and "calculate_scd_batch" in public
+    for name in public:
+        assert getattr(getattr(calculations, name), "timed", False) == (name != "parse_tsp_loan_inputs"), name
+
+
+def test_calculators_outside_the_app_routes_are_recorded():
+    registry = RequestTimer().registry
+    key = ("fedbenefits_calculation_duration_seconds", (("function", "calculate_scd_batch"),))
+    before = sum(registry.histograms.get(key, [[0]])[0])
+    calculations.calculate_scd_batch([("2020-01-01", [("2010-01-01", "2010-12-31")])])
+    assert sum(registry.histograms[key][0]) == before + 1
+
+
+def test_nested_calls_count_once_toward_calc_time():
+    module = types.ModuleType("fake_calculations")
+    exec(
+        "import time\n"
+        "def inner():\n    time.sleep(0.02)\n"
+        "def outer():\n    time.sleep(0.01)\n    return inner()\n"
+        "def _private():\n    pass\n",
+        module.__dict__,
+    )
+    registry = MetricsRegistry()
+    instrument_module(module, registry=registry)
+    instrument_module(module, registry=registry)   # wrapping twice is a no-op
+    assert module.outer.__wrapped__.__name__ == "outer" and not hasattr(module.outer.__wrapped__, "__wrapped__")
+    assert not hasattr(module._private, "timed")
+
+    with Flask(__name__).app_context():
+        module.outer()
+        outer_total = registry.histograms[("fedbenefits_calculation_duration_seconds", (("function", "outer"),))][1]
+        inner_total = registry.histograms[("fedbenefits_calculation_duration_seconds", (("function", "inner"),))][1]
+        assert g.calc_time == outer_total
+        assert 0.02 <= inner_total < outer_total
+
+
+def test_prometheus_exposition_format():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.inc("fedbenefits_requests_total", (("route", "/a\"b"), ("status", "200")), 3)
+    registry.observe("fedbenefits_template_render_seconds", (("template", "x.html"),), 0.05)
+    registry.observe("fedbenefits_template_render_seconds", (("template", "x.html"),), 0.5)
+    registry.observe("fedbenefits_template_render_seconds", (("template", "x.html"),), 5.0)
+    counters, histograms = MetricsRegistry.merge([registry.snapshot()])
+    text = registry.render(counters, histograms, [("fedbenefits_cache_entries", "gauge", "Cached results.", 7)])
+    assert text == (
+        "# HELP fedbenefits_requests_total Requests by route, method and status.\n"
+        "# TYPE fedbenefits_requests_total counter\n"
+        'fedbenefits_requests_total{route="/a\\"b",status="200"} 3\n'
+        "# HELP fedbenefits_template_render_seconds Template render time by template.\n"
+        "# TYPE fedbenefits_template_render_seconds histogram\n"
+        'fedbenefits_template_render_seconds_bucket{template="x.html",le="0.1"} 1\n'
+        'fedbenefits_template_render_seconds_bucket{template="x.html",le="1.0"} 2\n'
+        'fedbenefits_template_render_seconds_bucket{template="x.html",le="+Inf"} 3\n'
+        'fedbenefits_template_render_seconds_sum{template="x.html"} 5.55\n'
+        'fedbenefits_template_render_seconds_count{template="x.html"} 3\n'
+        "# HELP fedbenefits_cache_entries Cached results.\n"
+        "# TYPE fedbenefits_cache_entries gauge\n"
+        "fedbenefits_cache_entries 7\n"
+    )
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_snapshots_of_live_workers_are_merged(tmp_path):
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    timer = RequestTimer(directory=str(tmp_path), registry=registry)
+    labels = (("function", "calculate_tsp_loan"),)
+    registry.inc("fedbenefits_requests_total", (("route", "/"),), 2)
+    registry.observe("fedbenefits_calculation_duration_seconds", labels, 0.05)
+
+    # Another live worker (this process's parent) and one that has exited
+    other = {
+        "counters": [["fedbenefits_requests_total", [["route", "/"]], 5]],
+        "histograms": [["fedbenefits_calculation_duration_seconds", [list(labels[0])], [0, 1, 1], 2.5]],
+    }
+    (tmp_path / f"{os.getppid()}.json").write_text(json.dumps(other))
+    gone = tmp_path / f"{dead_pid()}.json"
+    gone.write_text(json.dumps(other))
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    text = timer.prometheus()
+    assert 'fedbenefits_requests_total{route="/"} 7\n' in text
+    assert 'fedbenefits_calculation_duration_seconds_bucket{function="calculate_tsp_loan",le="0.1"} 1\n' in text
+    assert 'fedbenefits_calculation_duration_seconds_bucket{function="calculate_tsp_loan",le="+Inf"} 3\n' in text
+    assert 'fedbenefits_calculation_duration_seconds_sum{function="calculate_tsp_loan"} 2.55\n' in text
+    assert not gone.exists()
+    assert (tmp_path / f"{os.getpid()}.json").exists()
+
+
+def test_merge_sums_counters_and_buckets():
+    a = {"counters": [["c", [["k", "v"]], 1]], "histograms": [["h", [], [1, 0], 0.5]]}
+    b = {"counters": [["c", [["k", "v"]], 2], ["c", [["k", "w"]], 4]], "histograms": [["h", [], [0, 3], 6.0]]}
+    counters, histograms = MetricsRegistry.merge([a, b])
+    assert counters == {("c", (("k", "v"),)): 3, ("c", (("k", "w"),)): 4}
+    assert histograms == {("h", ()): [[1, 3], 6.5]}
+
+
+def test_request_phases_reach_server_timing(client):
+    response = client.post("/api/v1/scd", json={"current_start": "2020-01-01", "prior_periods": [["2010-01-01", "2011-01-01"]]})
+    phases = dict(part.split(";dur=") for part in response.headers["Server-Timing"].split(", "))
+    assert set(phases) == {"parse", "calc", "render", "total"}
+    assert float(phases["calc"]) > 0
+    assert 'fedbenefits_calculation_duration_seconds_count{function="calculate_scd"}' in client.get("/metrics").get_data(as_text=True)
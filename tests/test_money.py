@@ -0,0 +1,197 @@
+"""
+Integer-cents arithmetic (money.py) and the calculators built on it,
+checked against the float implementations they replaced.
+
+Every figure must equal the exact value rounded half a cent up, and may
+differ from the float version only where the exact value is a half-cent
+tie, which float error used to round either way.
+"""
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from calculations import (
+    calculate_drp_comparison,
+    calculate_lump_sum_payment,
+    calculate_severance_pay,
+    calculate_severance_pay_bulk,
+    calculate_tsp_frontload,
+    calculate_tsp_frontload_batch,
+    _severance_multipliers,
+)
+from money import (
+    div_round, div_round_array, ratio, round_cents, round_cents_array, scale_cents, to_cents, to_cents_array
+)
+from tests.reference import (
+    exact_lump_sum,
+    exact_severance,
+    float_drp,
+    float_frontload,
+    float_lump_sum,
+    float_severance,
+    half_up_cents,
+    is_half_cent,
+)
+
+CASES = 3000
+FRONTLOAD_OUTPUTS = (
+    "front_load_periods", "one_off_amount", "match_only_periods",
+    "front_ending_balance", "even_ending_balance", "advantage",
+)
+SEVERANCE_OUTPUTS = (
+    "total_severance", "total_severance_before_age_factor", "age_adjustment",
+    "biweekly_severance", "weeks_of_severance",
+)
+
+
+@pytest.fixture(scope="module")
+def rng():
+    return np.random.default_rng(2024)
+
+
+def lump_sum_cases(rng):
+    return list(zip(rng.uniform(15, 95, CASES).round(2).tolist(), (rng.integers(0, 960, CASES) / 4).tolist()))
+
+
+def severance_cases(rng):
+    return list(zip(
+        rng.uniform(30000, 190000, CASES).round(2).tolist(), rng.integers(0, 45, CASES).tolist(),
+        rng.integers(0, 12, CASES).tolist(), rng.integers(22, 75, CASES).tolist(), rng.integers(0, 12, CASES).tolist()
+    ))
+
+
+def frontload_cases(rng):
+    cases = []
+    for salary, pct, growth in zip(rng.uniform(30000, 190000, 500).round(2).tolist(),
+                                   rng.choice([1, 3, 4, 5], 500).tolist(),
+                                   rng.uniform(-5, 12, 500).round(2).tolist()):
+        base = round(salary * pct / 100 / 26, 2)
+        target = round(base * 26 + float(rng.uniform(0, max(1, 23500 - base * 26))), 2)
+        cases.append((salary, target, round(base + float(rng.uniform(0, 3000)), 2), pct, growth, bool(rng.integers(2))))
+    return cases
+
+
+def assert_ties_only(float_values, cents_values, exact_values):
+    for old, new, exact in zip(float_values, cents_values, exact_values):
+        assert new == half_up_cents(exact)
+        if old != new:
+            assert is_half_cent(exact), (old, new, exact)
+
+
+@pytest.mark.parametrize("dollars", [0.0, 0.005, 0.015, 1.005, 2.675, 1234.565, 99999.995, -0.005, -2.675, 1e-9])
+def test_to_cents_agrees_with_round(dollars):
+    assert to_cents(dollars) == round(round(dollars, 2) * 100)
+
+
+def test_to_cents_random_agrees_with_round(rng):
+    for dollars in rng.uniform(-1e6, 1e6, 20000).tolist() + (rng.integers(0, 10**8, 20000) / 1000).tolist():
+        assert to_cents(dollars) == round(round(dollars, 2) * 100)
+
+
+def test_ratio_reads_floats_as_typed():
+    assert Fraction(*ratio(31.5)) == Fraction(63, 2)
+    assert Fraction(*ratio(4.375)) == Fraction(35, 8)
+    assert ratio(0.1) == (1, 10)
+    assert ratio(7) == (7, 1)
+    assert Fraction(*ratio(1 / 3)) == Fraction(1 / 3)
+
+
+@pytest.mark.parametrize("numerator, denominator, expected", [
+    (5, 2, 3), (7, 2, 4), (-5, 2, -3), (4, 3, 1), (5, 3, 2), (0, 7, 0), (-4, 3, -1),
+])
+def test_div_round_half_away_from_zero(numerator, denominator, expected):
+    assert div_round(numerator, denominator) == expected
+    assert div_round_array(np.array([numerator]), denominator).tolist() == [expected]
+
+
+def test_scale_cents_rounds_once():
+    # $10.25 x 0.5 hours is exactly $5.125
+    assert scale_cents(1025, 0.5) == 513
+    assert scale_cents(1025, 0.5, 2) == 256
+
+
+def test_lump_sum_half_cent_tie():
+    # 45.79 x 121.5 = 5563.485 exactly; the float product rounded down
+    assert float_lump_sum(45.79, 121.5) == 5563.48
+    assert calculate_lump_sum_payment(45.79, 121.5) == 5563.49
+
+
+def test_severance_half_cent_tie():
+    # 11.025 weeks exactly; the float ratio rounded down
+    case = (122853.18, 2, 11, 61, 6)
+    assert float_severance(*case)[4] == 11.02
+    assert calculate_severance_pay(*case)[4] == 11.03
+    assert float_severance(*case)[:4] == calculate_severance_pay(*case)[:4]
+
+
+def test_lump_sum_matches_float_except_ties(rng):
+    for case in lump_sum_cases(rng):
+        assert_ties_only([float_lump_sum(*case)], [calculate_lump_sum_payment(*case)], exact_lump_sum(*case))
+
+
+def test_severance_matches_float_except_ties(rng):
+    for case in severance_cases(rng):
+        assert_ties_only(float_severance(*case), calculate_severance_pay(*case), exact_severance(*case))
+
+
+def test_severance_weeks_capped_at_int_52():
+    assert calculate_severance_pay(150000.0, 40, 0, 70, 0)[4] == 52
+    assert isinstance(calculate_severance_pay(150000.0, 40, 0, 70, 0)[4], int)
+
+
+def test_severance_bulk_matches_scalar(rng):
+    cases = severance_cases(rng)
+    bulk = calculate_severance_pay_bulk(*map(np.array, zip(*cases)))
+    scalar = np.array([calculate_severance_pay(*case) for case in cases])
+    for position, key in enumerate(SEVERANCE_OUTPUTS):
+        assert np.array_equal(bulk[key], scalar[:, position]), key
+
+
+def test_severance_bulk_table_is_integer_and_grows_past_its_default_size():
+    tables = _severance_multipliers(60, 3, 240)
+    assert all(table.dtype == np.int64 for table in tables)
+    # 70 years of service at age 100 needs a larger table than the default one
+    bulk = calculate_severance_pay_bulk([98765.43, 45000.0], [70, 0], [11, 0], [100, 25], [11, 0])
+    for row, case in enumerate([(98765.43, 70, 11, 100, 11), (45000.0, 0, 0, 25, 0)]):
+        assert [bulk[key][row] for key in SEVERANCE_OUTPUTS] == list(calculate_severance_pay(*case))
+
+
+def test_drp_matches_float(rng):
+    cases = zip(rng.uniform(1000, 8000, CASES).round(2).tolist(), rng.uniform(0, 150000, CASES).round(2).tolist(),
+                rng.integers(0, 26, CASES).tolist(), rng.integers(0, 26, CASES).tolist())
+    for case in cases:
+        assert calculate_drp_comparison(*case) == float_drp(*case)
+
+
+def test_drp_equal_when_totals_match():
+    assert calculate_drp_comparison(0.1, 0.2, 3, 1)["better"] == "Equal"
+
+
+def test_frontload_matches_float(rng):
+    for case in frontload_cases(rng):
+        assert calculate_tsp_frontload(*case) == float_frontload(*case)
+
+
+def test_frontload_batch_matches_scalar(rng):
+    cases = frontload_cases(rng)
+    batch = calculate_tsp_frontload_batch(*map(np.array, zip(*cases)))
+    for position, case in enumerate(cases):
+        result = calculate_tsp_frontload(*case)[0]
+        for key in FRONTLOAD_OUTPUTS:
+            assert batch[key][position] == result[key], (case, key)
+
+
+def test_cents_arrays_agree_with_round(rng):
+    dollars = np.concatenate([rng.uniform(-1e6, 1e6, 20000), rng.integers(-10**6, 10**6, 20000) / 100 + 0.005,
+                              [0.005, 1.005, 2.675, -2.675]])
+    expected = [round(value, 2) for value in dollars.tolist()]
+    assert (to_cents_array(dollars) / 100).tolist() == expected
+    assert round_cents_array(dollars).tolist() == expected
+    assert [round_cents(value) for value in dollars[:1000].tolist()] == expected[:1000]
+
+
+def test_round_cents_array_keeps_nan():
+    rounded = round_cents_array([[1.005, np.nan], [np.inf, 2.675]])
+    assert rounded[0, 0] == 1.0 and rounded[1, 1] == 2.67
+    assert np.isnan(rounded[0, 1]) and rounded[1, 0] == np.inf
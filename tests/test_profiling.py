@@ -0,0 +1,41 @@
+"""RequestProfiler under overlapping profiled requests."""
+import sys
+import threading
+import time
+
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+from profiling import RequestProfiler
+
+
+def test_overlapping_profiles_keep_the_switch_interval_and_unique_names(tmp_path):
+    running = []
+    overlaps = []
+
+    def app(environ, start_response):
+        running.append(1)
+        overlaps.append(len(running))
+        time.sleep(0.02)
+        running.pop()
+        return Response("ok")(environ, start_response)
+
+    profiler = RequestProfiler(app, "secret", str(tmp_path))
+    interval = sys.getswitchinterval()
+    names = []
+
+    def request():
+        # Same route and body, so only the sequence tells the profiles apart
+        response = Client(profiler).get("/tsp-loan", headers={"X-Profile": "secret"})
+        names.append(response.headers["X-Profile-Id"])
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(overlaps) == 1
+    assert sys.getswitchinterval() == interval
+    assert len(set(names)) == 4
+    assert len(list(tmp_path.glob("*.prof"))) == 4
@@ -0,0 +1,116 @@
+"""ResultCache storage, keys and counters."""
+import importlib
+import os
+import sqlite3
+import stat
+import sys
+
+import pytest
+
+from calculations import calculate_tsp_frontload, calculate_tsp_loan
+from result_cache import ResultCache, canonical_key, code_version, default_cache_path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(str(tmp_path / "cache.sqlite3"))
+
+
+def test_values_are_stored_as_json(cache):
+    cache.set("key", {"a": (1, 2.5), "b": range(3)})
+    stored = sqlite3.connect(cache.path).execute("SELECT value FROM results").fetchone()[0]
+    assert stored == '{"a":[1,2.5],"b":[0,1,2]}'
+    assert cache.get("key") == (True, {"a": [1, 2.5], "b": [0, 1, 2]})
+
+
+def test_cached_loan_result_matches_the_computed_one(cache):
+    loan = cache.memoize(calculate_tsp_loan)
+    args = ("general", 50000, 10000, 4, 6, 60, 300, 200)
+    computed = loan(*args)
+    cached = loan(*args)
+    assert cache.stats()["hits"] == 1
+    assert cached["payperiod_data"] == list(computed["payperiod_data"])
+    assert cached["yearly_data"]["with_loan"] == list(computed["yearly_data"]["with_loan"])
+    assert cached["delta"] == computed["delta"]
+
+
+def test_miss_returns_the_same_json_types_as_a_hit(cache):
+    loan = cache.memoize(calculate_tsp_loan)
+    args = ("general", 50000, 10000, 4, 6, 60, 300, 200)
+    computed = loan(*args)
+    assert isinstance(computed["payperiod_data"], list)
+    assert isinstance(computed["yearly_data"]["labels"], list)
+    assert loan(*args) == computed
+    frontload = cache.memoize(calculate_tsp_frontload)
+    assert frontload(100000, 23500, 2000, 5, 6) == frontload(100000, 23500, 2000, 5, 6)
+    assert isinstance(frontload(100000, 23500, 2000, 5, 6), list)
+
+
+def test_cached_tuple_result_still_unpacks(cache):
+    frontload = cache.memoize(calculate_tsp_frontload)
+    frontload(100000, 23500, 2000, 5, 6)
+    result, *_ = frontload(100000, 23500, 2000, 5, 6)
+    assert result == calculate_tsp_frontload(100000, 23500, 2000, 5, 6)[0]
+
+
+def test_pickled_cache_file_is_dropped(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE results (key TEXT PRIMARY KEY, value BLOB NOT NULL, created REAL NOT NULL)")
+    conn.execute("INSERT INTO results VALUES ('key', x'80049500', 1e12)")
+    conn.commit()
+    assert ResultCache(path).get("key") == (False, None)
+
+
+def test_key_carries_the_calculator_source_version():
+    key = canonical_key(calculate_tsp_loan, ("general", 1, 2, 3, 4, 5, 6, 7), {})
+    assert key.startswith(f"calculations.calculate_tsp_loan@{code_version('calculations')}:")
+    assert len(code_version("calculations")) == 12
+
+
+def test_version_covers_local_modules_imported_from(tmp_path, monkeypatch):
+    (tmp_path / "calc_dep.py").write_text("def rate():\n    return 1\n")
+    (tmp_path / "calc_main.py").write_text("import json\nfrom calc_dep import rate\n\ndef f():\n    return rate()\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    importlib.import_module("calc_main")
+    try:
+        before = code_version("calc_main")
+        (tmp_path / "calc_dep.py").write_text("def rate():\n    return 2\n")
+        code_version.cache_clear()
+        assert code_version("calc_main") != before
+    finally:
+        code_version.cache_clear()
+        sys.modules.pop("calc_main")
+        sys.modules.pop("calc_dep")
+
+
+def test_calculations_version_includes_money():
+    from result_cache import _source_files
+    assert [os.path.basename(path) for path in _source_files("calculations")] == ["calculations.py", "money.py"]
+
+
+def test_lookups_do_not_write(cache):
+    cache.set("key", 1)
+    cache.get("key")
+    conn = cache._connect()
+    before = conn.total_changes
+    for _ in range(10):
+        cache.get("key")
+        cache.get("missing")
+    assert conn.total_changes == before
+    assert cache.stats()["hits"] == 11
+    assert cache.stats()["misses"] == 10
+
+
+def test_counts_flush_after_the_interval(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResultCache(path, flush_interval=0)
+    cache.get("missing")
+    assert ResultCache(path).stats()["misses"] == 1
+
+
+def test_default_path_is_private(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    path = default_cache_path()
+    assert os.path.dirname(path) == str(tmp_path / "fedbenefits")
+    assert stat.S_IMODE(os.stat(os.path.dirname(path)).st_mode) == 0o700
@@ -0,0 +1,66 @@
+"""process_roster: the shared pool, unreadable input and per-row validation."""
+import io
+
+import pytest
+
+import roster
+from roster import process_roster
+
+HEADER = "employee_id,current_start,prior_periods,hourly_rate,leave_balance_hours\n"
+
+
+def roster_lines(rows, tail=b""):
+    data = (HEADER + "".join(f"e{i},2015-03-02,,40,{i}\n" for i in range(1, rows + 1))).encode() + tail
+    return io.TextIOWrapper(io.BytesIO(data), encoding="utf-8", newline="")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_undecodable_bytes_end_with_an_error_row(workers):
+    # Well past the first block TextIOWrapper decodes, so the header and early rows read fine
+    lines = roster_lines(2000, b"e2001,2015-03-02,,40,\xff\xfe\n")
+    results = list(process_roster(lines, chunk_size=100, workers=workers))
+    *read, error = results
+    assert len(read) > 1000
+    assert [r["employee_id"] for r in read] == [f"e{i}" for i in range(1, len(read) + 1)]
+    assert all(not r["error"] for r in read)
+    assert error["row"] == len(read) + 1
+    assert "could not read the roster" in error["error"]
+
+
+def test_undecodable_header_is_rejected():
+    with pytest.raises(ValueError, match="could not be read"):
+        process_roster(roster_lines(0, b"e1,\xff\n"), workers=1)
+
+
+@pytest.mark.parametrize("prior", ["2010-01-04", "2010-01-04:2012-01-01:2013-01-01", ":2012-01-01"])
+def test_malformed_prior_period_is_reported(prior):
+    lines = io.StringIO(HEADER + f"e1,2015-03-02,{prior},,\n")
+    [result] = process_roster(lines, workers=1)
+    assert result["error"] == f"scd: prior period {prior!r} is not start:end, e.g. 2010-01-04:2014-06-30"
+
+
+def test_uploads_share_one_pool():
+    first = list(process_roster(roster_lines(3), chunk_size=1, workers=2))
+    pool = roster._pool
+    second = list(process_roster(roster_lines(3), chunk_size=1, workers=2))
+    assert roster._pool is pool
+    assert first == second
+    assert [r["lump_sum"] for r in first] == [40.0, 80.0, 120.0]
+
+
+@pytest.mark.parametrize("cores, expected", [(6, 6), (None, 1)])
+def test_default_pool_uses_every_core(monkeypatch, cores, expected):
+    used = []
+    monkeypatch.setattr(roster.os, "cpu_count", lambda: cores)
+    monkeypatch.setattr(roster, "_process_in_pool", lambda chunks, workers, max_pending: used.append(workers) or iter(()))
+    monkeypatch.setattr(roster, "_process_inline", lambda chunks: used.append(1) or iter(()))
+    list(process_roster(roster_lines(3)))
+    assert used == [expected]
+
+
+def test_workers_argument_overrides_the_default(monkeypatch):
+    used = []
+    monkeypatch.setattr(roster.os, "cpu_count", lambda: 16)
+    monkeypatch.setattr(roster, "_process_in_pool", lambda chunks, workers, max_pending: used.append(workers) or iter(()))
+    list(process_roster(roster_lines(3), workers=4))
+    assert used == [4]
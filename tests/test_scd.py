@@ -0,0 +1,75 @@
+"""calculate_scd_batch's merging of prior service periods, against the per-period calculate_scd."""
+from datetime import date
+
+import pytest
+
+from calculations import _merge_service_periods, calculate_scd, calculate_scd_batch
+
+
+def merged(*periods):
+    return [(start.isoformat(), end.isoformat()) for start, end in _merge_service_periods(
+        (date.fromisoformat(start), date.fromisoformat(end)) for start, end in periods
+    )]
+
+
+def test_overlapping_periods_are_merged():
+    assert merged(("2010-01-01", "2010-06-30"), ("2010-03-01", "2010-12-31")) == [("2010-01-01", "2010-12-31")]
+
+
+def test_adjacent_periods_are_merged():
+    assert merged(("2010-01-01", "2010-06-30"), ("2010-07-01", "2010-12-31")) == [("2010-01-01", "2010-12-31")]
+    # A one-day gap keeps them apart
+    assert merged(("2010-01-01", "2010-06-30"), ("2010-07-02", "2010-12-31")) == [
+        ("2010-01-01", "2010-06-30"), ("2010-07-02", "2010-12-31"),
+    ]
+
+
+def test_nested_period_is_absorbed():
+    assert merged(("2010-01-01", "2012-12-31"), ("2011-03-01", "2011-04-30")) == [("2010-01-01", "2012-12-31")]
+
+
+def test_unsorted_periods_are_sorted_first():
+    assert merged(("2015-01-01", "2015-12-31"), ("2010-01-01", "2010-12-31")) == [
+        ("2010-01-01", "2010-12-31"), ("2015-01-01", "2015-12-31"),
+    ]
+
+
+def test_reversed_period_is_dropped():
+    assert merged(("2010-12-31", "2010-01-01"), ("2012-01-01", "2012-01-31")) == [("2012-01-01", "2012-01-31")]
+    assert calculate_scd_batch([("2020-01-01", [("2010-12-31", "2010-01-01")])]) == [(date(2020, 1, 1), 0, [])]
+
+
+def test_empty_history_keeps_the_current_start():
+    assert calculate_scd_batch([("2020-01-01", [])]) == [(date(2020, 1, 1), 0, [])]
+    assert calculate_scd_batch([]) == []
+
+
+def test_disjoint_periods_match_calculate_scd():
+    periods = [("2005-02-01", "2007-08-15"), ("2009-01-05", "2011-11-30")]
+    scd, total_days, breakdown = calculate_scd_batch([("2015-06-01", periods)])[0]
+    assert (scd, total_days) == calculate_scd("2015-06-01", periods)[:2]
+    assert breakdown == [("2005-02-01", "2007-08-15", 926), ("2009-01-05", "2011-11-30", 1060)]
+
+
+def test_overlap_is_credited_once_unlike_calculate_scd():
+    periods = [("2010-01-01", "2010-01-10"), ("2010-01-06", "2010-01-20")]
+    assert calculate_scd_batch([("2020-01-01", periods)])[0][:2] == (date(2019, 12, 12), 20)
+    # calculate_scd (the /scd page) counts the five shared days twice
+    assert calculate_scd("2020-01-01", periods)[:2] == (date(2019, 12, 7), 25)
+
+
+def test_batch_handles_each_employee_separately():
+    histories = [
+        ("2020-01-01", [("2010-01-01", "2010-01-10")]),
+        ("2021-06-01", [("2011-01-01", "2011-01-31"), ("2011-01-15", "2011-02-01")]),
+    ]
+    assert [result[:2] for result in calculate_scd_batch(histories)] == [
+        (date(2019, 12, 22), 10), (date(2021, 4, 30), 32),
+    ]
+
+
+def test_malformed_date_raises():
+    with pytest.raises(ValueError):
+        calculate_scd_batch([("2020-01-01", [("2010-01-01", "2010-01-10")]), ("2020-13-01", [])])
+    with pytest.raises(ValueError):
+        calculate_scd_batch([("2020-01-01", [("2010-01-01", "not a date")])])
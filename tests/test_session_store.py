@@ -0,0 +1,119 @@
+"""Server-side sessions: both stores, id rotation with its grace period, and expiry sweeping."""
+import time
+
+import pytest
+from flask import Flask, session
+
+from session_store import MemorySessionStore, ServerSideSessionInterface, SQLiteSessionStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionStore(sweep_interval=0)
+    return SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), sweep_interval=0)
+
+
+def test_store_round_trip(store):
+    store.save("a", {"inputs": {"years": 5}, "when": (1, 2)}, time.time() + 60)
+    assert store.load("a") == {"inputs": {"years": 5}, "when": (1, 2)}
+    assert store.load("missing") is None
+    store.delete("a")
+    assert store.load("a") is None
+
+
+def test_expired_sessions_are_unreadable_and_swept(store):
+    store.sweep_interval = 3600
+    store.save("live", {"a": 1}, time.time() + 60)
+    store.save("old", {"a": 1}, time.time() - 1)
+    assert store.load("old") is None
+    assert len(store) == 2   # not swept until the interval has passed
+    store.sweep_interval = 0
+    store.save("new", {"b": 2}, time.time() + 60)
+    assert len(store) == 2
+    assert store.load("live") == {"a": 1}
+    assert store.load("new") == {"b": 2}
+
+
+def test_touch_extends_a_session(store):
+    store.save("a", {"a": 1}, time.time() + 1)
+    store.touch("a", time.time() + 3600)
+    store.save("b", {"b": 2}, time.time() + 60)
+    assert store.load("a") == {"a": 1}
+
+
+def test_replaced_session_is_dropped_without_a_grace_period(store):
+    store.save("old", {"a": 1}, time.time() + 60)
+    store.save("new", {"a": 2}, time.time() + 60, replaces="old")
+    assert store.load("old") is None
+    assert store.load("new") == {"a": 2}
+
+
+def test_replaced_session_stays_readable_until_its_grace_ends(store):
+    store.save("old", {"a": 1}, time.time() + 60)
+    store.save("new", {"a": 2}, time.time() + 60, replaces="old", replaced_until=time.time() + 30)
+    assert store.load("old") == {"a": 1}
+    store.save("newer", {"a": 3}, time.time() + 60, replaces="new", replaced_until=time.time() - 1)
+    assert store.load("new") is None
+    assert store.load("newer") == {"a": 3}
+
+
+def make_app(store, rotation_grace):
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.session_interface = ServerSideSessionInterface(store, rotation_grace=rotation_grace)
+
+    @app.route("/set/<value>")
+    def set_value(value):
+        session["value"] = value
+        return "ok"
+
+    @app.route("/get")
+    def get_value():
+        return session.get("value", "")
+
+    @app.route("/clear")
+    def clear():
+        session.clear()
+        return "ok"
+
+    return app
+
+
+def sid_of(response):
+    cookie = response.headers.get("Set-Cookie", "")
+    return cookie.split(";", 1)[0].split("=", 1)[1] if cookie else None
+
+
+def test_modification_rotates_the_sid(store):
+    client = make_app(store, rotation_grace=0).test_client(use_cookies=False)
+    first = sid_of(client.get("/set/a"))
+    second = sid_of(client.get("/set/b", headers={"Cookie": f"session={first}"}))
+    assert first and second and first != second
+    # The old id is gone at once without a grace period
+    assert client.get("/get", headers={"Cookie": f"session={first}"}).data == b""
+    assert client.get("/get", headers={"Cookie": f"session={second}"}).data == b"b"
+    # A read does not rotate
+    assert sid_of(client.get("/get", headers={"Cookie": f"session={second}"})) is None
+    assert store.load(first) is None
+
+
+def test_concurrent_request_with_the_old_sid_keeps_its_session(store):
+    client = make_app(store, rotation_grace=60).test_client(use_cookies=False)
+    first = sid_of(client.get("/set/a"))
+    # One request changes the session while another, sent with the same cookie, is still in flight
+    second = sid_of(client.get("/set/b", headers={"Cookie": f"session={first}"}))
+    assert client.get("/get", headers={"Cookie": f"session={first}"}).data == b"a"
+    assert client.get("/get", headers={"Cookie": f"session={second}"}).data == b"b"
+    # The old id expires with its grace period, not with the session's lifetime
+    assert store.load(first) is not None
+    store.save("x", {}, time.time() + 60, replaces=first, replaced_until=time.time() - 1)
+    assert store.load(first) is None
+
+
+def test_cleared_session_is_deleted_with_its_cookie(store):
+    client = make_app(store, rotation_grace=60).test_client(use_cookies=False)
+    sid = sid_of(client.get("/set/a"))
+    response = client.get("/clear", headers={"Cookie": f"session={sid}"})
+    assert "session=;" in response.headers["Set-Cookie"]
+    assert store.load(sid) is None
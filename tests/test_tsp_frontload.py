@@ -0,0 +1,104 @@
+"""optimize_tsp_frontload and the /tsp-frontload route's optimizing mode."""
+import numpy as np
+import pytest
+
+from calculations import calculate_tsp_frontload, optimize_tsp_frontload
+
+PLAN_FIELDS = (
+    "front_load_periods", "one_off_amount", "match_only_periods",
+    "front_ending_balance", "even_ending_balance", "advantage",
+)
+
+
+@pytest.mark.parametrize("salary, match, growth, limit", [
+    (100000, 5, 6, 23500), (65000, 4, 8.5, 23500), (180000, 5, 3, 31000), (42000, 1, 12, 5000),
+])
+def test_chosen_plan_matches_calculate_tsp_frontload(salary, match, growth, limit):
+    best = optimize_tsp_frontload(salary, match, growth, limit)
+    assert best["front_load"]
+    assert best["advantage"] > 0
+    result = calculate_tsp_frontload(salary, limit, best["max_biweekly"], match, growth)[0]
+    assert {key: best[key] for key in PLAN_FIELDS} == {key: result[key] for key in PLAN_FIELDS}
+
+
+def test_chosen_plan_beats_every_other_maximum():
+    best = optimize_tsp_frontload(100000, 5, 6, 23500, num_candidates=200)
+    for max_biweekly in np.linspace(192.32, 100000 / 26, 37).round(2).tolist():
+        assert calculate_tsp_frontload(100000, 23500, max_biweekly, 5, 6)[0]["advantage"] <= best["advantage"]
+
+
+@pytest.mark.parametrize("growth", [-5, 0])
+def test_no_front_load_without_growth(growth):
+    best = optimize_tsp_frontload(100000, 5, growth, 23500)
+    assert best["front_load"] is False
+    assert best["max_biweekly"] is None
+    assert best["advantage"] == 0.0
+    assert best["front_ending_balance"] == best["even_ending_balance"]
+    even = calculate_tsp_frontload(100000, 23500, 9999, 5, growth)[0]["even_ending_balance"]
+    assert best["even_ending_balance"] == even
+
+
+def test_cap_at_the_base_is_the_even_plan():
+    assert optimize_tsp_frontload(100000, 5, 6, 23500, max_biweekly_cap=192.31)["front_load"] is False
+
+
+def test_cap_below_the_base_is_rejected():
+    with pytest.raises(ValueError):
+        optimize_tsp_frontload(100000, 5, -5, 23500, max_biweekly_cap=100)
+
+
+def test_limit_below_the_yearly_minimum_is_rejected():
+    with pytest.raises(ValueError):
+        optimize_tsp_frontload(100000, 5, 6, 4000)
+
+
+FORM = {
+    "annual_salary": "100000", "match_percent": "5", "target_investment": "23500",
+    "max_biweekly": "9999", "growth_rate": "6",
+}
+
+
+def test_route_uses_the_optimized_maximum(client):
+    response = client.post("/tsp-frontload", data=dict(FORM, optimize_max_biweekly="yes"))
+    best = optimize_tsp_frontload(100000.0, 5.0, 6.0, 23500.0, max_biweekly_cap=9999.0)
+    page = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert "Best per-pay contribution found" in page
+    assert f"${best['max_biweekly']:,.2f}" in page
+    assert f"${best['advantage']:,.2f}" in page
+
+
+def test_route_recommends_even_contributions_without_growth(client):
+    response = client.post("/tsp-frontload", data=dict(FORM, growth_rate="0", optimize_max_biweekly="yes"))
+    assert "does not beat even contributions" in response.get_data(as_text=True)
+
+
+def test_route_shows_errors(client):
+    response = client.post("/tsp-frontload", data=dict(FORM, target_investment="100"))
+    assert "must be at least" in response.get_data(as_text=True)
+
+
+def test_api_optimize(client):
+    response = client.post("/api/v1/tsp-frontload-optimize", json={
+        "annual_salary": 100000, "match_percent": 5, "target_investment": 23500, "growth_rate": -5,
+    })
+    assert response.get_json()["result"]["front_load"] is False
+    response = client.post("/api/v1/tsp-frontload-optimize", json={
+        "annual_salary": 100000, "match_percent": 5, "target_investment": 23500, "growth_rate": 6, "max_biweekly": 100,
+    })
+    assert response.status_code == 400
+
+
+def test_api_batch_matches_scalar(client):
+    salaries = [60000, 100000, 150000, 100000]
+    targets = [23500, 23500, 23500, 100]
+    response = client.post("/api/v1/tsp-frontload/batch", json={
+        "annual_salary": salaries, "target_investment": targets, "max_biweekly": 3000,
+        "match_percent": 5, "growth_rate": 6,
+    })
+    data = response.get_json()
+    assert data["valid"] == [True, True, True, False]
+    assert data["advantage"][3] is None
+    for i, (salary, target) in enumerate(zip(salaries[:3], targets[:3])):
+        result = calculate_tsp_frontload(salary, target, 3000, 5, 6)[0]
+        assert {key: data[key][i] for key in PLAN_FIELDS} == {key: result[key] for key in PLAN_FIELDS}
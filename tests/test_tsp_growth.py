@@ -0,0 +1,114 @@
+"""calculate_tsp_growth against the original year-by-year loop, the /tsp-growth route's simulated percentile bands and the simulation API."""
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from calculations import TSPGrowthYearlyData, _tsp_growth_balance, calculate_tsp_growth, simulate_tsp_growth
+from tests.reference import float_tsp_growth, is_half_cent
+
+
+def loop_balance(current_balance, annual_contribution, annual_rate, years):
+    balance = current_balance
+    for _ in range(years):
+        balance = (balance + annual_contribution) * (1 + annual_rate / 100)
+    return balance
+
+
+@pytest.mark.parametrize("annual_rate", [0, 1e-12, 1e-9, 1e-6, 1e-3, 0.01, -0.01, 6.5, -5, 15])
+@pytest.mark.parametrize("years", [1, 10, 50, 100])
+def test_closed_form_matches_the_loop(annual_rate, years):
+    expected = loop_balance(25000.0, 8500.0, annual_rate, years)
+    assert _tsp_growth_balance(25000.0, 8500.0, annual_rate, years) == pytest.approx(expected, rel=1e-12)
+
+
+def test_tiny_rate_does_not_cancel():
+    # (1 + r) ** 50 - 1 keeps only a few significant digits at r = 1e-14
+    assert round(_tsp_growth_balance(0, 10000, 1e-12, 50), 2) == 500000.00
+
+
+def test_summary_and_rows_match_the_loop():
+    rng = np.random.default_rng(2)
+    for _ in range(300):
+        salary, employee, employer = round(float(rng.uniform(20000, 200000)), 2), int(rng.integers(0, 15)), int(rng.integers(0, 6))
+        args = (round(float(rng.uniform(0, 500000)), 2), salary, employee, employer,
+                int(rng.integers(1, 60)), round(float(rng.uniform(-5, 15)), 2), round(float(rng.uniform(0, 5)), 2))
+        result, expected = calculate_tsp_growth(*args), float_tsp_growth(*args)
+        for key in ("future_value_nominal", "future_value_real", "growth"):
+            assert result[key] == expected[key]
+        # Summing contributions year by year and multiplying them out may break a half-cent tie differently
+        annual = Fraction(str(salary)) * (employee + employer) / 100
+        for mine, row in zip(result["yearly_data"], expected["yearly_data"]):
+            assert mine["growth"] == row["growth"]
+            if mine["contributions"] != row["contributions"]:
+                assert is_half_cent(annual * row["year"])
+
+
+def test_yearly_data_is_a_lazy_sequence():
+    rows = calculate_tsp_growth(25000, 85000, 5, 5, 20, 6.5, 2.5)["yearly_data"]
+    expected = float_tsp_growth(25000, 85000, 5, 5, 20, 6.5, 2.5)["yearly_data"]
+    assert isinstance(rows, TSPGrowthYearlyData)
+    assert len(rows) == 20
+    assert rows[0] == expected[0] and rows[-1] == expected[-1]
+    assert rows[5:8] == expected[5:8]
+    assert list(rows) == expected
+    with pytest.raises(IndexError):
+        rows[20]
+    assert len(calculate_tsp_growth(25000, 85000, 5, 5, 0, 6.5, 2.5)["yearly_data"]) == 0
+
+FORM = {
+    "current_balance": "25000", "annual_salary": "85000", "contribution_type": "percent",
+    "contribution_percent": "5", "employer_percent": "5", "years": "20", "annual_rate": "6.5",
+    "inflation_rate": "2.5",
+}
+
+
+def test_form_without_volatility_has_no_bands(client):
+    page = client.post("/tsp-growth", data=FORM).get_data(as_text=True)
+    assert "Future Balance (Nominal)" in page
+    assert "Range of Outcomes" not in page
+
+
+def test_form_with_volatility_shows_the_bands(client):
+    page = client.post("/tsp-growth", data=dict(FORM, volatility="15")).get_data(as_text=True)
+    assert "Range of Outcomes (15.0% Volatility)" in page
+    assert 'id="band-data"' in page
+    expected = simulate_tsp_growth(25000, 85000, 5, 5, 20, 6.5, 2.5, volatility=15, seed=0)
+    for name in ("10", "50", "90"):
+        balance = expected["percentiles"][f"p{name}"][-1]
+        assert f"{name}th Percentile Balance After 20 Years: <span class=\"fw-bold\">${balance:,.2f}" in page
+
+
+def test_api_simulates_with_a_seed(client):
+    payload = {
+        "current_balance": 25000, "annual_salary": 85000, "employee_percent": 5, "employer_percent": 5,
+        "years": 10, "annual_rate": 6, "num_paths": 2000, "seed": 3, "percentiles": [25, 75],
+    }
+    result = client.post("/api/v1/tsp-growth-simulate", json=payload).get_json()["result"]
+    assert result == simulate_tsp_growth(25000, 85000, 5, 5, 10, 6, 0, num_paths=2000, percentiles=(25, 75), seed=3)
+    assert set(result["percentiles"]) == {"p25", "p75"}
+
+
+def test_api_limits_the_paths(client):
+    response = client.post("/api/v1/tsp-growth-simulate", json={
+        "annual_salary": 85000, "employee_percent": 5, "years": 10, "annual_rate": 6, "num_paths": 10**9,
+    })
+    assert "num_paths must be between" in response.get_json()["error"]
+
+
+def test_growth_figures_are_pinned_to_the_cent():
+    result = calculate_tsp_growth(25000, 85000, 5, 5, 20, 6.5, 2.5)
+    assert {key: value for key, value in result.items() if key != "yearly_data"} == {
+        "future_value_nominal": 439557.23, "future_value_real": 268249.01,
+        "total_contributions": 170000.0, "growth": 244557.23,
+    }
+    assert result["yearly_data"][-1] == {"year": 20, "contributions": 170000.0, "growth": 244557.23}
+
+
+def test_simulation_figures_are_pinned_to_the_cent():
+    result = simulate_tsp_growth(25000, 85000, 5, 5, 5, 6.5, 2.5, num_paths=1000, seed=7)
+    assert (result["future_value_nominal"], result["future_value_real"], result["growth"]) == (82596.08, 73002.9, 15096.08)
+    assert result["percentiles"]["p10"] == [28950.19, 36707.72, 43111.26, 50795.31, 59187.01]
+    assert result["yearly_data"][-1] == {
+        "year": 5, "contributions": 42500.0, "growth": 15096.08, "p10": 59187.01, "p50": 82596.08, "p90": 112836.58,
+    }
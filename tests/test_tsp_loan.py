@@ -0,0 +1,277 @@
+"""
+The TSP loan calculators: the array, staged and comparison forms must agree
+with calculate_tsp_loan to the cent, and the export must stream its rows.
+"""
+import csv
+import io
+import json
+
+import numpy as np
+import pytest
+
+from calculations import (
+    TSP_LOAN_STAGES,
+    calculate_tsp_loan,
+    calculate_tsp_loan_batch,
+    calculate_tsp_loan_comparison,
+    calculate_tsp_loan_sweep,
+)
+from money import to_cents
+from tests.reference import float_tsp_loan
+
+SUMMARY_FIELDS = ("balance_no_loan", "balance_with_loan", "delta", "loan_payment", "total_repaid", "processing_fee")
+OPTION_FIELDS = ("loan_type", "loan_amount", "loan_interest_rate", "num_pay_periods", "biweekly_contribution_during_loan")
+BASE_INPUTS = {
+    "loan_type": "residential",
+    "tsp_balance": 150000.0,
+    "loan_amount": 25000.0,
+    "loan_interest_rate": 4.375,
+    "expected_annual_growth": 6.5,
+    "num_pay_periods": 390,
+    "biweekly_contribution_no_loan": 450.0,
+    "biweekly_contribution_during_loan": 300.0,
+}
+
+
+def random_loans(count, seed):
+    rng = np.random.default_rng(seed)
+    loans = []
+    for _ in range(count):
+        num_pay_periods = int(rng.integers(26, 391))
+        balance = round(float(rng.uniform(5000, 500000)), 2)
+        loans.append({
+            "loan_type": "general" if num_pay_periods <= 130 else "residential",
+            "tsp_balance": balance,
+            "loan_amount": round(float(rng.uniform(1000, min(50000, balance))), 2),
+            "loan_interest_rate": float(rng.choice([0.0, 3.875, 4.375, round(float(rng.uniform(0, 9)), 3)])),
+            "expected_annual_growth": float(rng.choice([0.0, 6.5, round(float(rng.uniform(0, 12)), 2)])),
+            "num_pay_periods": num_pay_periods,
+            "biweekly_contribution_no_loan": round(float(rng.uniform(0, 900)), 2),
+            "biweekly_contribution_during_loan": round(float(rng.uniform(0, 900)), 2),
+        })
+    return loans
+
+
+def test_batch_matches_scalar():
+    loans = random_loans(200, seed=1)
+    batch = calculate_tsp_loan_batch(**{key: [loan[key] for loan in loans] for key in BASE_INPUTS})
+    for i, loan in enumerate(loans):
+        result = calculate_tsp_loan(**loan)
+        for key in SUMMARY_FIELDS:
+            assert result[key] == batch[key][i], (loan, key)
+        n = loan["num_pay_periods"]
+        assert list(result["yearly_data"]["no_loan"]) == batch["no_loan"][i, :n].tolist()
+        assert list(result["yearly_data"]["with_loan"]) == batch["with_loan"][i, :n].tolist()
+
+
+def test_staged_results_match_cold_results():
+    # Replay one-field edits with warm stage caches, then recompute each from cold
+    edits = []
+    for field, step in (("tsp_balance", 500.0), ("loan_amount", 250.0), ("loan_interest_rate", 0.125),
+                        ("expected_annual_growth", 0.25), ("num_pay_periods", -7),
+                        ("biweekly_contribution_no_loan", 10.0), ("biweekly_contribution_during_loan", 10.0)):
+        for i in range(1, 6):
+            edits.append(dict(BASE_INPUTS, **{field: BASE_INPUTS[field] + step * i}))
+    edits += edits[::-1]
+
+    TSP_LOAN_STAGES.clear()
+    warm = [calculate_tsp_loan(**inputs) for inputs in edits]
+    assert any(counts["hits"] for counts in TSP_LOAN_STAGES.stats().values())
+    for inputs, staged in zip(edits, warm):
+        TSP_LOAN_STAGES.clear()
+        cold = calculate_tsp_loan(**inputs)
+        assert {key: staged[key] for key in SUMMARY_FIELDS} == {key: cold[key] for key in SUMMARY_FIELDS}
+        assert list(staged["payperiod_data"]) == list(cold["payperiod_data"])
+
+
+def test_stage_graph_runs_only_named_stages():
+    TSP_LOAN_STAGES.clear()
+    results = TSP_LOAN_STAGES.run(BASE_INPUTS, names=("no_loan",))
+    assert list(results) == ["no_loan"]
+    assert TSP_LOAN_STAGES.stats()["amortization"] == {"hits": 0, "misses": 0}
+
+
+def test_comparison_matches_single_loans():
+    rng = np.random.default_rng(3)
+    for loans in (random_loans(int(rng.integers(1, 5)), seed=int(seed)) for seed in rng.integers(0, 10**6, 40)):
+        shared = {key: loans[0][key] for key in ("tsp_balance", "expected_annual_growth", "biweekly_contribution_no_loan")}
+        options = [{key: loan[key] for key in OPTION_FIELDS} for loan in loans]
+        for option in options:
+            option["loan_amount"] = min(option["loan_amount"], shared["tsp_balance"])
+        comparison = calculate_tsp_loan_comparison(options=options, **shared)
+        horizon = max(option["num_pay_periods"] for option in options)
+        assert comparison["horizon"] == horizon
+        assert len(comparison["no_loan"]) == horizon
+        for option, row, path in zip(options, comparison["options"], comparison["with_loan"]):
+            single = calculate_tsp_loan(**shared, **option)
+            assert {key: row[key] for key in SUMMARY_FIELDS} == {key: single[key] for key in SUMMARY_FIELDS}
+            n = option["num_pay_periods"]
+            assert list(path[:n]) == list(single["yearly_data"]["with_loan"])
+            assert list(comparison["no_loan"][:n]) == list(single["yearly_data"]["no_loan"])
+            assert len(path) == horizon
+
+
+def test_comparison_needs_an_option():
+    with pytest.raises(ValueError):
+        calculate_tsp_loan_comparison(150000.0, 6.5, 450.0, [])
+
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson"])
+def test_export_streams_schedule(client, fmt):
+    inputs = dict(BASE_INPUTS, loan_type="general", num_pay_periods=104)
+    response = client.get("/tsp-loan/export", query_string=dict(inputs, format=fmt))
+    assert response.status_code == 200
+    assert response.is_streamed
+    schedule = list(calculate_tsp_loan(**inputs)["payperiod_data"])
+    body = response.get_data(as_text=True)
+    if fmt == "ndjson":
+        assert [json.loads(line) for line in body.splitlines()] == schedule
+    else:
+        rows = list(csv.DictReader(io.StringIO(body)))
+        assert len(rows) == len(schedule)
+        for row, expected in zip(rows, schedule):
+            assert row == {key: "" if value is None else str(value) for key, value in expected.items()}
+
+
+def test_export_rejects_invalid_inputs(client):
+    response = client.get("/tsp-loan/export", query_string=dict(BASE_INPUTS, loan_amount=10))
+    assert response.status_code == 400
+
+
+def test_matches_original_row_schedule():
+    for loan in random_loans(150, seed=7):
+        expected = float_tsp_loan(**loan)
+        result = calculate_tsp_loan(**loan)
+        assert {key: result[key] for key in SUMMARY_FIELDS} == {key: expected[key] for key in SUMMARY_FIELDS}
+        assert list(result["payperiod_data"]) == expected["payperiod_data"]
+        assert list(result["yearly_data"]["labels"]) == expected["yearly_data"]["labels"]
+        assert list(result["yearly_data"]["no_loan"]) == expected["yearly_data"]["no_loan"]
+        assert list(result["yearly_data"]["with_loan"]) == expected["yearly_data"]["with_loan"]
+
+
+def test_diff_is_computed_from_the_exact_with_loan_balance():
+    # Without growth the with-loan balance lands next to a half cent; rounding it first moved the diff by a cent
+    loan = {
+        "loan_type": "general", "tsp_balance": 402466.78, "loan_amount": 47703.91, "loan_interest_rate": 0.0,
+        "expected_annual_growth": 0.0, "num_pay_periods": 82, "biweekly_contribution_no_loan": 12.19,
+        "biweekly_contribution_during_loan": 155.68,
+    }
+    assert calculate_tsp_loan(**loan)["payperiod_data"][0]["diff"] == 47028.66
+    assert list(calculate_tsp_loan(**loan)["payperiod_data"]) == float_tsp_loan(**loan)["payperiod_data"]
+
+
+PINNED_LOAN = dict(BASE_INPUTS, loan_type="general", tsp_balance=50000.0, loan_amount=10000.0, num_pay_periods=60,
+                   biweekly_contribution_no_loan=312.5, biweekly_contribution_during_loan=212.5)
+PINNED_SUMMARY = {"balance_no_loan": 78333.44, "balance_with_loan": 70966.16, "delta": 7367.28,
+                  "loan_payment": 175.36, "total_repaid": 10521.7, "processing_fee": 50}
+
+
+def assert_whole_cents(values):
+    for value in np.ravel(values).tolist():
+        assert value == to_cents(value) / 100, value
+
+
+def test_loan_figures_are_pinned_to_the_cent():
+    result = calculate_tsp_loan(**PINNED_LOAN)
+    assert {key: result[key] for key in SUMMARY_FIELDS} == PINNED_SUMMARY
+    assert result["payperiod_data"][0] == {
+        "period": 1, "no_loan": 50438.28, "with_loan": 40421.84, "diff": 10016.44, "loan_balance": 9841.47,
+        "interest": 16.83, "principal": 158.53, "contribution_with_loan": 212.5, "contribution_no_loan": 312.5,
+        "remaining_loan_payments": 59,
+    }
+    assert result["payperiod_data"][-1]["interest"] == 0.29
+    assert result["payperiod_data"][-1]["principal"] == 175.07
+    assert result["yearly_data"]["with_loan"][25] == 52698.8
+    for row in result["payperiod_data"]:
+        assert_whole_cents([value for key, value in row.items() if key not in ("period", "remaining_loan_payments")])
+
+
+def test_batch_and_sweep_are_pinned_to_the_cent():
+    batch = calculate_tsp_loan_batch(
+        ["general", "residential"], 50000, [10000, 20000], 4.375, 6.5, [60, 200], 312.5, 212.5
+    )
+    assert batch["balance_no_loan"].tolist() == [78333.44, 163548.65]
+    assert batch["balance_with_loan"].tolist() == [70966.16, 130069.79]
+    assert batch["delta"].tolist() == [7367.28, 33478.87]
+    assert batch["loan_payment"].tolist() == [175.36, 117.85]
+    assert batch["total_repaid"].tolist() == [10521.7, 23570.46]
+    assert np.isnan(batch["with_loan"][0, 60:]).all()
+    assert_whole_cents(batch["with_loan"][1])
+
+    sweep = calculate_tsp_loan_sweep(50000, [10000, 20000], 4.375, [0, 6.5], [60, 200], 312.5, 212.5)
+    assert sweep["loan_payment"].tolist() == [[175.36, 58.93], [350.72, 117.85]]
+    assert sweep["total_repaid"].tolist() == [[10521.7, 11785.23], [21043.41, 23570.46]]
+    assert sweep["balance_no_loan"].tolist() == [[68750.0, 112500.0], [78333.44, 163548.65]]
+    assert sweep["balance_with_loan"][1].tolist() == [[70966.16, 133740.59], [70137.79, 130069.79]]
+    assert sweep["delta"][1].tolist() == [[7367.28, 29808.06], [8195.65, 33478.87]]
+
+
+def test_comparison_is_pinned_to_the_cent():
+    option = {key: PINNED_LOAN[key] for key in OPTION_FIELDS}
+    comparison = calculate_tsp_loan_comparison(50000.0, 6.5, 312.5, [option])
+    assert comparison["balance_no_loan_at_horizon"] == 78333.44
+    row = comparison["options"][0]
+    assert {key: row[key] for key in SUMMARY_FIELDS} == PINNED_SUMMARY
+    assert (row["balance_at_horizon"], row["delta_at_horizon"]) == (70966.16, 7367.28)
+
+
+def test_sweep_cells_match_calculate_tsp_loan():
+    amounts, growth_rates, terms = [1000.0, 12345.67, 50000.0], [0.0, 3.25, 6.5], [26, 60, 130, 131, 390]
+    for interest in (0.0, 4.375):
+        sweep = calculate_tsp_loan_sweep(75000.0, amounts, interest, growth_rates, terms, 412.37, 250.0)
+        for g, growth in enumerate(growth_rates):
+            for a, amount in enumerate(amounts):
+                for t, term in enumerate(terms):
+                    result = calculate_tsp_loan(
+                        "residential" if term > 130 else "general", 75000.0, amount, interest, growth, term, 412.37, 250.0
+                    )
+                    assert sweep["loan_payment"][a, t] == result["loan_payment"]
+                    assert sweep["total_repaid"][a, t] == result["total_repaid"]
+                    assert sweep["balance_no_loan"][g, t] == result["balance_no_loan"]
+                    assert sweep["balance_with_loan"][g, a, t] == result["balance_with_loan"]
+                    assert sweep["delta"][g, a, t] == result["delta"]
+
+
+SWEEP_PAYLOAD = {
+    "tsp_balance": 60000, "loan_interest_rate": 4.375, "biweekly_contribution_no_loan": 300,
+    "biweekly_contribution_during_loan": 200, "loan_amount": {"start": 5000, "stop": 15000, "num": 3},
+    "num_pay_periods": [60, 200], "expected_annual_growth": [6.5],
+}
+
+
+def test_sweep_api_returns_the_grid(client):
+    body = client.post("/api/v1/tsp-loan/sweep", json=SWEEP_PAYLOAD).get_json()
+    assert body["loan_amount"] == [5000.0, 10000.0, 15000.0]
+    assert body["loan_type"] == ["general", "residential"]
+    expected = calculate_tsp_loan("residential", 60000, 10000, 4.375, 6.5, 200, 300, 200)
+    assert body["delta"][0][1][1] == expected["delta"]
+    assert body["loan_payment"][1][1] == expected["loan_payment"]
+
+
+@pytest.mark.parametrize("change, status, message", [
+    ({"loan_amount": {"start": 1000, "stop": 50000, "num": 1000},
+      "num_pay_periods": {"start": 26, "stop": 390, "num": 365}}, 413, "limited to 100000 grid points"),
+    ({"loan_amount": {"start": 1000, "stop": 50000, "num": 5000}}, 400, "loan_amount.num must be between"),
+    ({"expected_annual_growth": []}, 400, "expected_annual_growth must be a non-empty list"),
+    ({"num_pay_periods": 60}, 400, "num_pay_periods must be a non-empty list"),
+    ({"loan_amount": [5000, "lots"]}, 400, "could not convert"),
+    ({"tsp_balance": "rich"}, 400, "could not convert"),
+    ({"loan_amount": {"start": "a", "stop": 5000}}, 400, "could not convert"),
+    ({"expected_annual_growth": [float("nan")]}, 400, "must be finite"),
+    ({"loan_amount": [500]}, 400, "at least $1,000"),
+    ({"loan_amount": [70000]}, 400, "cannot exceed current TSP balance"),
+    ({"num_pay_periods": [20, 60]}, 400, "between 26 and 390"),
+    ({"loan_amount": None}, 400, "must be a non-empty list"),
+])
+def test_sweep_api_validates_the_axes(client, change, status, message):
+    response = client.post("/api/v1/tsp-loan/sweep", json=dict(SWEEP_PAYLOAD, **change))
+    assert response.status_code == status
+    assert message in response.get_json()["error"]
+
+
+def test_sweep_api_reports_missing_fields(client):
+    payload = {key: value for key, value in SWEEP_PAYLOAD.items() if key != "num_pay_periods"}
+    response = client.post("/api/v1/tsp-loan/sweep", json=payload)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Missing field: num_pay_periods"
+    assert client.post("/api/v1/tsp-loan/sweep", json=[1, 2]).status_code == 400